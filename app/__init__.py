@@ -46,7 +46,18 @@ def load_user(user_id):
 
 
 def create_app(config_name=None, start_background_services=True):
-    """Application factory for creating a Flask app instance."""
+    """
+    Application factory for creating a Flask app instance.
+
+    Args:
+        config_name: Config to load (default: FLASK_CONFIG or 'default')
+        start_background_services: True to connect the status store and
+            start the background services, 'web' to do the same but leave
+            probing to a separate ping worker (app.ping_worker), False for
+            neither (CLI commands, scripts). With True the ping service
+            thread is only started while PING_IN_PROCESS is enabled; the
+            wake sender thread runs while WAKE_SENDER_IN_PROCESS is.
+    """
     
     # Determine config based on environment variable or default to 'development'
     if config_name is None:
@@ -363,19 +374,61 @@ def create_app(config_name=None, start_background_services=True):
     from app.logging_config import get_logger
     logger = get_logger('app.init')
     
+    from app.rate_limiter import configure_rate_limits
+    configure_rate_limits(app.config)
+    from app.wake_queue import configure_wake_queue
+    configure_wake_queue(app.config)
+    
     if start_background_services:
-        # Start ping service in a background thread
+        # Update ping_service.py to use connection pool
+        from app.ping_service import update_redis_pool, configure_status_store, configure_status_cache
+        configure_status_cache(
+            app.config['REDIS_STATUS_TIMEOUT'],
+            app.config['REDIS_BREAKER_FAILURES'],
+            app.config['REDIS_BREAKER_SLOW_CALL'],
+            app.config['REDIS_BREAKER_RESET'],
+            app.config['STATUS_CACHE_SIZE']
+        )
+        update_redis_pool(redis_pool)
+        configure_status_store(app.config['STATUS_STORE_LAYOUT'], app.config['STATUS_HASH_SHARD_SIZE'],
+                               app.config['STATUS_ENCODING'])
+
+        # Serve last known statuses (marked stale) until the first probes report
         try:
-            from app.async_ping_service import start_ping_service
-            ping_thread = threading.Thread(target=start_ping_service, daemon=True)
-            ping_thread.start()
-            logger.info("Ping service started successfully")
+            from app.status_history import prime_status_store
+            prime_status_store(app.config['STATUS_PRIME_TTL'])
         except Exception as e:
-            logger.error(f"Failed to start ping service: {str(e)}")
+            logger.error(f"Failed to prime host statuses: {str(e)}")
 
-        # Update ping_service.py to use connection pool
-        from app.ping_service import update_redis_pool
-        update_redis_pool(redis_pool)
+        # Start ping service in a background thread, unless a separate ping worker probes the hosts
+        if start_background_services != 'web' and app.config['PING_IN_PROCESS']:
+            try:
+                from app.async_ping_service import start_ping_service
+                ping_thread = threading.Thread(target=start_ping_service, args=(app.config,), daemon=True)
+                ping_thread.start()
+                logger.info("Ping service started successfully")
+            except Exception as e:
+                logger.error(f"Failed to start ping service: {str(e)}")
+        else:
+            logger.info("Ping service left to a separate ping worker")
+        
+        # Execute queued wake requests in this process, unless separate wake workers do
+        if app.config['WAKE_QUEUE_ENABLED'] and app.config['WAKE_SENDER_IN_PROCESS']:
+            try:
+                from app.wake_queue import start_wake_senders
+                start_wake_senders(app.config, app.config['WAKE_SENDER_THREADS'])
+                logger.info("Wake sender started successfully")
+            except Exception as e:
+                logger.error(f"Failed to start wake sender: {str(e)}")
+        
+        # Fire wake schedules; processes elect one leader, so running it everywhere is safe
+        if app.config['WAKE_SCHEDULER_ENABLED']:
+            try:
+                from app.wake_scheduler import start_wake_scheduler
+                start_wake_scheduler(app.config)
+                logger.info("Wake scheduler started successfully")
+            except Exception as e:
+                logger.error(f"Failed to start wake scheduler: {str(e)}")
         
         # Initialize update checker service
         try:
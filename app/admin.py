@@ -401,6 +401,13 @@ def delete_user(user_id):
                 # Perform the deletion - cascade will handle related records
                 db_session.delete(user)
                 db_session.commit()
+                if host_count > 0:
+                    # The user's hosts went with them; let ping workers reload
+                    from app.host_inventory import publish_host_change
+                    publish_host_change('reload')
+                # So did their wake schedules
+                from app.wake_scheduler import publish_schedule_change
+                publish_schedule_change()
 
                 request_id = request.headers.get('X-Request-ID', 'N/A')
                 access_logger.info("User successfully deleted: username=%s, user_id=%s, deleted_by=%s, request_id=%s", 
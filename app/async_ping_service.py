@@ -1,95 +1,528 @@
 import asyncio
 import platform
+import re
+import time
 from datetime import datetime
-from app.models import Host
-from app import db_session
-from app.ping_service import set_host_status
+from app.ping_service import (
+    status_writer, pop_fast_probe_requests, pop_probe_requests, prune_expired_statuses,
+    publish_status_transition, STATUS_TTL
+)
+from app.probe_scheduler import ProbeScheduler
+from app.host_inventory import HostInventory, load_host_targets
+from app.shard_leases import ShardLeases
+from app.probe_strategies import get_strategy
+from app.neighbor_table import read_reachable_neighbors
+from app.status_history import history_recorder, prune_history
+from app.rtt_history import rtt_recorder
+from app.icmp_prober import IcmpProber, IcmpUnavailable
 from app.logging_config import get_logger
 import subprocess
 from concurrent.futures import ThreadPoolExecutor
 
 logger = get_logger('app.async_ping')
 
-async def ping_host(ip_address, timeout=2):
+# Runtime settings, overridden from the Flask config by configure_ping_service()
+settings = {
+    'PING_MODE': 'auto',        # auto, icmp or subprocess
+    'PING_TIMEOUT': 2,
+    'PING_MAX_CONCURRENCY': 256,
+    'PING_CYCLE_DEADLINE': 25,
+    'PING_INTERVAL': 30,
+    'PING_MAX_INTERVAL': 300,
+    'PING_BACKOFF': 1.5,
+    'PING_FAST_INTERVAL': 5,
+    'PING_WAKE_WINDOW': 120,
+    'PING_SPREAD': True,
+    'PING_CONFIRM_OFFLINE': 3,
+    'PING_CONFIRM_ONLINE': 1,
+    'PING_STATUS_HEARTBEAT': 120,
+    'PING_INVENTORY_REFRESH': 30,
+    'PING_INVENTORY_FULL_RELOAD': 3600,
+    'PING_NEIGHBOR_PREPASS': True,
+    'PING_SHARDS': 16,
+    'PING_LEASE_TTL': 15,
+    'PING_TICK': 1,
+    'PING_WRITE_BATCH_SIZE': 500,
+    'PING_WRITE_BATCH_WINDOW': 0.5,
+    'PING_STATUS_PRUNE_INTERVAL': 600,
+    'PING_HISTORY_FLUSH_INTERVAL': 5,
+    'PING_LAST_SEEN_INTERVAL': 300,
+    'PING_HISTORY_RETENTION_DAYS': 90,
+    'PING_RTT_FLUSH_INTERVAL': 10,
+}
+
+# Outcome of the most recent check_hosts() cycle
+last_cycle_stats = {}
+
+# Shared ICMP engine for the ping service event loop (created lazily)
+_icmp_prober = None
+_icmp_disabled = False
+
+# Shared pool for the subprocess fallback path
+_subprocess_pool = None
+
+# Caps in-flight probes across everything running on the ping service loop
+_probe_slots = None
+
+
+def configure_ping_service(config):
+    """
+    Apply ping service settings from a Flask config mapping.
+
+    Args:
+        config: Mapping providing PING_* keys (e.g. app.config)
     """
-    Ping a host asynchronously
+    for key in settings:
+        if key in config:
+            settings[key] = config[key]
+    status_writer.max_batch = settings['PING_WRITE_BATCH_SIZE']
+    status_writer.max_delay = settings['PING_WRITE_BATCH_WINDOW']
+    history_recorder.flush_interval = settings['PING_HISTORY_FLUSH_INTERVAL']
+    rtt_recorder.flush_interval = settings['PING_RTT_FLUSH_INTERVAL']
+    logger.debug("Ping service configured: %s", settings)
+
+
+def _get_icmp_prober():
+    """Return the shared ICMP prober, or None when ICMP sockets are unavailable."""
+    global _icmp_prober, _icmp_disabled
+
+    if _icmp_disabled:
+        return None
+    if _icmp_prober is None or not _icmp_prober.is_open:
+        prober = IcmpProber(loop=asyncio.get_event_loop())
+        try:
+            prober.open()
+        except IcmpUnavailable as e:
+            if settings['PING_MODE'] == 'icmp':
+                raise
+            logger.warning("ICMP sockets unavailable, falling back to subprocess ping: %s", str(e))
+            _icmp_disabled = True
+            return None
+        _icmp_prober = prober
+    return _icmp_prober
+
+
+# Round-trip time in the output of the system ping binary ("time=0.42 ms", "time<1ms")
+_PING_TIME_PATTERN = re.compile(r'time[=<]\s*([\d.]+)\s*ms')
+
+
+async def _ping_subprocess(ip_address, timeout):
+    """Ping a host by running the system ping binary in a worker thread; returns the RTT or None."""
+    global _subprocess_pool
+
+    # Different ping command based on OS
+    if platform.system().lower() == "windows":
+        ping_cmd = ['ping', '-n', '1', '-w', str(timeout * 1000), ip_address]
+    else:
+        ping_cmd = ['ping', '-c', '1', '-W', str(timeout), ip_address]
+
+    if _subprocess_pool is None:
+        _subprocess_pool = ThreadPoolExecutor(thread_name_prefix='ping')
+
+    # Run ping command in a thread pool to not block
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    result = await loop.run_in_executor(
+        _subprocess_pool,
+        lambda: subprocess.run(ping_cmd,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               timeout=timeout + 1)
+    )
+    if result.returncode != 0:
+        return None
+    match = _PING_TIME_PATTERN.search(result.stdout.decode(errors='replace'))
+    if match:
+        return float(match.group(1)) / 1000.0
+    # Unparsable output: the elapsed time is an upper bound
+    return loop.time() - started
+
+
+async def ping_host_rtt(ip_address, timeout=None):
+    """
+    Ping a host asynchronously and measure the round-trip time
     
+    Uses the shared ICMP prober unless PING_MODE is 'subprocess' or no ICMP
+    socket can be opened, in which case the system ping binary is used.
+
     Args:
         ip_address: The IP address to ping
-        timeout: Timeout in seconds (default: 2)
+        timeout: Timeout in seconds (default: PING_TIMEOUT setting)
         
     Returns:
-        bool: True if host is online, False otherwise
+        float: Round-trip time in seconds, or None if the host did not answer
     """
+    if timeout is None:
+        timeout = settings['PING_TIMEOUT']
     try:
-        # Different ping command based on OS
-        if platform.system().lower() == "windows":
-            ping_cmd = ['ping', '-n', '1', '-w', str(timeout * 1000), ip_address]
-        else:
-            ping_cmd = ['ping', '-c', '1', '-W', str(timeout), ip_address]
-        
-        # Run ping command in a thread pool to not block
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            result = await loop.run_in_executor(
-                pool,
-                lambda: subprocess.run(ping_cmd, 
-                                     stdout=subprocess.PIPE, 
-                                     stderr=subprocess.PIPE,
-                                     timeout=timeout)
-            )
-        return result.returncode == 0
+        prober = None
+        if settings['PING_MODE'] != 'subprocess':
+            prober = _get_icmp_prober()
+        if prober is not None:
+            return await prober.ping(ip_address, timeout)
+        return await _ping_subprocess(ip_address, timeout)
     except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
         logger.debug(f"Ping failed for {ip_address}: {str(e)}")
-        return False
+        return None
     except Exception as e:
         logger.error(f"Error pinging {ip_address}: {str(e)}", exc_info=True)
-        return False
+        return None
+
+
+async def ping_host(ip_address, timeout=None):
+    """
+    Ping a host asynchronously
+
+    Args:
+        ip_address: The IP address to ping
+        timeout: Timeout in seconds (default: PING_TIMEOUT setting)
+        
+    Returns:
+        bool: True if host is online, False otherwise
+    """
+    return await ping_host_rtt(ip_address, timeout) is not None
+
+def _get_probe_slots():
+    """Return the semaphore that caps in-flight probes on this event loop."""
+    global _probe_slots
+
+    if _probe_slots is None:
+        _probe_slots = asyncio.Semaphore(settings['PING_MAX_CONCURRENCY'])
+    return _probe_slots
+
+
+async def _probe_target(host_id, ip_address, probe=None):
+    """Probe one host; returns (host_id, is_online, rtt in seconds or None)."""
+    async with _get_probe_slots():
+        if probe is None or probe == 'icmp':
+            rtt = await ping_host_rtt(ip_address)
+            return host_id, rtt is not None, rtt
+        strategy = get_strategy(probe, ping_host)
+        # For TCP and UDP probes the time to the first answer is the RTT
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        is_online = await strategy.probe(ip_address, settings['PING_TIMEOUT'])
+        return host_id, is_online, (loop.time() - started) if is_online else None
+
+
+async def run_probe_cycle(targets, on_result, deadline=None):
+    """
+    Probe hosts with bounded concurrency under a hard cycle deadline
+
+    At most PING_MAX_CONCURRENCY probe tasks exist at any time. Results are
+    handed to on_result as they complete, not in target order, so a slow
+    host never delays the handling of faster ones.
+
+    Args:
+        targets: Iterable of (host_id, ip_address) pairs or
+            (host_id, ip_address, probe_spec) triples
+        on_result: Callable(host_id, is_online, rtt) invoked for each finished probe
+        deadline: Seconds the cycle may run (default: PING_CYCLE_DEADLINE)
+
+    Returns:
+        list: IDs of hosts still unanswered when the deadline passed
+    """
+    loop = asyncio.get_event_loop()
+    if deadline is None:
+        deadline = settings['PING_CYCLE_DEADLINE']
+    ends_at = loop.time() + deadline
+    window = max(1, settings['PING_MAX_CONCURRENCY'])
+
+    remaining = iter(targets)
+    in_flight = {}
+    exhausted = False
+
+    while True:
+        # Top up the in-flight window from the remaining targets
+        while not exhausted and len(in_flight) < window:
+            target = next(remaining, None)
+            if target is None:
+                exhausted = True
+                break
+            in_flight[asyncio.ensure_future(_probe_target(*target))] = target[0]
+
+        if not in_flight:
+            return []
+
+        timeout = ends_at - loop.time()
+        if timeout <= 0:
+            break
+        done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            host_id = in_flight.pop(task)
+            try:
+                _, is_online, rtt = task.result()
+            except Exception as e:
+                logger.error(f"Error checking host {host_id}: {str(e)}", exc_info=True)
+                is_online, rtt = None, None
+            on_result(host_id, is_online, rtt)
+
+    # Deadline reached: abandon in-flight probes and never start the rest
+    overdue = list(in_flight.values())
+    for task in in_flight:
+        task.cancel()
+    overdue.extend(target[0] for target in remaining)
+    return overdue
+
+
+def _record_result(host_id, is_online, scheduler=None, rtt=None, on_demand=False):
+    if is_online is None:
+        status = "unknown"
+    else:
+        status = "online" if is_online else "offline"
 
-async def check_hosts():
-    """Check status of all hosts and update Redis"""
+    ttl = STATUS_TTL
+    observed_at = datetime.utcnow()
+    last_check = observed_at.isoformat()
+    if rtt is not None:
+        rtt_recorder.add(host_id, rtt)
+
+    entry = scheduler.get(host_id) if scheduler is not None else None
+    if entry is not None:
+        previous = entry.status
+        changed, delay = scheduler.record(host_id, None if is_online is None else status)
+        if is_online:
+            entry.seen_at = observed_at
+        if is_online is not None and entry.status not in (None, status):
+            logger.debug("Host status flip not yet confirmed: host_id=%s observed=%s streak=%s",
+                         host_id, status, entry.streak)
+        # Only confirmed statuses are stored and published
+        status = entry.status or "unknown"
+        if changed:
+            logger.info("Host status changed: host_id=%s status=%s previous=%s", host_id, status, previous)
+            publish_status_transition(host_id, status, previous, last_check, on_demand)
+        elif on_demand:
+            # Whoever asked for the probe waits for its result on the event stream
+            publish_status_transition(host_id, status, previous, last_check, on_demand)
+        now = time.monotonic()
+        if status != "unknown" and (changed or previous is None):
+            # First result after a (re)start is compared with the stored history
+            history_recorder.add(host_id, status, observed_at, entry.seen_at)
+            entry.seen_saved_at = now
+        elif is_online and status == "online" and now >= entry.seen_saved_at + settings['PING_LAST_SEEN_INTERVAL']:
+            # Hosts that stay online only refresh last_seen, at a bounded cadence
+            history_recorder.add(host_id, status, observed_at, entry.seen_at)
+            entry.seen_saved_at = now
+
+        heartbeat = settings['PING_STATUS_HEARTBEAT']
+        if not (changed or on_demand) and previous is not None and now + delay < entry.refresh_at:
+            # The stored status is still current and outlives the next probe
+            return
+        entry.refresh_at = now + heartbeat
+        # Keep the entry alive until the next refresh or scheduled probe has reported
+        ttl = int(max(heartbeat, delay)) + STATUS_TTL
+
+    status_writer.add(host_id, status, last_check, ttl, rtt)
+    logger.debug("Host %s status: %s", host_id, status)
+
+
+def _neighbor_prepass(targets, host_macs):
+    """
+    Split targets using the kernel neighbor table
+
+    A host counts as online when its IP has a REACHABLE entry with the
+    host's MAC, or when its MAC is REACHABLE at any IP (e.g. after a DHCP
+    address change).
+
+    Args:
+        targets: (host_id, ip, probe_spec) triples
+        host_macs: Mapping of host_id to normalized MAC address
+
+    Returns:
+        tuple: (online host IDs, targets that still need an active probe)
+    """
+    neighbors = read_reachable_neighbors()
+    if not neighbors:
+        return [], targets
+
+    reachable_macs = set(neighbors.values())
+    online = []
+    remaining = []
+    for target in targets:
+        host_id, ip_address = target[0], target[1]
+        mac = host_macs.get(host_id)
+        seen_mac = neighbors.get(ip_address)
+        if (seen_mac is not None and mac in (None, seen_mac)) or (mac is not None and mac in reachable_macs):
+            online.append(host_id)
+        else:
+            remaining.append(target)
+    return online, remaining
+
+
+async def check_hosts(targets=None, scheduler=None, host_macs=None, on_demand=False):
+    """
+    Check status of hosts and update Redis
+
+    Hosts the neighbor table already shows as REACHABLE are recorded as
+    online without a probe (unless PING_NEIGHBOR_PREPASS is off); only the
+    rest are probed actively.
+
+    Args:
+        targets: (host_id, ip, probe_spec) triples to probe (default: every host with an IP)
+        scheduler: Optional ProbeScheduler that is told about every outcome
+        host_macs: Optional mapping of host_id to MAC address for the neighbor check
+        on_demand: True when the hosts were requested through request_probe()
+    """
     try:
-        # Get all hosts from database
-        hosts = db_session.query(Host).all()
+        if targets is None:
+            targets = load_host_targets()
         
-        # Create tasks for all hosts with IP addresses
-        ping_tasks = []
-        for host in hosts:
-            if host.ip:
-                task = asyncio.create_task(ping_host(host.ip))
-                ping_tasks.append((host, task))
+        logger.debug("Checking host connectivity for %s hosts", len(targets))
+        started = asyncio.get_event_loop().time()
 
-        logger.debug("Checking host connectivity for %s hosts", len(ping_tasks))
-        
-        # Wait for all pings to complete
-        for host, task in ping_tasks:
+        def on_result(host_id, is_online, rtt=None):
             try:
-                is_online = await task
-                status = "online" if is_online else "offline"
-                set_host_status(host.id, status)
-                logger.debug(f"Host {host.name} ({host.ip}) status: {status}")
+                _record_result(host_id, is_online, scheduler, rtt, on_demand)
             except Exception as e:
-                logger.error(f"Error checking host {host.name}: {str(e)}", exc_info=True)
-                set_host_status(host.id, "unknown")
+                logger.error(f"Error recording status for host {host_id}: {str(e)}", exc_info=True)
+
+        passive = []
+        active = targets
+        if settings['PING_NEIGHBOR_PREPASS'] and targets:
+            passive, active = _neighbor_prepass(targets, host_macs or {})
+            for host_id in passive:
+                on_result(host_id, True)
+
+        overdue = await run_probe_cycle(active, on_result)
+        
+        # Hosts we could not get to in time are reported as unknown
+        for host_id in overdue:
+            on_result(host_id, None)
+        if overdue:
+            logger.warning(
+                "Ping cycle deadline reached: overdue=%s total=%s deadline=%ss",
+                len(overdue),
+                len(targets),
+                settings['PING_CYCLE_DEADLINE']
+            )
+
+        status_writer.flush()
+
+        last_cycle_stats.update(
+            hosts=len(targets),
+            passive=len(passive),
+            overdue=len(overdue),
+            duration=asyncio.get_event_loop().time() - started,
+            finished_at=datetime.utcnow().isoformat(),
+            redis_writes=status_writer.metrics(),
+            flaps_suppressed=scheduler.flaps_suppressed if scheduler is not None else 0
+        )
+        logger.debug("Ping cycle finished: %s", last_cycle_stats)
         
     except Exception as e:
         logger.error(f"Error in check_hosts: {str(e)}", exc_info=True)
 
-async def ping_service():
-    """Main ping service loop"""
-    logger.info("Starting ping service")
-    while True:
-        try:
-            await check_hosts()
-            await asyncio.sleep(30)  # Wait 30 seconds before next check
-        except Exception as e:
-            logger.error(f"Error in ping service loop: {str(e)}", exc_info=True)
-            await asyncio.sleep(5)  # Wait 5 seconds on error before retry
-
-def start_ping_service():
-    """Start the ping service in the background"""
+async def _sleep(delay, stop=None):
+    """Sleep for delay seconds, returning early once stop is set."""
+    if stop is None:
+        await asyncio.sleep(delay)
+        return
+    try:
+        await asyncio.wait_for(stop.wait(), delay)
+    except asyncio.TimeoutError:
+        pass
+
+async def ping_service(stop=None):
+    """
+    Main ping service loop
+
+    Hosts are probed when their adaptive next-due time comes up rather than
+    all together on a fixed cadence. Host changes and fast probe requests
+    (e.g. after a wake) are picked up every PING_TICK seconds; the host
+    inventory version is verified every PING_INVENTORY_REFRESH seconds.
+    On-demand probe requests are probed first, ahead of due hosts.
+
+    Hosts are split into PING_SHARDS shards by ID. Each running service
+    leases a fair share of them through Redis and only probes hosts in its
+    own shards, so several processes or machines can share the load.
+
+    A status flip is only stored once PING_CONFIRM_OFFLINE (or
+    PING_CONFIRM_ONLINE) consecutive probes agree. Unchanged statuses are
+    rewritten to Redis every PING_STATUS_HEARTBEAT seconds instead of after
+    every probe.
+
+    Args:
+        stop: Optional asyncio.Event; once set, the loop finishes its current
+            step, writes out buffered results and releases its shards so
+            other workers take them over at once
+    """
+    logger.info("Starting ping service: mode=%s", settings['PING_MODE'])
+    scheduler = ProbeScheduler(
+        min_interval=settings['PING_INTERVAL'],
+        max_interval=settings['PING_MAX_INTERVAL'],
+        backoff=settings['PING_BACKOFF'],
+        fast_interval=settings['PING_FAST_INTERVAL'],
+        wake_window=settings['PING_WAKE_WINDOW'],
+        confirm_offline=settings['PING_CONFIRM_OFFLINE'],
+        confirm_online=settings['PING_CONFIRM_ONLINE'],
+        spread=settings['PING_SPREAD']
+    )
+    inventory = HostInventory(
+        check_interval=settings['PING_INVENTORY_REFRESH'],
+        full_reload_interval=settings['PING_INVENTORY_FULL_RELOAD']
+    )
+    leases = ShardLeases('ping', settings['PING_SHARDS'], ttl=settings['PING_LEASE_TTL'])
+    next_lease_check = 0
+    next_prune = time.monotonic() + settings['PING_STATUS_PRUNE_INTERVAL']
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                shards_changed = False
+                if time.monotonic() >= next_lease_check:
+                    shards_changed = leases.maintain()
+                    next_lease_check = time.monotonic() + settings['PING_LEASE_TTL'] / 3.0
+                if inventory.refresh() or shards_changed:
+                    scheduler.sync([target for target in inventory.targets() if leases.owns(target[0])])
+
+                for host_id in pop_fast_probe_requests(accept=leases.owns):
+                    scheduler.expedite(host_id)
+
+                # On-demand requests run ahead of everything that is merely due
+                requested = scheduler.take(pop_probe_requests(accept=leases.owns, limit=settings['PING_MAX_CONCURRENCY']))
+                if requested:
+                    await check_hosts(requested, scheduler, inventory.macs, on_demand=True)
+
+                due = scheduler.pop_due()
+                if due:
+                    await check_hosts(due, scheduler, inventory.macs)
+                status_writer.flush_if_due()
+
+                history_recorder.flush_if_due()
+                rtt_recorder.flush_if_due()
+
+                if time.monotonic() >= next_prune:
+                    prune_expired_statuses()
+                    prune_history(settings['PING_HISTORY_RETENTION_DAYS'])
+                    next_prune = time.monotonic() + settings['PING_STATUS_PRUNE_INTERVAL']
+
+                # Sleep until the next host is due, but wake up regularly for fast and on-demand probe requests
+                delay = settings['PING_TICK']
+                next_due = scheduler.next_due()
+                if next_due is not None:
+                    delay = max(0, min(delay, next_due - time.monotonic()))
+                await _sleep(delay, stop)
+            except Exception as e:
+                logger.error(f"Error in ping service loop: {str(e)}", exc_info=True)
+                await _sleep(5, stop)  # Wait 5 seconds on error before retry
+    finally:
+        # Buffered results would otherwise be lost, and released shards are
+        # taken over at once instead of after PING_LEASE_TTL
+        status_writer.flush()
+        history_recorder.flush()
+        rtt_recorder.flush()
+        leases.release_all()
+        logger.info("Ping service stopped")
+
+def start_ping_service(config=None):
+    """
+    Start the ping service in the background
+
+    Args:
+        config: Optional Flask config mapping with PING_* settings
+    """
+    if config is not None:
+        configure_ping_service(config)
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     loop.create_task(ping_service())
     loop.run_forever()
-
@@ -1,4 +1,4 @@
-from flask import render_template, abort, request, redirect, url_for, flash, jsonify
+from flask import render_template, abort, request, redirect, url_for, flash, jsonify, current_app
 from app.models import Host, WolLog, db_session
 from datetime import datetime
 from app.utils import validate_public_access_token
@@ -110,7 +110,7 @@ def wake_host():
     
     # Record start time for response time calculation
     start_time = datetime.now()
-    success = send_magic_packet(host.mac_address)
+    success = send_magic_packet(host.mac_address, interface=current_app.config.get('WOL_INTERFACE'))
     end_time = datetime.now()
     
     # Calculate response time in milliseconds
@@ -130,6 +130,9 @@ def wake_host():
         if success:
             # Update the last wake time
             host.last_wake_time = start_time
+            # Have the ping service watch the host closely while it boots
+            from app.ping_service import request_fast_probe
+            request_fast_probe([host.id])
             access_logger.info(
                 "Public wake succeeded: host_id=%s host_name=%s response_time_ms=%s ip=%s",
                 host.id,
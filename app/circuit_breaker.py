@@ -0,0 +1,123 @@
+"""
+Circuit breaker for calls to a shared backend such as Redis.
+
+After failure_threshold consecutive failed or slow calls the breaker
+opens and callers skip the backend for reset_timeout seconds, serving a
+fallback instead of each waiting for a socket timeout. Then a single
+trial call is let through (half-open): success closes the breaker again,
+failure keeps it open for another reset_timeout.
+"""
+
+import threading
+import time
+from app.logging_config import get_logger
+
+logger = get_logger('app.circuit_breaker')
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure breaker with half-open trial calls."""
+
+    def __init__(self, name, failure_threshold=3, slow_call_threshold=0.25, reset_timeout=10.0,
+                 clock=time.monotonic):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Name used in log messages
+            failure_threshold: Consecutive failed or slow calls that open the breaker (default: 3)
+            slow_call_threshold: Seconds after which a successful call counts as failed (default: 0.25)
+            reset_timeout: Seconds the breaker stays open before a trial call (default: 10)
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, slow_call_threshold=None, reset_timeout=None):
+        """Change the thresholds, e.g. from the Flask config."""
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = max(1, int(failure_threshold))
+            if slow_call_threshold is not None:
+                self.slow_call_threshold = float(slow_call_threshold)
+            if reset_timeout is not None:
+                self.reset_timeout = float(reset_timeout)
+
+    @property
+    def is_open(self):
+        """True while calls are being skipped (a trial call may be in flight)."""
+        return self.state != CLOSED
+
+    def allow(self):
+        """
+        Decide whether a call may go to the backend.
+
+        Every allowed call must be followed by record_success() or
+        record_failure().
+
+        Returns:
+            bool: False while the breaker is open and no trial call is due
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+            elif self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout:
+                return False  # Another caller's trial is still running
+            self._trial_started_at = now
+            logger.info("Circuit breaker half-open, trying a call: name=%s", self.name)
+            return True
+
+    def record_success(self, elapsed=0.0):
+        """
+        Report a call that returned.
+
+        Args:
+            elapsed: Seconds the call took; slow calls count as failures
+        """
+        if elapsed > self.slow_call_threshold:
+            self.record_failure(f"slow call ({elapsed * 1000:.0f} ms)")
+            return
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._trial_started_at = None
+                logger.warning("Circuit breaker closed: name=%s", self.name)
+
+    def record_failure(self, reason=None):
+        """
+        Report a failed call.
+
+        Args:
+            reason: Short description for the log
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                if self.state == CLOSED:
+                    self.trips += 1
+                self.state = OPEN
+                self._opened_at = self.clock()
+                self._trial_started_at = None
+                logger.warning(
+                    "Circuit breaker open: name=%s failures=%s reason=%s retry_in=%ss",
+                    self.name, self._failures, reason, self.reset_timeout
+                )
@@ -24,6 +24,65 @@ class Config:
     WOL_PORT = 9  # Standard WoL port
     WOL_BROADCAST_PORT = 9  # Port for broadcasting magic packets
     WOL_TIMEOUT = 5  # Timeout for WoL operations in seconds
+    WOL_INTERFACE = os.environ.get('WOL_INTERFACE') or None  # Network interface magic packets are sent from (default: routing decides)
+    WAKE_RATE_LIMIT = int(os.environ.get('WAKE_RATE_LIMIT', 10))  # Wake attempts per user within WAKE_RATE_WINDOW
+    WAKE_RATE_WINDOW = int(os.environ.get('WAKE_RATE_WINDOW', 300))  # Rate limit window in seconds
+    WAKE_RATE_LIMITS_BY_ROLE = os.environ.get('WAKE_RATE_LIMITS_BY_ROLE', '')  # Per-role limits as "admin=0,operators=50" (0 = unlimited)
+    WAKE_RATE_LIMITS_BY_USER = os.environ.get('WAKE_RATE_LIMITS_BY_USER', '')  # Per-username limits, same format; win over role limits
+    WAKE_QUEUE_ENABLED = os.environ.get('WAKE_QUEUE_ENABLED', 'True') == 'True'  # Queue wake requests for sender workers (202 + job ID) instead of sending in the request
+    WAKE_SENDER_IN_PROCESS = os.environ.get('WAKE_SENDER_IN_PROCESS', 'True') == 'True'  # Run a sender thread in the web process; False leaves the queue to app.wake_worker
+    WAKE_SENDER_THREADS = int(os.environ.get('WAKE_SENDER_THREADS', 1))  # Sender threads per process
+    WAKE_SENDER_BATCH = int(os.environ.get('WAKE_SENDER_BATCH', 50))  # Jobs a sender reads from the queue at once
+    WAKE_JOB_TTL = int(os.environ.get('WAKE_JOB_TTL', 3600))  # Seconds a job's status stays queryable
+    WAKE_JOB_MAX_AGE = int(os.environ.get('WAKE_JOB_MAX_AGE', 120))  # Seconds a queued job may wait before it is failed instead of sent
+    WAKE_JOB_CLAIM_IDLE = int(os.environ.get('WAKE_JOB_CLAIM_IDLE', 30))  # Seconds before a job of a stalled sender is taken over
+    WAKE_SCHEDULER_ENABLED = os.environ.get('WAKE_SCHEDULER_ENABLED', 'True') == 'True'  # Fire wake schedules from this process (one leader fires across all processes)
+    WAKE_SCHEDULE_TIMEZONE = os.environ.get('WAKE_SCHEDULE_TIMEZONE', 'UTC')  # Time zone cron expressions of wake schedules are evaluated in
+    WAKE_SCHEDULE_REFRESH = int(os.environ.get('WAKE_SCHEDULE_REFRESH', 10))  # Seconds between checks for changed schedules
+
+    # Ping service settings
+    PING_MODE = os.environ.get('PING_MODE', 'auto')  # auto, icmp or subprocess
+    PING_IN_PROCESS = os.environ.get('PING_IN_PROCESS', 'True') == 'True'  # Run the ping service as a thread of the web process; False leaves it to app.ping_worker
+    PING_TIMEOUT = int(os.environ.get('PING_TIMEOUT', 2))  # Seconds to wait for an echo reply
+    PING_MAX_CONCURRENCY = int(os.environ.get('PING_MAX_CONCURRENCY', 256))  # Probes in flight at once
+    PING_CYCLE_DEADLINE = int(os.environ.get('PING_CYCLE_DEADLINE', 25))  # Hard limit per cycle in seconds
+    PING_INTERVAL = int(os.environ.get('PING_INTERVAL', 30))  # Steady-state probe interval; stable hosts back off from it, changes re-probe after PING_FAST_INTERVAL
+    PING_MAX_INTERVAL = int(os.environ.get('PING_MAX_INTERVAL', 300))  # Interval stable hosts back off to
+    PING_BACKOFF = float(os.environ.get('PING_BACKOFF', 1.5))  # Interval growth per unchanged result
+    PING_FAST_INTERVAL = int(os.environ.get('PING_FAST_INTERVAL', 5))  # Re-probe delay after a change or wake
+    PING_WAKE_WINDOW = int(os.environ.get('PING_WAKE_WINDOW', 120))  # Seconds of fast probing after a wake
+    PING_SPREAD = os.environ.get('PING_SPREAD', 'True') == 'True'  # Spread probes evenly over PING_INTERVAL by host phase
+    PING_API_PROBE_WINDOW = int(os.environ.get('PING_API_PROBE_WINDOW', 60))  # Seconds /api/ping requests for a host share one live probe
+    PING_CONFIRM_OFFLINE = int(os.environ.get('PING_CONFIRM_OFFLINE', 3))  # Consecutive failed probes before a host is marked offline
+    PING_CONFIRM_ONLINE = int(os.environ.get('PING_CONFIRM_ONLINE', 1))  # Consecutive answered probes before a host is marked online
+    PING_STATUS_HEARTBEAT = int(os.environ.get('PING_STATUS_HEARTBEAT', 120))  # Seconds between rewrites of an unchanged status
+    PING_INVENTORY_REFRESH = int(os.environ.get('PING_INVENTORY_REFRESH', 30))  # Seconds between host inventory version checks
+    PING_INVENTORY_FULL_RELOAD = int(os.environ.get('PING_INVENTORY_FULL_RELOAD', 3600))  # Seconds between full host list reloads
+    PING_NEIGHBOR_PREPASS = os.environ.get('PING_NEIGHBOR_PREPASS', 'True') == 'True'  # Trust REACHABLE ARP entries instead of probing
+    PING_SHARDS = int(os.environ.get('PING_SHARDS', 16))  # Host ID shards leased to ping workers
+    PING_LEASE_TTL = int(os.environ.get('PING_LEASE_TTL', 15))  # Seconds before a dead worker's shards are taken over
+    PING_TICK = float(os.environ.get('PING_TICK', 1))  # Max sleep of the scheduler loop
+    PING_WRITE_BATCH_SIZE = int(os.environ.get('PING_WRITE_BATCH_SIZE', 500))  # Status writes per Redis pipeline
+    PING_WRITE_BATCH_WINDOW = float(os.environ.get('PING_WRITE_BATCH_WINDOW', 0.5))  # Max seconds a write is buffered
+    PING_STATUS_PRUNE_INTERVAL = int(os.environ.get('PING_STATUS_PRUNE_INTERVAL', 600))  # Seconds between status store and history cleanups
+    PING_HISTORY_FLUSH_INTERVAL = float(os.environ.get('PING_HISTORY_FLUSH_INTERVAL', 5))  # Seconds between status history writes
+    PING_LAST_SEEN_INTERVAL = int(os.environ.get('PING_LAST_SEEN_INTERVAL', 300))  # Seconds between last_seen writes for hosts that stay online
+    PING_HISTORY_RETENTION_DAYS = int(os.environ.get('PING_HISTORY_RETENTION_DAYS', 90))  # Days of status history kept
+    PING_RTT_FLUSH_INTERVAL = float(os.environ.get('PING_RTT_FLUSH_INTERVAL', 10))  # Seconds between RTT archive writes
+    STATUS_STREAM_HEARTBEAT = int(os.environ.get('STATUS_STREAM_HEARTBEAT', 15))  # Seconds between SSE keepalive comments
+    STATUS_STREAM_MAX_AGE = int(os.environ.get('STATUS_STREAM_MAX_AGE', 300))  # Seconds before an SSE stream is recycled
+    
+    # Host status store: 'keys' (one Redis key per host) or 'hash' (sharded hashes)
+    # Existing entries move over with 'python manage.py status-store-migrate --to <layout>'
+    STATUS_STORE_LAYOUT = os.environ.get('STATUS_STORE_LAYOUT', 'hash')
+    STATUS_HASH_SHARD_SIZE = int(os.environ.get('STATUS_HASH_SHARD_SIZE', 128))  # Host IDs per hash shard (<= 128 keeps compact shards as Redis listpacks)
+    STATUS_ENCODING = os.environ.get('STATUS_ENCODING', 'compact')  # Status payloads written as 'compact' text or 'json'; both are read
+    STATUS_PRIME_TTL = int(os.environ.get('STATUS_PRIME_TTL', 300))  # Seconds a last known status primed on startup is served
+    STATUS_CACHE_SIZE = int(os.environ.get('STATUS_CACHE_SIZE', 10000))  # Last known statuses kept in process for Redis outages
+    REDIS_STATUS_TIMEOUT = float(os.environ.get('REDIS_STATUS_TIMEOUT', 0.5))  # Socket timeout in seconds for status reads
+    REDIS_BREAKER_FAILURES = int(os.environ.get('REDIS_BREAKER_FAILURES', 3))  # Consecutive failed or slow status reads that open the breaker
+    REDIS_BREAKER_SLOW_CALL = float(os.environ.get('REDIS_BREAKER_SLOW_CALL', 0.25))  # Seconds after which a status read counts as failed
+    REDIS_BREAKER_RESET = float(os.environ.get('REDIS_BREAKER_RESET', 10))  # Seconds cached statuses are served before Redis is retried
     
     
     # Pagination
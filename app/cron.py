@@ -0,0 +1,150 @@
+"""
+Cron expressions for wake schedules.
+
+Standard five fields: minute, hour, day of month, month, day of week.
+Each field takes "*", numbers, ranges ("1-5"), steps ("*/15", "8-18/2"),
+comma separated lists of those, and for months and weekdays also names
+("jan", "mon-fri"). Day of week 0 and 7 both mean Sunday. As in cron,
+when both day fields are restricted a day matching either one fires.
+
+next_after() jumps field by field (month, day, hour, minute) instead of
+stepping through every minute, so finding the next fire time costs a few
+dozen iterations even for yearly schedules.
+"""
+
+from datetime import datetime, timedelta
+
+_MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+_DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# (name, lowest value, highest value, names for lowest value upwards)
+_FIELDS = [
+    ('minute', 0, 59, None),
+    ('hour', 0, 23, None),
+    ('day of month', 1, 31, None),
+    ('month', 1, 12, _MONTH_NAMES),
+    ('day of week', 0, 7, _DAY_NAMES),
+]
+
+# Years searched before an expression is considered to never fire (e.g. "0 0 30 2 *")
+_SEARCH_YEARS = 5
+
+
+def _parse_value(text, low, names):
+    text = text.strip().lower()
+    if names and text in names:
+        return low + names.index(text)
+    return int(text)
+
+
+def _parse_field(text, name, low, high, names):
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in {name} field: {text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            first, _, last = part.partition('-')
+            start, end = _parse_value(first, low, names), _parse_value(last, low, names)
+        else:
+            start = _parse_value(part, low, names)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Value out of range in {name} field: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """Parsed five-field cron expression."""
+
+    def __init__(self, expression):
+        """
+        Parse an expression.
+
+        Args:
+            expression: Cron expression, e.g. "30 7 * * mon-fri"
+
+        Raises:
+            ValueError: If the expression is malformed
+        """
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron expression must have 5 fields: minute hour day month weekday")
+        try:
+            fields = [_parse_field(text, *spec) for text, spec in zip(parts, _FIELDS)]
+        except ValueError as e:
+            if 'field' in str(e):
+                raise
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self.expression = expression
+        self.minutes = sorted(fields[0])
+        self.hours = sorted(fields[1])
+        self.days = fields[2]
+        self.months = fields[3]
+        self.weekdays = {day % 7 for day in fields[4]}
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    def __repr__(self):
+        return f'<CronExpression {self.expression}>'
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        # datetime.weekday() counts from Monday, cron from Sunday
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment):
+        """
+        Get the first fire time strictly after a moment.
+
+        Args:
+            moment: datetime, naive or timezone-aware; the result has the same tzinfo
+
+        Returns:
+            datetime: Next fire time, or None if the expression never fires
+        """
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + _SEARCH_YEARS
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                hour = next((hour for hour in self.hours if hour > moment.hour), None)
+                if hour is None:
+                    moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                else:
+                    moment = moment.replace(hour=hour, minute=0)
+                continue
+            minute = next((minute for minute in self.minutes if minute >= moment.minute), None)
+            if minute is None:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            return moment.replace(minute=minute)
+        return None
+
+
+def validate_cron(expression):
+    """
+    Check an expression, e.g. in a form or API handler.
+
+    Returns:
+        str: Error message, or None if the expression is valid and fires at least once
+    """
+    try:
+        if CronExpression(expression).next_after(datetime.utcnow()) is None:
+            return "Cron expression never fires"
+    except ValueError as e:
+        return str(e)
+    return None
@@ -42,6 +42,16 @@ class HostForm(FlaskForm):
         Optional(),
         Length(max=255, message='Description must be less than 255 characters')
     ])
+    probe_strategy = SelectField('Status Check', choices=[
+        ('icmp', 'ICMP ping'),
+        ('tcp', 'TCP connect'),
+        ('udp', 'UDP'),
+        ('any', 'ICMP ping or TCP connect')
+    ], default='icmp')
+    probe_ports = StringField('Probe Ports', validators=[
+        Optional(),
+        Regexp(r'^\d{1,5}(\s*,\s*\d{1,5})*$', message='Enter ports as a comma separated list, e.g. 22, 3389')
+    ])
     visible_to_roles = SelectMultipleField('Visible to Roles', choices=[], coerce=int)
     public_access = BooleanField('Enable Public Access',
         description='WARNING: This will create a public URL that anyone can use to view basic host information. Only enable this if you understand the security implications.')
@@ -59,6 +69,14 @@ class HostForm(FlaskForm):
             except ValueError:
                 raise ValidationError('Invalid IP address format')
 
+    def validate_probe_ports(self, field):
+        if field.data:
+            from app.probe_strategies import parse_ports
+            try:
+                parse_ports(field.data)
+            except ValueError:
+                raise ValidationError('Ports must be between 1 and 65535')
+
 class WakeForm(FlaskForm):
     host_id = HiddenField('Host ID', validators=[DataRequired()])
     submit = SubmitField('Wake Host')
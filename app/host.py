@@ -1,11 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, Response
 from flask_login import login_required, current_user
 from sqlalchemy import desc, or_
 from app import db_session
 from app.models import Host, Role, Permission
+from app.host_inventory import publish_host_change
+from app.probe_strategies import probe_spec
+from app.rtt_history import clear_rtt_history, read_rtt_series
 from app.forms import HostForm
 from flask_wtf import FlaskForm
 import re
+import json
+import time
+import math
+from datetime import datetime, timedelta, timezone
 from app.logging_config import get_logger
 
 # Create module-level logger
@@ -247,6 +254,8 @@ def add_host():
             mac_address=form.mac_address.data,
             ip=form.ip_address.data if form.ip_address.data else '',
             description=form.description.data if form.description.data else '',
+            probe_strategy=form.probe_strategy.data,
+            probe_ports=form.probe_ports.data.strip() if form.probe_ports.data else None,
             created_by=current_user.id,
             visible_to_roles=visible_roles,
             public_access=form.public_access.data,
@@ -255,6 +264,10 @@ def add_host():
         try:
             db_session.add(new_host)
             db_session.commit()
+            publish_host_change(
+                'upsert', new_host.id, new_host.ip,
+                probe_spec(new_host.probe_strategy, new_host.probe_ports), new_host.mac_address
+            )
             logger.info(
                 "Host created: host_name=%s mac=%s user=%s user_id=%s",
                 form.name.data,
@@ -320,6 +333,8 @@ def edit_host(host_id):
         form.mac_address.data = host.mac_address
         form.ip_address.data = host.ip
         form.description.data = host.description
+        form.probe_strategy.data = host.probe_strategy or 'icmp'
+        form.probe_ports.data = host.probe_ports
         if hasattr(form, 'public_access'):
             form.public_access.data = host.public_access
         if host.visible_to_roles:
@@ -334,6 +349,8 @@ def edit_host(host_id):
             host.mac_address = form.mac_address.data
             host.ip = form.ip_address.data if form.ip_address.data else ''
             host.description = form.description.data if form.description.data else ''
+            host.probe_strategy = form.probe_strategy.data
+            host.probe_ports = form.probe_ports.data.strip() if form.probe_ports.data else None
             host.visible_to_roles = [str(role_id) for role_id in form.visible_to_roles.data]
             
             # Handle public access
@@ -360,6 +377,10 @@ def edit_host(host_id):
                     )
             
             db_session.commit()
+            publish_host_change(
+                'upsert', host.id, host.ip,
+                probe_spec(host.probe_strategy, host.probe_ports), host.mac_address
+            )
             logger.info(
                 "Host updated: host_id=%s host_name=%s user=%s user_id=%s",
                 host.id,
@@ -438,6 +459,8 @@ def delete_host(host_id):
         db_session.delete(host)
         db_session.flush()  # Force the delete to be executed
         db_session.commit()
+        publish_host_change('delete', host_id)
+        clear_rtt_history(host_id)
         
         # Verify deletion was successful
         verification = db_session.query(Host).filter_by(id=host_id).first()
@@ -560,7 +583,14 @@ def utility_processor():
 @host.route('/api/status')
 @login_required
 def get_host_statuses():
-    """Get status of all hosts from Redis"""
+    """
+    Get status of all hosts from Redis
+
+    Entries carry the last probe's ``rtt_ms`` when known. Statuses loaded
+    from the database on startup and not yet confirmed by a probe carry
+    ``stale: true`` and ``last_seen``. With ``?latency=1`` each entry also
+    gets the min/avg/max RTT of the last hour as ``latency``.
+    """
     try:
         # Get hosts based on user permissions
         if current_user.is_admin:
@@ -593,6 +623,16 @@ def get_host_statuses():
                 for host in hosts
             ]
         }
+        for entry in response_data["statuses"]:
+            status = statuses[entry["host_id"]]
+            for field in ("rtt_ms", "stale", "last_seen"):
+                if status.get(field) is not None:
+                    entry[field] = status[field]
+        if request.args.get('latency') in ('1', 'true'):
+            from app.rtt_history import summarize_rtt
+            latencies = summarize_rtt(host_ids)
+            for entry in response_data["statuses"]:
+                entry["latency"] = latencies[entry["host_id"]]
         logger.debug("Host status API response prepared: user_id=%s host_count=%s", current_user.id, len(response_data["statuses"]))
         
         return jsonify(response_data)
@@ -600,3 +640,242 @@ def get_host_statuses():
     except Exception as e:
         logger.error(f"Error getting host statuses: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
+
+@host.route('/api/status/stream')
+@login_required
+def stream_host_statuses():
+    """Stream host status transitions (and the user's wake job outcomes) as Server-Sent Events"""
+    from app.status_events import get_status_event_hub
+
+    # Visibility is resolved once; the stream is closed periodically so
+    # the browser reconnects and picks up permission changes
+    if current_user.is_admin:
+        visible_ids = None
+    else:
+        visible_ids = {h.id for h in db_session.query(Host).all() if h.is_visible_to_user(current_user)}
+    user_id = current_user.id
+    # Do not hold a database connection for the lifetime of the stream
+    db_session.remove()
+
+    hub = get_status_event_hub()
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or hub.latest_id()
+    heartbeat = current_app.config.get('STATUS_STREAM_HEARTBEAT', 15)
+    max_age = current_app.config.get('STATUS_STREAM_MAX_AGE', 300)
+    logger.debug("Host status stream opened: user_id=%s last_event_id=%s", user_id, last_id)
+
+    def generate(last_id):
+        closes_at = time.monotonic() + max_age
+        yield "retry: 3000\n\n"
+        while time.monotonic() < closes_at:
+            events = hub.wait_for_events(last_id, heartbeat)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            skipped = None
+            for event_id, event in events:
+                last_id = event_id
+                if event.get("type") == "wake_job":
+                    # Outcome of a queued wake, only for the user who queued it
+                    if event.get("user_id") != user_id:
+                        skipped = event_id
+                        continue
+                    skipped = None
+                    yield f"id: {event_id}\nevent: wake_job\ndata: {json.dumps(event)}\n\n"
+                    continue
+                if visible_ids is not None and event.get("host_id") not in visible_ids:
+                    skipped = event_id
+                    continue
+                skipped = None
+                yield f"id: {event_id}\nevent: status\ndata: {json.dumps(event)}\n\n"
+            if skipped:
+                # Advance the client's Last-Event-ID past events it may not see
+                yield f"id: {skipped}\n\n"
+        logger.debug("Host status stream closed: user_id=%s last_event_id=%s", user_id, last_id)
+
+    return Response(
+        generate(last_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Longest a probe request may wait for results
+MAX_PROBE_WAIT = 10
+
+@host.route('/api/probe', methods=['POST'])
+@login_required
+def probe_hosts():
+    """
+    Ask the ping service to check hosts now
+
+    Expects JSON ``{"host_ids": [...], "wait": seconds}``. Hosts are queued
+    ahead of scheduled probes; repeated requests for a host within a few
+    seconds share one probe. Results arrive on the status stream as events
+    with ``on_demand`` set. With ``wait`` (at most MAX_PROBE_WAIT seconds)
+    the request long-polls for them and returns the refreshed statuses.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        host_ids = {int(host_id) for host_id in data.get('host_ids') or []}
+        wait = float(data.get('wait') or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "host_ids must be a list of host IDs and wait a number of seconds"}), 400
+    if not math.isfinite(wait):
+        # JSON parsers accept NaN and Infinity, which min()/max() pass through
+        return jsonify({"error": "wait must be a finite number of seconds"}), 400
+    wait = min(max(wait, 0), MAX_PROBE_WAIT)
+    if not host_ids:
+        return jsonify({"error": "No hosts given"}), 400
+
+    hosts = db_session.query(Host).filter(Host.id.in_(host_ids)).all()
+    visible = [h.id for h in hosts if current_user.is_admin or h.is_visible_to_user(current_user)]
+    user_id = current_user.id
+    db_session.remove()
+    if not visible:
+        return jsonify({"error": "Host not found"}), 404
+
+    from app.ping_service import request_probe, get_all_host_statuses
+    from app.status_events import get_status_event_hub, wait_for_probe_results
+    hub = get_status_event_hub() if wait else None
+    # Taken before queueing so no result can slip past the wait below
+    last_id = hub.latest_id() if hub else None
+    requested = request_probe(visible)
+    if requested is None:
+        return jsonify({"error": "Status service unavailable"}), 503
+    queued, collapsed = requested
+    logger.debug("Probe requested via API: user_id=%s queued=%s collapsed=%s wait=%s", user_id, len(queued), len(collapsed), wait)
+
+    probed = wait_for_probe_results(visible, last_id, wait, hub) if hub else set()
+
+    statuses = get_all_host_statuses(visible)
+    return jsonify({
+        "queued": queued,
+        "collapsed": collapsed,
+        "probed": sorted(probed),
+        "statuses": [dict(statuses[host_id], host_id=host_id) for host_id in visible]
+    }), 200 if len(probed) == len(visible) else 202
+
+# Longest window the uptime endpoints accept
+MAX_UPTIME_WINDOW = timedelta(days=366)
+
+def _parse_utc(value):
+    """Parse an ISO timestamp into a naive UTC datetime (naive input is taken as UTC)."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        try:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        except OverflowError:
+            raise ValueError(f"timestamp out of range: {value}")
+    return parsed
+
+def _parse_uptime_window():
+    """
+    Read the uptime window from the query string.
+
+    Either ``start``/``end`` as ISO timestamps (UTC, ``end`` defaults to now)
+    or ``hours`` back from now (default: 24).
+
+    Returns:
+        tuple: (start, end) as naive UTC datetimes
+
+    Raises:
+        ValueError: If the parameters are malformed or the window is invalid
+    """
+    now = datetime.utcnow()
+    if request.args.get('start'):
+        start = _parse_utc(request.args['start'])
+        end = _parse_utc(request.args['end']) if request.args.get('end') else now
+    else:
+        hours = float(request.args.get('hours', 24))
+        # Checked before building the timedelta, which overflows for inf or huge values
+        if not math.isfinite(hours) or hours <= 0:
+            raise ValueError("hours must be a positive number")
+        if hours * 3600 > MAX_UPTIME_WINDOW.total_seconds():
+            raise ValueError("window must not exceed 366 days")
+        end = now
+        start = end - timedelta(hours=hours)
+    if start >= end:
+        raise ValueError("start must be before end")
+    if end - start > MAX_UPTIME_WINDOW:
+        raise ValueError("window must not exceed 366 days")
+    return start, end
+
+@host.route('/api/uptime')
+@login_required
+def get_host_uptimes():
+    """Uptime, transition counts and last change of all visible hosts over a window"""
+    try:
+        start, end = _parse_uptime_window()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid window: {str(e)}"}), 400
+
+    try:
+        if current_user.is_admin:
+            hosts = db_session.query(Host.id, Host.name).all()
+        else:
+            hosts = [(h.id, h.name) for h in db_session.query(Host).all() if h.is_visible_to_user(current_user)]
+
+        from app.status_history import compute_uptime
+        uptimes = compute_uptime([host_id for host_id, _ in hosts], start, end)
+        logger.debug("Uptime API response prepared: user_id=%s host_count=%s", current_user.id, len(hosts))
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "hosts": [dict(uptimes[host_id], host_id=host_id, name=name) for host_id, name in hosts]
+        })
+    except Exception as e:
+        logger.error(f"Error computing host uptimes: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@host.route('/api/<int:host_id>/uptime')
+@login_required
+def get_host_uptime(host_id):
+    """Uptime, transition count and last change of one host over a window"""
+    host = db_session.query(Host).get(host_id)
+    if not host:
+        return jsonify({"error": "Host not found"}), 404
+    if not host.is_visible_to_user(current_user):
+        access_logger.warning(f"Permission denied: User {current_user.username} (id: {current_user.id}) attempted to read uptime of host {host.id} without permission")
+        return jsonify({"error": "Permission denied"}), 403
+
+    try:
+        start, end = _parse_uptime_window()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid window: {str(e)}"}), 400
+
+    from app.status_history import compute_uptime
+    uptime = compute_uptime([host.id], start, end)[host.id]
+    return jsonify(dict(uptime, host_id=host.id, name=host.name, start=start.isoformat(), end=end.isoformat()))
+
+@host.route('/api/<int:host_id>/latency')
+@login_required
+def get_host_latency(host_id):
+    """
+    RTT series of one host for charts.
+
+    Takes the same window parameters as the uptime endpoints. The series
+    comes from the finest archive that still covers the window: 1-minute
+    buckets for up to a day, 5-minute buckets for up to a week, hourly
+    buckets beyond that.
+    """
+    host = db_session.query(Host).get(host_id)
+    if not host:
+        return jsonify({"error": "Host not found"}), 404
+    if not host.is_visible_to_user(current_user):
+        access_logger.warning(f"Permission denied: User {current_user.username} (id: {current_user.id}) attempted to read latency of host {host.id} without permission")
+        return jsonify({"error": "Permission denied"}), 403
+
+    try:
+        start, end = _parse_uptime_window()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid window: {str(e)}"}), 400
+
+    try:
+        series = read_rtt_series(
+            host.id,
+            start.replace(tzinfo=timezone.utc).timestamp(),
+            end.replace(tzinfo=timezone.utc).timestamp()
+        )
+    except Exception as e:
+        logger.error(f"Error reading latency of host {host.id}: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(series, host_id=host.id, name=host.name, start=start.isoformat(), end=end.isoformat()))
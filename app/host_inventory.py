@@ -0,0 +1,207 @@
+"""
+Host inventory snapshot for the ping worker.
+
+The worker only needs the ID, addresses and probe of every host. Rather
+than loading full Host objects on a timer, it keeps a compact map
+that is loaded once and then patched from change events which host
+CRUD appends to a Redis stream. A version counter bumped with every
+change is compared periodically as a safety net for missed events.
+"""
+
+import time
+from app import db_session, ping_service
+from app.models import Host
+from app.probe_strategies import probe_spec
+from app.neighbor_table import normalize_mac
+from app.logging_config import get_logger
+
+logger = get_logger('app.host_inventory')
+
+# Redis stream of host changes and the counter bumped with each of them
+HOST_CHANGES_KEY = "hosts:changes"
+HOST_VERSION_KEY = "hosts:version"
+# Approximate number of change events kept; a worker that falls further behind reloads
+HOST_CHANGES_MAXLEN = 1000
+
+# Bumps the version and appends the event in one step, so the event
+# order in the stream always matches the version order
+_PUBLISH_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], '*',
+           'version', version, 'op', ARGV[2], 'host_id', ARGV[3], 'ip', ARGV[4], 'probe', ARGV[5],
+           'mac', ARGV[6])
+return version
+"""
+
+
+def publish_host_change(op, host_id=None, ip=None, probe=None, mac=None):
+    """
+    Tell ping workers that the host inventory changed
+
+    Must be called after the database change has been committed.
+
+    Args:
+        op: "upsert" for an added or edited host, "delete" for a removed
+            host, or "reload" when several hosts changed at once
+        host_id: The ID of the host (not needed for "reload")
+        ip: The host's current IP address (only for "upsert")
+        probe: The host's probe spec, see probe_strategies.probe_spec()
+        mac: The host's MAC address
+
+    Returns:
+        int: The new inventory version, or None if Redis is unavailable
+    """
+    client = ping_service.redis_client
+    if client is None:
+        return None
+    try:
+        version = client.eval(
+            _PUBLISH_SCRIPT, 2, HOST_VERSION_KEY, HOST_CHANGES_KEY,
+            HOST_CHANGES_MAXLEN, op, '' if host_id is None else host_id, ip or '', probe or 'icmp',
+            normalize_mac(mac) or ''
+        )
+        logger.debug("Host change published: op=%s host_id=%s version=%s", op, host_id, version)
+        return int(version)
+    except Exception as e:
+        # Workers still notice the change through their periodic full reload
+        logger.warning("Failed to publish host change: op=%s host_id=%s error=%s", op, host_id, str(e))
+        return None
+
+
+def _load_hosts():
+    """Return (host_id, ip, probe_spec, mac) for every host with an IP address."""
+    try:
+        rows = db_session.query(
+            Host.id, Host.ip, Host.probe_strategy, Host.probe_ports, Host.mac_address
+        ).all()
+        return [
+            (host_id, ip, probe_spec(strategy, ports), normalize_mac(mac))
+            for host_id, ip, strategy, ports, mac in rows if ip
+        ]
+    finally:
+        db_session.remove()
+
+
+def load_host_targets():
+    """Return (host_id, ip, probe_spec) triples for every host with an IP address."""
+    return [row[:3] for row in _load_hosts()]
+
+
+class HostInventory:
+    """Compact id -> (ip, probe) snapshot of the hosts table, kept current from change events."""
+
+    def __init__(self, check_interval=30, full_reload_interval=3600, clock=time.monotonic):
+        """
+        Initialize the snapshot.
+
+        Args:
+            check_interval: Seconds between version comparisons with Redis (default: 30)
+            full_reload_interval: Seconds between unconditional reloads, which also
+                pick up changes made outside the web UI (default: 3600)
+            clock: Monotonic time source
+        """
+        self.check_interval = check_interval
+        self.full_reload_interval = full_reload_interval
+        self.clock = clock
+        self.version = None
+        self.reloads = 0
+        self.events_applied = 0
+        self._targets = {}
+        # host_id -> normalized MAC, for the passive neighbor table check
+        self.macs = {}
+        self._last_event_id = '0-0'
+        self._next_check = 0
+        self._next_reload = 0
+
+    def __len__(self):
+        return len(self._targets)
+
+    def targets(self):
+        """Return (host_id, ip, probe_spec) triples for every host with an IP address."""
+        return [(host_id, ip, probe) for host_id, (ip, probe) in self._targets.items()]
+
+    def refresh(self):
+        """
+        Bring the snapshot up to date.
+
+        Cheap when nothing changed: one XRANGE per call plus a GET every
+        check_interval seconds.
+
+        Returns:
+            bool: True if the set of targets may have changed
+        """
+        now = self.clock()
+        if self.version is None or now >= self._next_reload:
+            self.reload()
+            return True
+
+        client = ping_service.redis_client
+        if client is None:
+            return False
+        try:
+            milliseconds, _, sequence = self._last_event_id.partition('-')
+            entries = client.xrange(HOST_CHANGES_KEY, min='%s-%d' % (milliseconds, int(sequence) + 1))
+            changed = False
+            for event_id, fields in entries:
+                self._last_event_id = event_id
+                version = int(fields['version'])
+                if version <= self.version:
+                    continue  # Already part of the last reload
+                if version != self.version + 1 or fields['op'] == 'reload':
+                    logger.info("Host inventory out of step: local=%s event=%s", self.version, version)
+                    self.reload()
+                    return True
+                self._apply(fields)
+                self.version = version
+                self.events_applied += 1
+                changed = True
+
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                current = int(client.get(HOST_VERSION_KEY) or 0)
+                if current != self.version:
+                    logger.info("Host inventory version mismatch: local=%s redis=%s", self.version, current)
+                    self.reload()
+                    return True
+            return changed
+        except Exception as e:
+            logger.warning("Failed to read host changes: error=%s", str(e))
+            return False
+
+    def reload(self):
+        """Replace the snapshot with a fresh query of the hosts table."""
+        version = 0
+        last_event_id = '0-0'
+        client = ping_service.redis_client
+        if client is not None:
+            try:
+                # Read the position before the query: anything committed later
+                # arrives as an event and is applied on top
+                version = int(client.get(HOST_VERSION_KEY) or 0)
+                newest = client.xrevrange(HOST_CHANGES_KEY, count=1)
+                if newest:
+                    last_event_id = newest[0][0]
+            except Exception as e:
+                logger.warning("Failed to read host inventory version: error=%s", str(e))
+
+        rows = _load_hosts()
+        self._targets = {host_id: (ip, probe) for host_id, ip, probe, _ in rows}
+        self.macs = {host_id: mac for host_id, _, _, mac in rows if mac}
+        self.version = version
+        self._last_event_id = last_event_id
+        self.reloads += 1
+        now = self.clock()
+        self._next_check = now + self.check_interval
+        self._next_reload = now + self.full_reload_interval
+        logger.debug("Host inventory reloaded: hosts=%s version=%s", len(self._targets), version)
+
+    def _apply(self, fields):
+        host_id = int(fields['host_id'])
+        if fields['op'] == 'upsert' and fields.get('ip'):
+            self._targets[host_id] = (fields['ip'], fields.get('probe') or 'icmp')
+            if fields.get('mac'):
+                self.macs[host_id] = fields['mac']
+        else:
+            # Deleted, or edited to have no address
+            self._targets.pop(host_id, None)
+            self.macs.pop(host_id, None)
@@ -0,0 +1,248 @@
+"""
+Asynchronous ICMP echo engine for the ping service.
+
+All probes share one ICMP socket that is registered with the event loop.
+Echo requests are multiplexed by (address, sequence) and every reply
+resolves the future of the matching request, so thousands of hosts can be
+checked concurrently without spawning a process or a thread per probe.
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import time
+
+from app.logging_config import get_logger
+
+logger = get_logger('app.icmp')
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# type, code, checksum, identifier, sequence
+_ICMP_HEADER = struct.Struct('!BBHHH')
+
+
+class IcmpUnavailable(Exception):
+    """Raised when neither a datagram nor a raw ICMP socket can be opened."""
+
+
+def icmp_checksum(data):
+    """
+    Compute the RFC 1071 internet checksum of an ICMP message.
+
+    Args:
+        data (bytes): ICMP header and payload with a zeroed checksum field
+
+    Returns:
+        int: 16-bit one's complement checksum
+    """
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier, sequence, payload):
+    """
+    Build an ICMP echo request packet.
+
+    Args:
+        identifier (int): 16-bit echo identifier
+        sequence (int): 16-bit echo sequence number
+        payload (bytes): Echo payload
+
+    Returns:
+        bytes: Packet ready to be sent
+    """
+    header = _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+    return _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+
+class IcmpProber:
+    """
+    Shared ICMP echo socket bound to one asyncio event loop.
+
+    An unprivileged datagram socket (``SOCK_DGRAM``/``IPPROTO_ICMP``) is
+    preferred; a raw socket is used when the kernel does not allow
+    unprivileged ICMP but the process has ``CAP_NET_RAW``.
+    """
+
+    def __init__(self, loop=None, payload_size=16, rcvbuf=4 * 1024 * 1024):
+        """
+        Initialize the prober.
+
+        Args:
+            loop: Event loop to register the socket with (default: running loop)
+            payload_size: Number of payload bytes per echo request (default: 16)
+            rcvbuf: Requested socket receive buffer size in bytes (default: 4 MiB)
+        """
+        self._loop = loop
+        self._rcvbuf = rcvbuf
+        self._payload = b'WOL-Manager-ping'.ljust(payload_size, b'\x00')[:payload_size]
+        self._sock = None
+        self._raw = False
+        self._identifier = os.getpid() & 0xFFFF
+        self._sequence = 0
+        self._pending = {}
+        self._writable = None
+
+    @property
+    def is_open(self):
+        return self._sock is not None
+
+    @property
+    def in_flight(self):
+        """Number of echo requests still waiting for a reply."""
+        return len(self._pending)
+
+    def open(self):
+        """
+        Open the shared ICMP socket and register it with the event loop.
+
+        Raises:
+            IcmpUnavailable: If no ICMP socket can be created
+        """
+        if self._sock is not None:
+            return
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+
+        errors = []
+        for sock_type, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+            try:
+                sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+            except (OSError, ValueError) as e:
+                errors.append(str(e))
+                continue
+            sock.setblocking(False)
+            try:
+                # Replies to a large batch arrive in a burst; a roomy receive
+                # buffer keeps the kernel from dropping them before we read.
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._rcvbuf)
+            except OSError:
+                pass
+            self._sock = sock
+            self._raw = raw
+            break
+        else:
+            raise IcmpUnavailable("Could not open an ICMP socket: %s" % '; '.join(errors))
+
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        logger.info("ICMP prober opened: socket=%s", 'raw' if self._raw else 'datagram')
+
+    def close(self):
+        """Close the socket and fail every outstanding probe."""
+        if self._sock is None:
+            return
+        try:
+            self._loop.remove_reader(self._sock.fileno())
+            self._loop.remove_writer(self._sock.fileno())
+        except Exception:
+            pass
+        self._sock.close()
+        self._sock = None
+        self._writable.set()
+        for future, _ in self._pending.values():
+            if not future.done():
+                future.set_result(None)
+        self._pending.clear()
+
+    async def ping(self, ip_address, timeout=2):
+        """
+        Send one echo request and wait for the matching reply.
+
+        Args:
+            ip_address: IPv4 address to probe
+            timeout: Seconds to wait for a reply (default: 2)
+
+        Returns:
+            float: Round-trip time in seconds, or None if no reply arrived
+        """
+        if self._sock is None:
+            self.open()
+
+        key = self._next_key(ip_address)
+        if key is None:
+            logger.warning("ICMP sequence space exhausted for %s", ip_address)
+            return None
+
+        future = self._loop.create_future()
+        packet = build_echo_request(self._identifier, key[1], self._payload)
+        sent_at = time.monotonic()
+        self._pending[key] = (future, sent_at)
+        try:
+            if not await self._sendto(packet, ip_address):
+                return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(key, None)
+
+    def _next_key(self, ip_address):
+        for _ in range(0x10000):
+            self._sequence = (self._sequence + 1) & 0xFFFF
+            key = (ip_address, self._sequence)
+            if key not in self._pending:
+                return key
+        return None
+
+    async def _sendto(self, packet, ip_address):
+        while True:
+            try:
+                self._sock.sendto(packet, (ip_address, 0))
+                return True
+            except BlockingIOError:
+                # Socket buffer is full: park until the loop reports it writable
+                if self._writable.is_set():
+                    self._writable.clear()
+                    self._loop.add_writer(self._sock.fileno(), self._on_writable)
+                await self._writable.wait()
+                if self._sock is None:
+                    return False
+            except OSError as e:
+                logger.debug("ICMP send failed for %s: %s", ip_address, str(e))
+                return False
+
+    def _on_writable(self):
+        self._loop.remove_writer(self._sock.fileno())
+        self._writable.set()
+
+    def _on_readable(self):
+        now = time.monotonic()
+        while True:
+            try:
+                data, address = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug("ICMP receive failed: %s", str(e))
+                return
+
+            if self._raw:
+                # Raw sockets deliver the IP header as well
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < _ICMP_HEADER.size:
+                continue
+
+            icmp_type, _, _, identifier, sequence = _ICMP_HEADER.unpack_from(data)
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            # Datagram sockets get their identifier rewritten by the kernel and
+            # only ever see their own replies; raw sockets see every reply.
+            if self._raw and identifier != self._identifier:
+                continue
+
+            entry = self._pending.get((address[0], sequence))
+            if entry is None:
+                continue
+            future, sent_at = entry
+            if not future.done():
+                future.set_result(now - sent_at)
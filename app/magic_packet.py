@@ -0,0 +1,139 @@
+"""
+Magic packet construction and sending over pooled broadcast sockets.
+
+Packets are built once per MAC address and cached; a host whose MAC
+address is edited simply maps to a different cache entry. Sockets are
+created once per (interface, broadcast address), configured with
+SO_BROADCAST (and SO_BINDTODEVICE when an interface is given), and kept
+open for every later wake. sendto() on a UDP socket is safe from several
+threads at once, so request threads share them without locking.
+"""
+
+import socket
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from app.logging_config import get_logger
+
+logger = get_logger('app.magic_packet')
+
+# Linux value, for Python builds that do not expose the constant
+SO_BINDTODEVICE = getattr(socket, 'SO_BINDTODEVICE', 25)
+
+
+def build_magic_packet(mac_address):
+    """
+    Build the magic packet for a MAC address.
+
+    Args:
+        mac_address (str): MAC address of the target device
+
+    Returns:
+        bytes: FF FF FF FF FF FF followed by the MAC repeated 16 times
+
+    Raises:
+        ValueError: If the MAC address is malformed
+    """
+    # Clean the MAC address by removing any separators
+    mac_clean = mac_address.replace(':', '').replace('-', '').replace('.', '')
+
+    # Validate MAC address format
+    if len(mac_clean) != 12:
+        raise ValueError("Invalid MAC address format")
+
+    return b'\xff' * 6 + bytes.fromhex(mac_clean) * 16
+
+
+@lru_cache(maxsize=4096)
+def cached_magic_packet(mac_address):
+    """build_magic_packet() with the result kept per MAC address (invalid MACs are not cached)."""
+    return build_magic_packet(mac_address)
+
+
+class BroadcastSocketPool:
+    """Open SO_BROADCAST UDP sockets keyed by (interface, broadcast address)."""
+
+    def __init__(self, max_sockets=8):
+        """
+        Initialize the pool.
+
+        Args:
+            max_sockets: Sockets kept open; the least recently used is closed beyond that (default: 8)
+        """
+        self.max_sockets = max_sockets
+        self._sockets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sockets)
+
+    def _open(self, interface):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            if interface:
+                sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, interface.encode() + b'\0')
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def get(self, broadcast_ip, interface=None):
+        """
+        Get the socket for a broadcast address, opening it on first use.
+
+        Args:
+            broadcast_ip (str): Broadcast IP address
+            interface (str): Network interface to send from (default: routing decides)
+
+        Returns:
+            socket.socket: Configured UDP socket
+        """
+        key = (interface, broadcast_ip)
+        with self._lock:
+            sock = self._sockets.get(key)
+            if sock is not None:
+                self._sockets.move_to_end(key)
+                return sock
+            sock = self._open(interface)
+            self._sockets[key] = sock
+            while len(self._sockets) > self.max_sockets:
+                _, evicted = self._sockets.popitem(last=False)
+                evicted.close()
+            logger.debug("Broadcast socket opened: interface=%s broadcast_ip=%s", interface, broadcast_ip)
+            return sock
+
+    def discard(self, broadcast_ip, interface=None, sock=None):
+        """Close a pooled socket after an error so the next send opens a fresh one."""
+        key = (interface, broadcast_ip)
+        with self._lock:
+            current = self._sockets.get(key)
+            if current is not None and (sock is None or current is sock):
+                del self._sockets[key]
+                current.close()
+
+    def send(self, packet, broadcast_ip='255.255.255.255', port=9, interface=None):
+        """
+        Send a packet, retrying once on a fresh socket if the pooled one fails.
+
+        Raises:
+            OSError: If the retry fails too
+        """
+        sock = self.get(broadcast_ip, interface)
+        try:
+            sock.sendto(packet, (broadcast_ip, port))
+        except OSError as e:
+            logger.warning("Broadcast socket failed, reopening: broadcast_ip=%s error=%s", broadcast_ip, str(e))
+            self.discard(broadcast_ip, interface, sock)
+            self.get(broadcast_ip, interface).sendto(packet, (broadcast_ip, port))
+
+    def close(self):
+        """Close every pooled socket."""
+        with self._lock:
+            for sock in self._sockets.values():
+                sock.close()
+            self._sockets.clear()
+
+
+# Shared pool used by every wake path of this process
+broadcast_pool = BroadcastSocketPool()
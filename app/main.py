@@ -1,9 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, session, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, session, request, jsonify, current_app
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from sqlalchemy import desc, or_, func, and_
 from datetime import datetime, timedelta
 import os
+import math
 
 from app.models import Host, WolLog
 from app import db_session
@@ -218,12 +219,14 @@ def api_device_status():
         
         # Get real status from ping service
         try:
-            from app.ping_service import get_host_status
+            from app.ping_service import get_all_host_statuses
             
+            # Fetch every status in one round trip instead of one GET per host
+            statuses = get_all_host_statuses([host.id for host in hosts])
             for host in hosts:
                 try:
                     # Get status from the ping service
-                    status_data = get_host_status(host.id)
+                    status_data = statuses[host.id]
                     status = status_data.get('status', 'unknown')
                     
                     if status == 'online':
@@ -414,3 +417,107 @@ def api_device_usage():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+
+
+# Longest a ping request may wait for a live probe
+MAX_PING_WAIT = 10
+
+
+def _ping_wait():
+    """Seconds from ``?wait=``, clamped to MAX_PING_WAIT, or None if it is not a finite number."""
+    wait = request.args.get('wait', 0, type=float)
+    if not math.isfinite(wait):
+        return None
+    return min(max(wait, 0), MAX_PING_WAIT)
+
+
+def _ping_response(hosts, wait):
+    """
+    Serve cached statuses for hosts, probing the ones without a current status.
+
+    Hosts whose status is unknown or stale are queued for a live probe; all
+    requests for a host within PING_API_PROBE_WINDOW seconds share that
+    probe. With ``wait`` (at most MAX_PING_WAIT seconds) the request
+    long-polls for the probes it queued.
+    """
+    from app.ping_service import get_host_statuses_or_probe, get_all_host_statuses
+
+    host_ids = [h.id for h in hosts]
+    addresses = {h.id: h.ip for h in hosts}
+    db_session.remove()
+
+    hub = None
+    last_id = None
+    if wait:
+        from app.status_events import get_status_event_hub
+        hub = get_status_event_hub()
+        # Taken before queueing so no result can slip past the wait below
+        last_id = hub.latest_id()
+
+    statuses, probing = get_host_statuses_or_probe(host_ids, current_app.config['PING_API_PROBE_WINDOW'])
+    if probing and hub:
+        from app.status_events import wait_for_probe_results
+        probed = wait_for_probe_results(probing, last_id, wait, hub)
+        if probed:
+            statuses.update(get_all_host_statuses(sorted(probed)))
+            probing = [host_id for host_id in probing if host_id not in probed]
+
+    probing = set(probing)
+    return [
+        dict(
+            statuses[host_id],
+            host_id=host_id,
+            ip=addresses[host_id],
+            online=statuses[host_id]['status'] == 'online',
+            probing=host_id in probing
+        )
+        for host_id in host_ids
+    ]
+
+
+@main.route('/api/ping/<ip>')
+def api_ping_ip(ip):
+    """Status of the hosts with the given IP address that the user can see."""
+    if not current_user.is_authenticated:
+        access_logger.warning("Unauthorized access to API endpoint: /api/ping/<ip>")
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    wait = _ping_wait()
+    if wait is None:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    hosts = db_session.query(Host).filter(Host.ip == ip).order_by(Host.id).all()
+    hosts = [h for h in hosts if h.is_visible_to_user(current_user)]
+    if not hosts:
+        db_session.remove()
+        return jsonify({'error': 'Host not found'}), 404
+
+    results = _ping_response(hosts, wait)
+    # Several hosts may share an address (e.g. behind one NAT); the first one answers
+    return jsonify(dict(results[0], hosts=results))
+
+
+@main.route('/api/ping')
+def api_ping():
+    """Batched status for ``?host_ids=1,2,3``; hosts the user cannot see are left out."""
+    if not current_user.is_authenticated:
+        access_logger.warning("Unauthorized access to API endpoint: /api/ping")
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        host_ids = {int(host_id) for host_id in request.args.get('host_ids', '').split(',') if host_id.strip()}
+    except ValueError:
+        return jsonify({'error': 'host_ids must be a comma separated list of host IDs'}), 400
+    if not host_ids:
+        return jsonify({'error': 'No hosts given'}), 400
+    wait = _ping_wait()
+    if wait is None:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    hosts = db_session.query(Host).filter(Host.id.in_(host_ids)).order_by(Host.id).all()
+    hosts = [h for h in hosts if h.is_visible_to_user(current_user)]
+    if not hosts:
+        db_session.remove()
+        return jsonify({'hosts': []})
+
+    return jsonify({'hosts': _ping_response(hosts, wait)})
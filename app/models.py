@@ -1,6 +1,6 @@
 from datetime import datetime
 import re
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Table
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Table, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.dialects.postgresql import JSON
@@ -69,6 +69,7 @@ class Role(Base):
     # Relationships
     permissions = relationship('Permission', secondary=role_permissions, back_populates='roles')
     users = relationship('User', secondary=user_roles, back_populates='roles')
+    wake_schedules = relationship('WakeSchedule', back_populates='role', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Role {self.name}>'
@@ -94,6 +95,7 @@ class User(Base, UserMixin):
     hosts = relationship('Host', back_populates='created_by_user', cascade="all, delete-orphan")
     roles = relationship('Role', secondary=user_roles, back_populates='users')
     wol_logs = relationship('WolLog', back_populates='user')
+    wake_schedules = relationship('WakeSchedule', back_populates='created_by_user', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -142,10 +144,16 @@ class Host(Base):
     public_access = Column(Boolean, default=False, nullable=False)
     public_access_token = Column(String(64), unique=True, nullable=True)
     last_wake_time = Column(DateTime, nullable=True)
+    probe_strategy = Column(String(16), default='icmp', nullable=True)  # icmp, tcp, udp or any (ICMP or TCP)
+    probe_ports = Column(String(64), nullable=True)  # Comma separated ports for tcp/udp/any probes
+    last_status = Column(String(8), nullable=True)  # Last confirmed status, written on transitions only
+    last_seen = Column(DateTime, nullable=True)  # Last time the host was seen online
     
     # Relationships
     created_by_user = relationship('User', back_populates='hosts')
     wol_logs = relationship('WolLog', back_populates='device', cascade="all, delete-orphan")
+    status_intervals = relationship('HostStatusInterval', back_populates='host', cascade="all, delete-orphan")
+    wake_schedules = relationship('WakeSchedule', back_populates='host', cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Host {self.name} ({self.mac_address})>'
@@ -198,6 +206,49 @@ class WolLog(Base):
     def __repr__(self):
         return f'<WolLog {self.device_id} - {"success" if self.success else "failed"} at {self.timestamp}>'
 
+class HostStatusInterval(Base):
+    """Run of identical status observations for a host (run-length encoded history)"""
+    __tablename__ = 'host_status_intervals'
+    
+    id = Column(Integer, primary_key=True)
+    host_id = Column(Integer, ForeignKey('hosts.id'), nullable=False)
+    status = Column(String(8), nullable=False)  # online or offline
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=True)  # NULL while this is the host's current status
+    
+    __table_args__ = (
+        Index('ix_host_status_intervals_host_started', 'host_id', 'started_at'),
+        Index('ix_host_status_intervals_ended_at', 'ended_at'),
+    )
+    
+    # Relationships
+    host = relationship('Host', back_populates='status_intervals')
+    
+    def __repr__(self):
+        return f'<HostStatusInterval {self.host_id} {self.status} from {self.started_at} to {self.ended_at}>'
+
+class WakeSchedule(Base):
+    """Recurring wake of one host, or of every host shared with a role, on a cron expression"""
+    __tablename__ = 'wake_schedules'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(64), nullable=False)
+    cron = Column(String(64), nullable=False)  # Five-field cron expression, see app.cron
+    host_id = Column(Integer, ForeignKey('hosts.id', ondelete='CASCADE'), nullable=True)  # Set for a single host...
+    role_id = Column(Integer, ForeignKey('roles.id', ondelete='CASCADE'), nullable=True)  # ...or for every host visible to this role
+    enabled = Column(Boolean, default=True, nullable=False)
+    created_by = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)  # Wakes are logged for this user
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_fired_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    host = relationship('Host', back_populates='wake_schedules')
+    role = relationship('Role', back_populates='wake_schedules')
+    created_by_user = relationship('User', back_populates='wake_schedules')
+    
+    def __repr__(self):
+        return f'<WakeSchedule {self.name} ({self.cron})>'
+
 class AppSettings(Base):
     __tablename__ = 'app_settings'
     
@@ -0,0 +1,104 @@
+"""
+Kernel neighbor (ARP) table reader for passive liveness checks.
+
+Dumps the IPv4 neighbor table over rtnetlink. An entry in the REACHABLE
+state means the kernel has confirmed, within the last base_reachable_time
+(about 30 seconds by default), that the address answers at that MAC,
+which is enough to treat the host as online without probing it.
+
+/proc/net/arp is not used: it only reports whether an entry is complete,
+not whether it is fresh, so a host that went down minutes ago would
+still look alive. Where rtnetlink is unavailable (non-Linux systems) the
+table reads as empty and every host is probed actively.
+"""
+
+import os
+import socket
+import struct
+from app.logging_config import get_logger
+
+logger = get_logger('app.neighbor_table')
+
+RTM_NEWNEIGH = 28
+RTM_GETNEIGH = 30
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 0x02
+NLMSG_DONE = 0x03
+NDA_DST = 1
+NDA_LLADDR = 2
+NUD_REACHABLE = 0x02
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_NDMSG = struct.Struct('=BBHiHBB')
+_RTATTR = struct.Struct('=HH')
+
+
+def normalize_mac(mac):
+    """Return a MAC address as lower-case, colon separated text."""
+    return mac.strip().lower().replace('-', ':') if mac else None
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _parse_neighbors(data, reachable):
+    """Parse RTM_NEWNEIGH messages into reachable; returns True once the dump is done."""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            return True
+        if msg_type == NLMSG_DONE:
+            return True
+        if msg_type == NLMSG_ERROR:
+            raise OSError("Netlink neighbor dump failed")
+        if msg_type == RTM_NEWNEIGH:
+            body = offset + _NLMSGHDR.size
+            family, _, _, _, state, _, _ = _NDMSG.unpack_from(data, body)
+            if family == socket.AF_INET and state & NUD_REACHABLE:
+                ip = mac = None
+                attr = body + _NDMSG.size
+                end = offset + length
+                while attr + _RTATTR.size <= end:
+                    attr_len, attr_type = _RTATTR.unpack_from(data, attr)
+                    if attr_len < _RTATTR.size:
+                        break
+                    value = data[attr + _RTATTR.size:attr + attr_len]
+                    if attr_type == NDA_DST and len(value) == 4:
+                        ip = socket.inet_ntoa(value)
+                    elif attr_type == NDA_LLADDR and len(value) == 6:
+                        mac = ':'.join('%02x' % byte for byte in value)
+                    attr += _align(attr_len)
+                if ip and mac:
+                    reachable[ip] = mac
+        offset += _align(length)
+    return False
+
+
+def read_reachable_neighbors():
+    """
+    Read the IPv4 neighbor entries that are currently REACHABLE.
+
+    Returns:
+        dict: IP address -> lower-case MAC address; empty if the table
+        cannot be read
+    """
+    if not hasattr(socket, 'AF_NETLINK'):
+        return {}
+
+    reachable = {}
+    try:
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+            sock.settimeout(1.0)
+            request = _NLMSGHDR.pack(
+                _NLMSGHDR.size + _NDMSG.size, RTM_GETNEIGH, NLM_F_REQUEST | NLM_F_DUMP, 1, 0
+            ) + _NDMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0)
+            sock.sendto(request, (0, 0))
+            while not _parse_neighbors(sock.recv(65536), reachable):
+                pass
+    except OSError as e:
+        logger.debug("Neighbor table unavailable: pid=%s error=%s", os.getpid(), str(e))
+        return {}
+    return reachable
@@ -1,17 +1,276 @@
 from redis import Redis, ConnectionPool
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+import calendar
 import json
+import threading
+import time
+from app.circuit_breaker import CircuitBreaker
 from app.logging_config import get_logger
 
 logger = get_logger('app.ping')
 
 # This will be set by the application factory
 redis_client = None
+redis_binary_client = None
+# Client for status reads on the request path, with short socket timeouts
+redis_status_client = None
+
+# Socket timeout of redis_status_client in seconds, set by configure_status_cache()
+STATUS_READ_TIMEOUT = 0.5
+
+# Default lifetime of a status entry in seconds
+STATUS_TTL = 60
+
+# Sorted set of host IDs waiting for an immediate re-probe, scored by request time
+FAST_PROBE_KEY = "ping:fast_probe"
+# Seconds after which an unclaimed fast probe request is dropped
+FAST_PROBE_MAX_AGE = 300
+
+# Sorted set of host IDs to probe ahead of scheduled probes, scored by request time
+PROBE_QUEUE_KEY = "ping:probe_queue"
+# Per-host marker that collapses repeated on-demand probe requests
+PROBE_PENDING_PREFIX = "ping:probe_pending:"
+# Seconds during which further on-demand requests for a host are collapsed
+PROBE_REQUEST_WINDOW = 5
+
+# Redis stream that receives every host status transition
+STATUS_EVENTS_KEY = "host_status:events"
+# Approximate number of transitions kept in the stream for resuming clients
+STATUS_EVENTS_MAXLEN = 10000
+
+# Status storage layout: "keys" keeps one string key per host, "hash" keeps
+# statuses as fields of hashes sharded by host ID range with the expiry
+# tracked inside each entry. Set by configure_status_store().
+STATUS_LAYOUT = "hash"
+# At most hash-max-listpack-entries (128) so shards stay compact listpacks
+STATUS_HASH_SHARD_SIZE = 128
+# Lifetime of a whole shard hash; only reclaims memory once nothing writes anymore
+STATUS_HASH_KEY_TTL = 3600
+
+# Payload encoding for writes: "compact" (see _encode_compact()) or "json".
+# Both are always readable, so the setting can change on a live store.
+STATUS_ENCODING = "compact"
+
+def configure_status_store(layout="hash", shard_size=128, encoding=None):
+    """
+    Select the Redis layout used for host statuses
+    
+    Args:
+        layout: "keys" (one key per host) or "hash" (sharded hashes)
+        shard_size: Number of consecutive host IDs per hash shard
+        encoding: "compact" or "json" payloads for new writes (default: unchanged)
+    """
+    global STATUS_LAYOUT, STATUS_HASH_SHARD_SIZE, STATUS_ENCODING
+    if layout not in ("keys", "hash"):
+        raise ValueError(f"Unknown host status layout: {layout}")
+    if encoding is not None and encoding not in ("compact", "json"):
+        raise ValueError(f"Unknown host status encoding: {encoding}")
+    STATUS_LAYOUT = layout
+    STATUS_HASH_SHARD_SIZE = max(1, int(shard_size))
+    STATUS_ENCODING = encoding or STATUS_ENCODING
+    logger.info("Host status store configured: layout=%s shard_size=%s encoding=%s",
+                layout, STATUS_HASH_SHARD_SIZE, STATUS_ENCODING)
+
+class LastKnownStatuses:
+    """
+    In-process LRU of the last status read from or written to Redis per host
+
+    Served, marked stale, while the Redis circuit breaker is open or a read
+    fails, instead of reporting every host as unknown. The ping service
+    running in this process keeps it current through its status writes.
+    """
+
+    def __init__(self, max_size=10000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Number of hosts kept (default: 10000)
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, statuses):
+        """
+        Remember statuses, ignoring unknown ones
+
+        Args:
+            statuses: Mapping of host_id to status data
+        """
+        with self._lock:
+            for host_id, data in statuses.items():
+                if data.get("status") not in ("online", "offline"):
+                    continue
+                self._entries[host_id] = dict(data)
+                self._entries.move_to_end(host_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def fallback(self, host_ids):
+        """
+        Get the last known statuses, marked stale
+
+        Returns:
+            dict: Mapping of host_id to status data, unknown for hosts not cached
+        """
+        with self._lock:
+            found = {host_id: self._entries.get(host_id) for host_id in host_ids}
+        return {
+            host_id: dict(data, stale=True) if data else _unknown_status()
+            for host_id, data in found.items()
+        }
+
+
+# Shared fallback cache and the breaker guarding status reads
+last_known_statuses = LastKnownStatuses()
+redis_breaker = CircuitBreaker('redis-status')
+
+def configure_status_cache(read_timeout=0.5, failure_threshold=3, slow_call_threshold=0.25,
+                           reset_timeout=10, cache_size=10000):
+    """
+    Configure the Redis circuit breaker and the last known status cache
+
+    Must be called before update_redis_pool() for read_timeout to apply.
+
+    Args:
+        read_timeout: Socket timeout in seconds for status reads
+        failure_threshold: Consecutive failed or slow reads that open the breaker
+        slow_call_threshold: Seconds after which a read counts as failed
+        reset_timeout: Seconds cached statuses are served before Redis is retried
+        cache_size: Number of hosts kept in the last known status cache
+    """
+    global STATUS_READ_TIMEOUT
+    STATUS_READ_TIMEOUT = read_timeout
+    redis_breaker.configure(failure_threshold, slow_call_threshold, reset_timeout)
+    last_known_statuses.max_size = cache_size
+
+def _status_key(host_id):
+    return f"host_status:{host_id}"
+
+def _shard_key(host_id):
+    return f"host_status:shard:{int(host_id) // STATUS_HASH_SHARD_SIZE}"
+
+def _unknown_status():
+    return {
+        "status": "unknown",
+        "last_check": None
+    }
+
+def _status_data(status, last_check, rtt=None):
+    data = {
+        "status": status,
+        "last_check": last_check
+    }
+    if rtt is not None:
+        data["rtt_ms"] = round(rtt * 1000, 2)
+    return data
+
+def _rtt_seconds(data):
+    rtt_ms = data.get("rtt_ms")
+    return rtt_ms / 1000.0 if rtt_ms is not None else None
+
+# Compact payloads are "<code><last_check>|<rtt_ms>|<last_seen>|<expires>" with
+# times as epoch seconds and trailing empty fields dropped, e.g. "o1792231234|0.42".
+# The code is one letter per status, upper case for stale (primed) entries.
+_STATUS_CODES = {"online": "o", "offline": "f", "unknown": "u"}
+# code -> (status, stale)
+_STATUS_NAMES = {code: (status, False) for status, code in _STATUS_CODES.items()}
+_STATUS_NAMES.update({code.upper(): (status, True) for status, code in _STATUS_CODES.items()})
+
+def _to_epoch(timestamp):
+    """ISO timestamp (naive means UTC) to epoch seconds as text, '' for None."""
+    if not timestamp:
+        return ""
+    return str(calendar.timegm(datetime.fromisoformat(timestamp).utctimetuple()))
+
+@lru_cache(maxsize=4096)
+def _from_epoch(epoch):
+    """Epoch seconds as text to a naive UTC ISO timestamp; cached as probes share seconds."""
+    return datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None).isoformat()
+
+def _encode_compact(data):
+    code = _STATUS_CODES.get(data["status"], "u")
+    if data.get("stale"):
+        code = code.upper()
+    rtt_ms = data.get("rtt_ms")
+    expires = data.get("expires")
+    return "|".join((
+        code + _to_epoch(data.get("last_check")),
+        "" if rtt_ms is None else repr(rtt_ms),
+        _to_epoch(data.get("last_seen")),
+        "" if expires is None else str(int(expires))
+    )).rstrip("|")
+
+def _encode_status(data):
+    """Serialize status data (with expires for the hash layout) for Redis."""
+    if STATUS_ENCODING == "json":
+        return json.dumps(data)
+    return _encode_compact(data)
+
+def _parse_payload(data):
+    """
+    Parse a stored status payload in either encoding
+
+    Returns:
+        dict: Status data, including "expires" if the payload has one
+    """
+    if data[0] == "{":
+        return json.loads(data)
+    fields = data.split("|")
+    head = fields[0]
+    status, stale = _STATUS_NAMES[head[0]]
+    parsed = {
+        "status": status,
+        "last_check": _from_epoch(head[1:]) if len(head) > 1 else None
+    }
+    count = len(fields)
+    if count > 1 and fields[1]:
+        parsed["rtt_ms"] = float(fields[1])
+    if stale:
+        parsed["last_seen"] = _from_epoch(fields[2]) if count > 2 and fields[2] else None
+        parsed["stale"] = True
+    if count > 3 and fields[3]:
+        parsed["expires"] = int(fields[3])
+    return parsed
+
+def _decode_status(data, now=None):
+    """
+    Decode a stored status payload
+
+    Returns:
+        dict: Status data, or None if the payload is invalid or has expired
+    """
+    data = _parse_payload(data)
+    expires = data.pop("expires", None)
+    if expires is not None and expires <= (now or time.time()):
+        return None
+    return data
 
 def update_redis_pool(pool):
     """Update Redis client to use connection pool"""
-    global redis_client
+    global redis_client, redis_binary_client, redis_status_client
     redis_client = Redis(connection_pool=pool)
+    # A stalled Redis must not hold requests for longer than STATUS_READ_TIMEOUT
+    status_kwargs = dict(pool.connection_kwargs, socket_timeout=STATUS_READ_TIMEOUT,
+                         socket_connect_timeout=STATUS_READ_TIMEOUT)
+    redis_status_client = Redis(connection_pool=ConnectionPool(
+        connection_class=pool.connection_class,
+        max_connections=pool.max_connections,
+        **status_kwargs
+    ))
+    # Binary values (e.g. RTT archives) must not be decoded as text
+    binary_kwargs = dict(pool.connection_kwargs, decode_responses=False)
+    redis_binary_client = Redis(connection_pool=ConnectionPool(
+        connection_class=pool.connection_class,
+        max_connections=pool.max_connections,
+        **binary_kwargs
+    ))
     logger.info("Redis connection pool updated for ping service")
 
 
@@ -21,42 +280,232 @@ def _is_redis_available():
         return False
     return True
 
-def set_host_status(host_id, status, last_check=None):
+def write_host_statuses(entries):
+    """
+    Write several host statuses to Redis in one round trip
+
+    Args:
+        entries: Mapping of host_id to (status, last_check, ttl) or
+            (status, last_check, ttl, rtt) with rtt in seconds
+
+    Returns:
+        bool: True if the pipeline was executed successfully
+    """
+    if not _is_redis_available():
+        return False
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        if STATUS_LAYOUT == "hash":
+            now = int(time.time())
+            shards = {}
+            for host_id, (status, last_check, ttl, *rtt) in entries.items():
+                data = _status_data(status, last_check, *rtt)
+                data["expires"] = now + ttl
+                shards.setdefault(_shard_key(host_id), {})[str(host_id)] = _encode_status(data)
+            for shard_key, fields in shards.items():
+                pipe.hset(shard_key, mapping=fields)
+                pipe.expire(shard_key, STATUS_HASH_KEY_TTL)
+        else:
+            for host_id, (status, last_check, ttl, *rtt) in entries.items():
+                data = _status_data(status, last_check, *rtt)
+                pipe.set(_status_key(host_id), _encode_status(data), ex=ttl)
+        pipe.execute()
+        last_known_statuses.put({
+            host_id: _status_data(status, last_check, *rtt)
+            for host_id, (status, last_check, ttl, *rtt) in entries.items()
+        })
+        return True
+    except Exception as e:
+        logger.error(
+            "Failed to write host statuses to Redis: count=%s error=%s",
+            len(entries),
+            str(e),
+            exc_info=True
+        )
+        return False
+
+class StatusWriter:
+    """
+    Buffers host status updates and writes them to Redis in batches
+
+    Entries are flushed in one non-transactional pipeline of SET ... EX
+    commands once max_batch entries are buffered or the oldest entry has
+    waited max_delay seconds. The ping service also flushes at the end of
+    every probe cycle.
+    """
+
+    def __init__(self, max_batch=500, max_delay=0.5):
+        """
+        Initialize the writer.
+
+        Args:
+            max_batch: Number of buffered entries that triggers a flush (default: 500)
+            max_delay: Seconds an entry may wait before a flush (default: 0.5)
+        """
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._buffer = {}
+        self._first_buffered_at = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'flushes': 0,
+            'entries': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def add(self, host_id, status, last_check=None, ttl=STATUS_TTL, rtt=None):
+        """
+        Buffer a status update, flushing when the batch is full or due
+
+        A later update for the same host replaces a buffered one. The
+        round-trip time in seconds, if known, is stored as rtt_ms.
+        """
+        if last_check is None:
+            last_check = datetime.utcnow().isoformat()
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered_at = time.monotonic()
+            self._buffer[host_id] = (status, last_check, ttl, rtt)
+            due = (len(self._buffer) >= self.max_batch or
+                   time.monotonic() - self._first_buffered_at >= self.max_delay)
+        if due:
+            self.flush()
+
+    def flush_if_due(self):
+        """Flush if the oldest buffered entry has waited max_delay seconds."""
+        with self._lock:
+            due = bool(self._buffer) and time.monotonic() - self._first_buffered_at >= self.max_delay
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write every buffered entry to Redis in a single pipeline
+
+        Returns:
+            int: Number of entries written
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, {}
+            self._first_buffered_at = None
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        if not write_host_statuses(batch):
+            with self._lock:
+                self._metrics['errors'] += 1
+            return 0
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            metrics = self._metrics
+            metrics['flushes'] += 1
+            metrics['entries'] += len(batch)
+            metrics['last_flush_ms'] = elapsed_ms
+            metrics['max_flush_ms'] = max(metrics['max_flush_ms'], elapsed_ms)
+            metrics['total_flush_ms'] += elapsed_ms
+        logger.debug("Host statuses flushed to Redis: count=%s duration_ms=%.2f", len(batch), elapsed_ms)
+        return len(batch)
+
+    def metrics(self):
+        """
+        Get flush statistics
+
+        Returns:
+            dict: Flush count, entries written, errors and flush latency in ms
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['pending'] = len(self._buffer)
+        metrics['avg_flush_ms'] = (
+            metrics['total_flush_ms'] / metrics['flushes'] if metrics['flushes'] else 0.0
+        )
+        return metrics
+
+
+# Shared writer used by the ping service
+status_writer = StatusWriter()
+
+def set_host_status(host_id, status, last_check=None, ttl=STATUS_TTL):
     """
     Set the status for a host in Redis
     
+    Writes immediately; the ping service batches its writes through
+    status_writer instead.
+    
     Args:
         host_id: The ID of the host
         status: The status ("online", "offline", or "unknown")
         last_check: Optional timestamp, defaults to current UTC time
+        ttl: Seconds until the status expires (default: STATUS_TTL)
     """
-    if not _is_redis_available():
-        return
-
     if last_check is None:
         last_check = datetime.utcnow().isoformat()
     
-    key = f"host_status:{host_id}"
-    data = {
-        "status": status,
-        "last_check": last_check
-    }
-    
-    # Set the data and TTL in a pipeline for atomic operation
-    try:
-        pipe = redis_client.pipeline()
-        pipe.set(key, json.dumps(data))
-        pipe.expire(key, 60)  # 60 seconds TTL
-        pipe.execute()
+    if write_host_statuses({host_id: (status, last_check, ttl)}):
         logger.debug("Host status updated in Redis: host_id=%s status=%s", host_id, status)
+
+# Sets a sharded hash field unless it holds a status that has not expired yet
+_HSET_IF_EXPIRED_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current then
+  local ok, expires = true, nil
+  if string.sub(current, 1, 1) == '{' then
+    local data
+    ok, data = pcall(cjson.decode, current)
+    if ok then expires = data['expires'] end
+  else
+    expires = string.match(current, '^[^|]*|[^|]*|[^|]*|(%d+)')
+  end
+  if ok and (expires == nil or tonumber(expires) > tonumber(ARGV[3])) then
+    return 0
+  end
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+def prime_host_statuses(entries, ttl):
+    """
+    Store last known statuses for hosts that have no current status
+
+    Primed entries carry "stale": true until a probe replaces them; hosts
+    that already have a status in Redis are left alone.
+
+    Args:
+        entries: Mapping of host_id to (status, last_seen) with last_seen
+            as an ISO timestamp or None
+        ttl: Seconds until a primed status expires
+
+    Returns:
+        int: Number of hosts primed
+    """
+    if not _is_redis_available() or not entries:
+        return 0
+
+    try:
+        now = int(time.time())
+        pipe = redis_client.pipeline(transaction=False)
+        for host_id, (status, last_seen) in entries.items():
+            data = _status_data(status, None)
+            data["last_seen"] = last_seen
+            data["stale"] = True
+            if STATUS_LAYOUT == "hash":
+                data["expires"] = now + ttl
+                pipe.eval(_HSET_IF_EXPIRED_SCRIPT, 1, _shard_key(host_id), str(host_id),
+                          _encode_status(data), now, STATUS_HASH_KEY_TTL)
+            else:
+                pipe.set(_status_key(host_id), _encode_status(data), ex=ttl, nx=True)
+        return sum(1 for result in pipe.execute() if result)
     except Exception as e:
-        logger.error(
-            "Failed to set host status in Redis: host_id=%s status=%s error=%s",
-            host_id,
-            status,
-            str(e),
-            exc_info=True
-        )
+        logger.error("Failed to prime host statuses: count=%s error=%s", len(entries), str(e), exc_info=True)
+        return 0
 
 def get_host_status(host_id):
     """
@@ -73,26 +522,34 @@ def get_host_status(host_id):
             "status": "unknown",
             "last_check": None
         }
+    if not redis_breaker.allow():
+        return last_known_statuses.fallback([host_id])[host_id]
 
-    key = f"host_status:{host_id}"
+    client = redis_status_client or redis_client
+    started = time.monotonic()
     try:
-        data = redis_client.get(key)
+        if STATUS_LAYOUT == "hash":
+            data = client.hget(_shard_key(host_id), str(host_id))
+        else:
+            data = client.get(_status_key(host_id))
     except Exception as e:
+        redis_breaker.record_failure(str(e))
         logger.error(
             "Failed to read host status from Redis: host_id=%s error=%s",
             host_id,
             str(e),
             exc_info=True
         )
-        return {
-            "status": "unknown",
-            "last_check": None
-        }
+        return last_known_statuses.fallback([host_id])[host_id]
+    redis_breaker.record_success(time.monotonic() - started)
     
     if data:
         try:
-            logger.debug("Host status cache hit: host_id=%s", host_id)
-            return json.loads(data)
+            status = _decode_status(data)
+            if status is not None:
+                logger.debug("Host status cache hit: host_id=%s", host_id)
+                last_known_statuses.put({host_id: status})
+                return status
         except Exception as e:
             logger.warning(
                 "Invalid host status payload in Redis: host_id=%s error=%s",
@@ -121,36 +578,50 @@ def get_all_host_statuses(host_ids):
             host_id: {"status": "unknown", "last_check": None}
             for host_id in host_ids
         }
+    if not redis_breaker.allow():
+        return last_known_statuses.fallback(host_ids)
 
-    pipe = redis_client.pipeline()
+    pipe = (redis_status_client or redis_client).pipeline()
     
-    # Queue all get operations
-    for host_id in host_ids:
-        key = f"host_status:{host_id}"
-        pipe.get(key)
+    if STATUS_LAYOUT == "hash":
+        # One HMGET per shard; a single call when all hosts share a shard
+        shards = {}
+        for host_id in host_ids:
+            shards.setdefault(_shard_key(host_id), []).append(host_id)
+        for shard_key, shard_host_ids in shards.items():
+            pipe.hmget(shard_key, [str(host_id) for host_id in shard_host_ids])
+    else:
+        # Queue all get operations
+        for host_id in host_ids:
+            pipe.get(_status_key(host_id))
     
     # Execute pipeline
+    started = time.monotonic()
     try:
         results = pipe.execute()
+        if STATUS_LAYOUT == "hash":
+            ordered_ids = [host_id for shard_host_ids in shards.values() for host_id in shard_host_ids]
+            results = [value for values in results for value in values]
+            host_ids = ordered_ids
         logger.debug("Host status batch fetch executed: host_count=%s", len(host_ids))
     except Exception as e:
+        redis_breaker.record_failure(str(e))
         logger.error(
             "Failed to read host statuses from Redis pipeline: count=%s error=%s",
             len(host_ids),
             str(e),
             exc_info=True
         )
-        return {
-            host_id: {"status": "unknown", "last_check": None}
-            for host_id in host_ids
-        }
+        return last_known_statuses.fallback(host_ids)
+    redis_breaker.record_success(time.monotonic() - started)
     
     # Process results
+    now = time.time()
     statuses = {}
     for host_id, data in zip(host_ids, results):
         if data:
             try:
-                statuses[host_id] = json.loads(data)
+                statuses[host_id] = _decode_status(data, now) or _unknown_status()
             except Exception as e:
                 logger.warning(
                     "Invalid host status payload in Redis pipeline: host_id=%s error=%s",
@@ -167,5 +638,306 @@ def get_all_host_statuses(host_ids):
                 "last_check": None
             }
     
+    last_known_statuses.put(statuses)
     return statuses
 
+def publish_status_transition(host_id, status, previous, last_check=None, on_demand=False):
+    """
+    Append a host status transition to the status event stream
+    
+    Args:
+        host_id: The ID of the host
+        status: The new status
+        previous: The status before the transition
+        last_check: Optional timestamp, defaults to current UTC time
+        on_demand: True for the result of a requested probe, which is
+            published even when the status did not change
+        
+    Returns:
+        str: Stream entry ID, or None if the event could not be published
+    """
+    if not _is_redis_available():
+        return None
+
+    if last_check is None:
+        last_check = datetime.utcnow().isoformat()
+    event = {
+        "host_id": host_id,
+        "status": status,
+        "previous": previous,
+        "last_check": last_check
+    }
+    if on_demand:
+        event["on_demand"] = True
+    try:
+        event_id = redis_client.xadd(
+            STATUS_EVENTS_KEY,
+            {"data": json.dumps(event)},
+            maxlen=STATUS_EVENTS_MAXLEN,
+            approximate=True
+        )
+        logger.debug("Host status transition published: host_id=%s status=%s previous=%s", host_id, status, previous)
+        return event_id
+    except Exception as e:
+        logger.error(
+            "Failed to publish host status transition: host_id=%s status=%s error=%s",
+            host_id,
+            status,
+            str(e),
+            exc_info=True
+        )
+        return None
+
+def migrate_status_store(target_layout, batch_size=500):
+    """
+    Move stored host statuses between the "keys" and "hash" layouts
+    
+    Entries keep their remaining lifetime. Source keys are deleted once
+    their entries have been written to the target layout.
+    
+    Args:
+        target_layout: "keys" or "hash"
+        batch_size: Number of source keys handled per round trip
+        
+    Returns:
+        int: Number of host statuses migrated
+    """
+    if target_layout not in ("keys", "hash"):
+        raise ValueError(f"Unknown host status layout: {target_layout}")
+    if not _is_redis_available():
+        return 0
+
+    previous_layout = STATUS_LAYOUT
+    migrated = 0
+    try:
+        configure_status_store(target_layout, STATUS_HASH_SHARD_SIZE)
+        now = time.time()
+        if target_layout == "hash":
+            keys = [key for key in redis_client.scan_iter(match="host_status:*", count=batch_size)
+                    if key.split(":", 1)[1].isdigit()]
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                pipe = redis_client.pipeline(transaction=False)
+                for key in batch:
+                    pipe.get(key)
+                    pipe.ttl(key)
+                results = pipe.execute()
+                entries = {}
+                for key, data, ttl in zip(batch, results[0::2], results[1::2]):
+                    if not data or ttl is None or ttl <= 0:
+                        continue
+                    status = _decode_status(data, now)
+                    entries[int(key.split(":", 1)[1])] = (status["status"], status["last_check"], ttl, _rtt_seconds(status))
+                if entries and not write_host_statuses(entries):
+                    raise RuntimeError("Failed to write migrated host statuses")
+                redis_client.delete(*batch)
+                migrated += len(entries)
+        else:
+            for shard_key in list(redis_client.scan_iter(match="host_status:shard:*", count=batch_size)):
+                entries = {}
+                for field, data in redis_client.hgetall(shard_key).items():
+                    raw = _parse_payload(data)
+                    ttl = int(raw.get("expires", now) - now)
+                    if ttl > 0:
+                        entries[int(field)] = (raw["status"], raw["last_check"], ttl, _rtt_seconds(raw))
+                if entries and not write_host_statuses(entries):
+                    raise RuntimeError("Failed to write migrated host statuses")
+                redis_client.delete(shard_key)
+                migrated += len(entries)
+    except Exception:
+        configure_status_store(previous_layout, STATUS_HASH_SHARD_SIZE)
+        raise
+
+    logger.info("Host status store migrated: layout=%s entries=%s", target_layout, migrated)
+    return migrated
+
+def prune_expired_statuses():
+    """
+    Remove expired entries from the sharded status hashes
+    
+    Only needed for the "hash" layout, where Redis cannot expire single
+    fields; entries of deleted hosts would otherwise stay until their
+    shard expires as a whole.
+    
+    Returns:
+        int: Number of fields removed
+    """
+    if STATUS_LAYOUT != "hash" or not _is_redis_available():
+        return 0
+
+    removed = 0
+    now = time.time()
+    try:
+        for shard_key in redis_client.scan_iter(match="host_status:shard:*"):
+            expired = []
+            for field, data in redis_client.hgetall(shard_key).items():
+                try:
+                    if _decode_status(data, now) is None:
+                        expired.append(field)
+                except Exception:
+                    expired.append(field)
+            if expired:
+                removed += redis_client.hdel(shard_key, *expired)
+    except Exception as e:
+        logger.error("Failed to prune expired host statuses: error=%s", str(e), exc_info=True)
+    if removed:
+        logger.debug("Pruned expired host statuses: count=%s", removed)
+    return removed
+
+def request_fast_probe(host_ids):
+    """
+    Ask the ping service to re-probe hosts right away, e.g. after a wake
+
+    Args:
+        host_ids: Iterable of host IDs
+    """
+    host_ids = list(host_ids)
+    if not host_ids or not _is_redis_available():
+        return
+
+    try:
+        now = time.time()
+        redis_client.zadd(FAST_PROBE_KEY, {str(host_id): now for host_id in host_ids})
+        logger.debug("Fast probe requested: host_ids=%s", host_ids)
+    except Exception as e:
+        logger.error(
+            "Failed to request fast probe in Redis: host_ids=%s error=%s",
+            host_ids,
+            str(e),
+            exc_info=True
+        )
+
+def _pop_requests(key, accept=None, limit=None):
+    """Take host IDs from a request sorted set, oldest first."""
+    if not _is_redis_available():
+        return []
+
+    try:
+        if accept is None and limit is None:
+            pipe = redis_client.pipeline()
+            pipe.zrange(key, 0, -1)
+            pipe.delete(key)
+            members, _ = pipe.execute()
+        else:
+            members = [member for member in redis_client.zrange(key, 0, -1)
+                       if accept is None or accept(int(member))][:limit]
+            pipe = redis_client.pipeline(transaction=False)
+            if members:
+                pipe.zrem(key, *members)
+            # Requests nobody picked up (e.g. for deleted hosts) must not pile up
+            pipe.zremrangebyscore(key, '-inf', time.time() - FAST_PROBE_MAX_AGE)
+            pipe.execute()
+    except Exception as e:
+        logger.error("Failed to read probe requests from Redis: key=%s error=%s", key, str(e), exc_info=True)
+        return []
+
+    return [int(member) for member in members]
+
+def pop_fast_probe_requests(accept=None):
+    """
+    Take pending fast probe requests
+
+    Args:
+        accept: Optional predicate on the host ID; requests it rejects are
+            left for the worker that owns the host
+
+    Returns:
+        list: Host IDs that asked for an immediate re-probe
+    """
+    return _pop_requests(FAST_PROBE_KEY, accept)
+
+# Marks each host as pending (SET NX PX) and queues the ones that were not
+# pending yet; KEYS[1] is the queue, KEYS[2..] the pending markers
+_REQUEST_PROBE_SCRIPT = """
+local queued = {}
+for i = 2, #KEYS do
+  local host_id = ARGV[i + 1]
+  if redis.call('SET', KEYS[i], ARGV[2], 'NX', 'PX', ARGV[1]) then
+    redis.call('ZADD', KEYS[1], 'NX', ARGV[2], host_id)
+    table.insert(queued, host_id)
+  end
+end
+return queued
+"""
+
+def request_probe(host_ids, window=None):
+    """
+    Queue hosts for a probe ahead of the schedule ("check these hosts now")
+
+    Requests for a host that was already requested within the last window
+    seconds are collapsed into the pending one (single flight). Results are
+    published to the status event stream with on_demand set.
+
+    Args:
+        host_ids: Iterable of host IDs
+        window: Seconds during which duplicate requests are collapsed
+            (default: PROBE_REQUEST_WINDOW)
+
+    Returns:
+        tuple: (queued host IDs, collapsed host IDs), or None if Redis is unavailable
+    """
+    host_ids = list(dict.fromkeys(int(host_id) for host_id in host_ids))
+    if not _is_redis_available() or redis_breaker.is_open:
+        return None
+    if not host_ids:
+        return [], []
+
+    window_ms = int((PROBE_REQUEST_WINDOW if window is None else window) * 1000)
+    try:
+        queued = redis_client.eval(
+            _REQUEST_PROBE_SCRIPT,
+            len(host_ids) + 1,
+            PROBE_QUEUE_KEY,
+            *[PROBE_PENDING_PREFIX + str(host_id) for host_id in host_ids],
+            window_ms,
+            time.time(),
+            *host_ids
+        )
+    except Exception as e:
+        logger.error("Failed to queue probe request in Redis: host_ids=%s error=%s", host_ids, str(e), exc_info=True)
+        return None
+
+    queued = {int(host_id) for host_id in queued}
+    logger.debug("Probe requested: queued=%s collapsed=%s", len(queued), len(host_ids) - len(queued))
+    return ([host_id for host_id in host_ids if host_id in queued],
+            [host_id for host_id in host_ids if host_id not in queued])
+
+def get_host_statuses_or_probe(host_ids, window=None):
+    """
+    Get cached statuses, queueing a probe for hosts without a current one
+
+    Hosts whose status is unknown or only primed from the database (stale)
+    are queued through request_probe(), so no matter how many clients ask,
+    each host gets at most one live probe per window.
+
+    Args:
+        host_ids: List of host IDs
+        window: Seconds during which requests for a host share one probe
+            (default: PROBE_REQUEST_WINDOW)
+
+    Returns:
+        tuple: (statuses as returned by get_all_host_statuses(), IDs of the
+        hosts with a probe queued or already pending)
+    """
+    statuses = get_all_host_statuses(host_ids)
+    probing = [
+        host_id for host_id in host_ids
+        if statuses[host_id]["status"] not in ("online", "offline") or statuses[host_id].get("stale")
+    ]
+    if probing and request_probe(probing, window) is None:
+        probing = []
+    return statuses, probing
+
+def pop_probe_requests(accept=None, limit=None):
+    """
+    Take queued on-demand probe requests, oldest first
+
+    Args:
+        accept: Optional predicate on the host ID; requests it rejects are
+            left for the worker that owns the host
+        limit: Maximum number of requests to take (default: all)
+
+    Returns:
+        list: Host IDs to probe ahead of scheduled probes
+    """
+    return _pop_requests(PROBE_QUEUE_KEY, accept, limit)
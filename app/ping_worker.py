@@ -0,0 +1,110 @@
+"""
+Standalone ping worker process.
+
+By default the ping service runs as a daemon thread inside the web
+process, where every probe cycle competes with request handling for the
+GIL. With PING_IN_PROCESS=False the web process leaves probing to this
+worker instead, which runs the same engine on its own event loop:
+
+    python -m app.ping_worker [--concurrency 256]
+    python manage.py ping-worker [--concurrency 256]
+
+Everything the web process needs from the worker already goes through
+Redis (statuses, transitions, probe requests, inventory changes), so
+several workers can run side by side and split the hosts between them
+through the shard leases.
+
+SIGTERM or SIGINT stops the worker cleanly: the loop finishes its current
+step, writes out buffered results and releases its shards. A second
+signal cancels a probe cycle that is still running.
+"""
+
+import argparse
+import asyncio
+import signal
+from app.logging_config import get_logger
+
+logger = get_logger('app.ping_worker')
+
+
+def _install_signal_handlers(loop, stop, task):
+    def request_stop(signum):
+        if stop.is_set():
+            logger.warning("Second stop signal received, cancelling the running probe cycle: signal=%s", signum)
+            task.cancel()
+        else:
+            logger.info("Stop signal received, shutting down ping worker: signal=%s", signum)
+            stop.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, request_stop, signum)
+        except (NotImplementedError, RuntimeError):
+            # No loop signal support (e.g. Windows); signal.signal runs handlers on the main thread too
+            signal.signal(signum, lambda received, frame: loop.call_soon_threadsafe(request_stop, received))
+
+
+def run_ping_worker(config, concurrency=None):
+    """
+    Run the ping service in the current process until it is signalled to stop.
+
+    Redis and the database must already be set up, see main().
+
+    Args:
+        config: Flask config mapping with PING_* settings
+        concurrency: Probes in flight at once (default: PING_MAX_CONCURRENCY)
+    """
+    from app.async_ping_service import configure_ping_service, ping_service
+
+    configure_ping_service(config)
+    if concurrency:
+        configure_ping_service({'PING_MAX_CONCURRENCY': concurrency})
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    stop = asyncio.Event()
+    task = loop.create_task(ping_service(stop))
+    _install_signal_handlers(loop, stop, task)
+    try:
+        loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        loop.close()
+    logger.info("Ping worker exited")
+
+
+def start_worker(app, concurrency=None):
+    """
+    Connect to Redis the way the web process does and run the worker.
+
+    Args:
+        app: Flask app created with start_background_services=False
+        concurrency: Probes in flight at once (default: PING_MAX_CONCURRENCY)
+    """
+    from app import redis_pool
+    from app.ping_service import update_redis_pool, configure_status_store
+
+    update_redis_pool(redis_pool)
+    configure_status_store(app.config['STATUS_STORE_LAYOUT'], app.config['STATUS_HASH_SHARD_SIZE'],
+                           app.config['STATUS_ENCODING'])
+    logger.info("Starting ping worker: concurrency=%s", concurrency or app.config['PING_MAX_CONCURRENCY'])
+    run_ping_worker(app.config, concurrency)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run the WOL Manager ping worker.")
+    parser.add_argument('--config', default=None, help="Config name (default: FLASK_CONFIG)")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="Probes in flight at once (default: PING_MAX_CONCURRENCY)")
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app(args.config, start_background_services=False)
+    start_worker(app, args.concurrency)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
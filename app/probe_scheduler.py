@@ -0,0 +1,292 @@
+"""
+Adaptive probe scheduling for the ping service.
+
+Every host carries its own next-due time, kept in a min-heap. Hosts that
+keep reporting the same status back off towards a maximum interval, while
+hosts that just changed state or were just sent a magic packet are
+re-probed within seconds.
+
+A status flip only counts once it has been seen on k consecutive probes
+(k-of-n hysteresis), so a single lost reply does not flip a host. While a
+flip is unconfirmed the host is re-probed at the fast interval.
+
+Regular probes are spread evenly over time: every host has a stable phase
+within the base interval, derived from a hash of its ID, and its due
+times are aligned to that phase. Hosts therefore fall into evenly filled
+slots of a timing wheel instead of all coming due at the same instant.
+"""
+
+import heapq
+import time
+
+# 2**32 / golden ratio: consecutive host IDs land far apart on the wheel
+_PHASE_MULTIPLIER = 0x9E3779B1
+
+
+def phase_offset(host_id, period):
+    """
+    Return the stable phase of a host within a period.
+
+    Args:
+        host_id: Integer host ID
+        period: Length of the period in seconds
+
+    Returns:
+        float: Offset in seconds, 0 <= offset < period
+    """
+    return ((host_id * _PHASE_MULTIPLIER) & 0xFFFFFFFF) / 4294967296.0 * period
+
+
+class HostSchedule:
+    """Scheduling state of a single host."""
+
+    __slots__ = ('ip', 'probe', 'status', 'pending', 'streak', 'interval', 'due', 'fast_until',
+                 'refresh_at', 'seen_at', 'seen_saved_at')
+
+    def __init__(self, ip, probe, due):
+        self.ip = ip
+        self.probe = probe
+        # Confirmed status, and the unconfirmed one seen on the last streak probes
+        self.status = None
+        self.pending = None
+        self.streak = 0
+        self.interval = 0
+        self.due = due
+        self.fast_until = 0.0
+        # When the stored status must be rewritten, when the host last
+        # answered (UTC) and when that was last written to the database
+        # (monotonic); maintained by the ping service
+        self.refresh_at = 0.0
+        self.seen_at = None
+        self.seen_saved_at = 0.0
+
+
+class ProbeScheduler:
+    """
+    Min-heap of per-host due times with adaptive intervals.
+
+    Heap entries are (due, host_id) pairs. Rescheduling a host pushes a new
+    entry and leaves the old one behind; stale entries are recognised by
+    comparing their due time with the host record and skipped when popped.
+    """
+
+    def __init__(self, min_interval=30, max_interval=300, backoff=1.5,
+                 fast_interval=5, wake_window=120, confirm_offline=3,
+                 confirm_online=1, spread=True, clock=time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            min_interval: Steady-state interval in seconds that stable hosts back off from (default: 30)
+            max_interval: Upper bound for stable hosts in seconds (default: 300)
+            backoff: Interval multiplier applied on every unchanged result (default: 1.5)
+            fast_interval: Re-probe delay after a change or wake in seconds (default: 5)
+            wake_window: Seconds of fast probing after a wake request (default: 120)
+            confirm_offline: Consecutive failed probes that take an online host offline (default: 3)
+            confirm_online: Consecutive answered probes that bring an offline host online (default: 1)
+            spread: Align regular probes to per-host phases within min_interval (default: True)
+            clock: Monotonic time source
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(backoff, 1.0)
+        self.fast_interval = fast_interval
+        self.wake_window = wake_window
+        self.confirm = {'offline': max(1, confirm_offline), 'online': max(1, confirm_online)}
+        self.spread = spread and min_interval > 0
+        self.clock = clock
+        # Unconfirmed flips that were reverted by the next probes
+        self.flaps_suppressed = 0
+        self._hosts = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def __contains__(self, host_id):
+        return host_id in self._hosts
+
+    def get(self, host_id):
+        return self._hosts.get(host_id)
+
+    def sync(self, targets):
+        """
+        Reconcile the schedule with the current host inventory.
+
+        New hosts become due at their phase within the next min_interval
+        (immediately without spreading), removed hosts are dropped and
+        hosts whose address or probe changed are re-probed right away. Must
+        not be called while popped hosts are still being probed.
+
+        Args:
+            targets: Iterable of (host_id, ip_address) pairs or
+                (host_id, ip_address, probe_spec) triples
+        """
+        now = self.clock()
+        seen = set()
+        for target in targets:
+            host_id, ip_address = target[0], target[1]
+            probe = target[2] if len(target) > 2 else None
+            seen.add(host_id)
+            entry = self._hosts.get(host_id)
+            if entry is None:
+                due = now
+                if self.spread:
+                    due += (phase_offset(host_id, self.min_interval) - now) % self.min_interval
+                self._hosts[host_id] = HostSchedule(ip_address, probe, due)
+                heapq.heappush(self._heap, (due, host_id))
+            elif entry.ip != ip_address or entry.probe != probe:
+                entry.ip = ip_address
+                entry.probe = probe
+                entry.status = None
+                entry.pending = None
+                entry.streak = 0
+                entry.interval = 0
+                self._reschedule(host_id, entry, now)
+            elif entry.due == float('inf'):
+                # No probe runs between cycles, so this one's result was lost
+                self._reschedule(host_id, entry, now)
+
+        for host_id in [host_id for host_id in self._hosts if host_id not in seen]:
+            del self._hosts[host_id]
+
+    def expedite(self, host_id, window=None):
+        """
+        Probe a host now and keep probing it quickly for a while.
+
+        Args:
+            host_id: ID of the host, e.g. one that was just sent a magic packet
+            window: Seconds of fast probing (default: wake_window)
+
+        Returns:
+            bool: False if the host is not scheduled
+        """
+        entry = self._hosts.get(host_id)
+        if entry is None:
+            return False
+        now = self.clock()
+        entry.fast_until = max(entry.fast_until, now + (self.wake_window if window is None else window))
+        # Hosts with a probe in flight pick the window up in record()
+        if now < entry.due != float('inf'):
+            self._reschedule(host_id, entry, now)
+        return True
+
+    def take(self, host_ids):
+        """
+        Remove specific hosts from the schedule to probe them now.
+
+        Hosts that are unknown or already being probed are skipped; the
+        others are parked like popped hosts until record() runs.
+
+        Args:
+            host_ids: Iterable of host IDs
+
+        Returns:
+            list: (host_id, ip_address, probe_spec) triples to probe now
+        """
+        taken = []
+        for host_id in host_ids:
+            entry = self._hosts.get(host_id)
+            if entry is None or entry.due == float('inf'):
+                continue
+            entry.due = float('inf')
+            taken.append((host_id, entry.ip, entry.probe))
+        return taken
+
+    def pop_due(self):
+        """
+        Remove and return every host whose due time has passed.
+
+        Returns:
+            list: (host_id, ip_address, probe_spec) triples to probe now
+        """
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, host_id = heapq.heappop(self._heap)
+            entry = self._hosts.get(host_id)
+            if entry is None or entry.due != when:
+                continue  # stale heap entry
+            # Parked until record() runs, so a slow probe is not started twice
+            entry.due = float('inf')
+            due.append((host_id, entry.ip, entry.probe))
+        return due
+
+    def record(self, host_id, status):
+        """
+        Record a probe outcome and schedule the host's next probe.
+
+        Args:
+            host_id: ID of the probed host
+            status: "online" or "offline", or None when the probe gave no answer
+
+        Returns:
+            tuple: (changed, delay) where changed tells whether the confirmed
+            status flipped and delay is the number of seconds until the next
+            probe; (False, None) for unknown hosts
+        """
+        entry = self._hosts.get(host_id)
+        if entry is None:
+            return False, None
+        now = self.clock()
+
+        changed = False
+        if status is not None and entry.status is not None and status != entry.status:
+            if entry.pending == status:
+                entry.streak += 1
+            else:
+                entry.pending = status
+                entry.streak = 1
+            changed = entry.streak >= self.confirm[status]
+        elif status is not None and entry.pending is not None:
+            self.flaps_suppressed += 1
+            entry.pending = None
+            entry.streak = 0
+
+        if now < entry.fast_until or entry.pending is not None and not changed:
+            # Settle a suspected flip as quickly as a wake
+            delay = self.fast_interval
+        elif status is None:
+            delay = self.min_interval
+        elif changed or entry.status is None:
+            entry.interval = self.min_interval
+            delay = self.fast_interval if changed else entry.interval
+        else:
+            entry.interval = min(self.max_interval, max(entry.interval, self.min_interval) * self.backoff)
+            delay = entry.interval
+        if changed or entry.status is None:
+            entry.status = status
+        if changed:
+            entry.pending = None
+            entry.streak = 0
+            # One quick confirmation is enough once the host has come up
+            entry.interval = self.min_interval
+            entry.fast_until = 0.0
+
+        when = now + delay
+        if self.spread and delay >= self.min_interval:
+            when = self._align(host_id, when, now)
+            delay = when - now
+        self._reschedule(host_id, entry, when)
+        return changed, delay
+
+    def next_due(self):
+        """Return the earliest due time, or None if nothing is scheduled."""
+        while self._heap:
+            when, host_id = self._heap[0]
+            entry = self._hosts.get(host_id)
+            if entry is not None and entry.due == when:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+    def _align(self, host_id, when, now):
+        """Move a due time to the nearest occurrence of the host's phase (at most min_interval / 2)."""
+        period = self.min_interval
+        phase = phase_offset(host_id, period)
+        aligned = round((when - phase) / period) * period + phase
+        return aligned if aligned > now else aligned + period
+
+    def _reschedule(self, host_id, entry, when):
+        entry.due = when
+        heapq.heappush(self._heap, (when, host_id))
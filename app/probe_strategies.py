@@ -0,0 +1,202 @@
+"""
+Per-host probe strategies for the ping service.
+
+A host's probe is described by a compact spec string built from its
+probe_strategy and probe_ports columns:
+
+    "icmp"            ICMP echo (the default)
+    "tcp:22,3389"     TCP connect to any of the ports
+    "udp:137"         UDP datagram to any of the ports
+    "any:22,3389"     ICMP echo or TCP connect, whichever answers first
+
+Hosts that block ICMP usually still answer a TCP connect, even if only
+with a reset, which already proves the host is up. All strategies are
+coroutines on the ping service's event loop.
+"""
+
+import asyncio
+import errno
+import socket
+
+PROBE_STRATEGIES = ('icmp', 'tcp', 'udp', 'any')
+
+# Ports tried when a TCP based strategy has none configured
+DEFAULT_TCP_PORTS = (22, 80, 443, 445, 3389)
+# The discard port: a closed port still triggers an ICMP port unreachable
+DEFAULT_UDP_PORTS = (9,)
+
+# Errors that mean the host itself answered, just not with an open port
+_ALIVE_ERRNOS = {errno.ECONNREFUSED, errno.ECONNRESET}
+
+
+def parse_ports(value):
+    """
+    Parse a comma separated port list.
+
+    Args:
+        value: String such as "22, 3389", or None
+
+    Returns:
+        tuple: Port numbers, empty if none are configured
+
+    Raises:
+        ValueError: If an entry is not a port number between 1 and 65535
+    """
+    ports = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        port = int(part)
+        if not 0 < port < 65536:
+            raise ValueError("Port out of range: %s" % port)
+        ports.append(port)
+    return tuple(ports)
+
+
+def probe_spec(strategy, ports=None):
+    """
+    Build the probe spec string for a host.
+
+    Args:
+        strategy: One of PROBE_STRATEGIES; unknown values fall back to "icmp"
+        ports: Comma separated port list from the host record
+
+    Returns:
+        str: Spec understood by get_strategy()
+    """
+    if strategy not in PROBE_STRATEGIES or strategy == 'icmp':
+        return 'icmp'
+    try:
+        ports = parse_ports(ports)
+    except ValueError:
+        ports = ()
+    return '%s:%s' % (strategy, ','.join(str(port) for port in ports))
+
+
+async def tcp_probe(ip, port, timeout):
+    """
+    Connect to a TCP port.
+
+    Returns:
+        bool: True if the connection was accepted or actively refused
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    except OSError as e:
+        return e.errno in _ALIVE_ERRNOS
+    finally:
+        sock.close()
+
+
+async def udp_probe(ip, port, timeout):
+    """
+    Send an empty datagram to a UDP port.
+
+    Returns:
+        bool: True on a reply or an ICMP port unreachable; silence is
+        indistinguishable from a down host and counts as offline
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    try:
+        sock.connect((ip, port))
+        sock.send(b'')
+        await asyncio.wait_for(loop.sock_recv(sock, 1), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    except OSError as e:
+        return e.errno in _ALIVE_ERRNOS
+    finally:
+        sock.close()
+
+
+async def first_true(probes):
+    """
+    Run probe coroutines concurrently and stop at the first success.
+
+    Args:
+        probes: Iterable of coroutines returning bool
+
+    Returns:
+        bool: True if any probe succeeded
+    """
+    pending = {asyncio.ensure_future(probe) for probe in probes}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(not task.cancelled() and task.exception() is None and task.result() for task in done):
+                return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class ProbeStrategy:
+    """Probe described by a spec string; call probe() to check a host."""
+
+    __slots__ = ('kind', 'ports', 'icmp')
+
+    def __init__(self, kind, ports, icmp):
+        self.kind = kind
+        self.ports = ports
+        self.icmp = icmp
+
+    async def probe(self, ip, timeout):
+        """
+        Check whether a host is up.
+
+        Args:
+            ip: IPv4 address of the host
+            timeout: Seconds to wait for an answer
+
+        Returns:
+            bool: True if the host answered
+        """
+        if self.kind == 'icmp':
+            return await self.icmp(ip, timeout)
+        if self.kind == 'udp':
+            return await first_true(udp_probe(ip, port, timeout) for port in self.ports)
+        probes = [tcp_probe(ip, port, timeout) for port in self.ports]
+        if self.kind == 'any':
+            probes.append(self.icmp(ip, timeout))
+        return await first_true(probes)
+
+
+_strategies = {}
+
+
+def get_strategy(spec, icmp):
+    """
+    Return the (shared) strategy for a spec string.
+
+    Args:
+        spec: Spec built by probe_spec(); None means "icmp"
+        icmp: Coroutine function (ip, timeout) -> bool used for ICMP echo
+
+    Returns:
+        ProbeStrategy
+    """
+    spec = spec or 'icmp'
+    strategy = _strategies.get(spec)
+    if strategy is None or strategy.icmp is not icmp:
+        kind, _, ports = spec.partition(':')
+        if kind not in PROBE_STRATEGIES:
+            kind = 'icmp'
+        try:
+            ports = parse_ports(ports)
+        except ValueError:
+            ports = ()
+        if not ports:
+            ports = DEFAULT_UDP_PORTS if kind == 'udp' else DEFAULT_TCP_PORTS
+        strategy = _strategies[spec] = ProbeStrategy(kind, ports, icmp)
+    return strategy
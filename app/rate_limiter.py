@@ -0,0 +1,208 @@
+"""
+Wake attempt rate limiting shared by every worker through Redis.
+
+Each user has a single Redis key holding a GCRA "theoretical arrival
+time" (TAT): every attempt moves it forward by window / limit, and an
+attempt is refused while that would put it more than one window ahead of
+now. That allows bursts of up to limit attempts and then one attempt per
+window / limit, decided in O(1) by one Lua call. The key expires once the
+TAT has passed, so idle users cost no memory.
+
+Limits come from the Flask config: a default, per-role overrides (the
+most generous of a user's roles applies) and per-user overrides, which
+win over roles. A limit of 0 disables limiting for that role or user.
+
+While Redis is unavailable the same algorithm runs on an in-process
+table, so limiting degrades to per worker instead of failing open.
+"""
+
+import math
+import threading
+import time
+from app import ping_service
+from app.circuit_breaker import CircuitBreaker
+from app.logging_config import get_logger
+
+logger = get_logger('app.rate_limiter')
+
+RATE_LIMIT_KEY_PREFIX = "wol:ratelimit:"
+
+# GCRA step for KEYS[1]. ARGV: now (ms), emission interval (ms), limit, cost.
+# Returns {allowed (1/0), remaining attempts, retry after (ms)}
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = interval * tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+  tat = now
+end
+local new_tat = tat + interval * tonumber(ARGV[4])
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, 0, math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), 0}
+"""
+
+
+def parse_limits(value):
+    """
+    Parse "name=limit,name=limit" (as given in the environment) into a dict.
+
+    Args:
+        value: String, dict or None
+
+    Returns:
+        dict: name -> int limit
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {str(name): int(limit) for name, limit in value.items()}
+    limits = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, limit = item.partition('=')
+        limits[name.strip()] = int(limit)
+    return limits
+
+
+class RateLimiter:
+    """GCRA limiter with per-role and per-user limits, stored in Redis."""
+
+    def __init__(self, name, limit=10, window=300, clock=time.time):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Key namespace, e.g. "wake"
+            limit: Attempts allowed per window by default (default: 10)
+            window: Window in seconds (default: 300)
+            clock: Wall clock time source, shared by every worker
+        """
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.role_limits = {}
+        self.user_limits = {}
+        self.clock = clock
+        self.breaker = CircuitBreaker('rate_limit_redis')
+        self._local = {}
+        self._local_lock = threading.Lock()
+
+    def configure(self, limit=None, window=None, role_limits=None, user_limits=None):
+        """
+        Change the limits, e.g. from the Flask config.
+
+        Args:
+            limit: Default attempts per window
+            window: Window in seconds
+            role_limits: Role name -> limit, as dict or "name=limit,..." string
+            user_limits: Username -> limit, as dict or "name=limit,..." string
+        """
+        if limit is not None:
+            self.limit = int(limit)
+        if window is not None:
+            self.window = max(1, int(window))
+        if role_limits is not None:
+            self.role_limits = parse_limits(role_limits)
+        if user_limits is not None:
+            self.user_limits = parse_limits(user_limits)
+
+    def limit_for(self, user):
+        """
+        Get the attempts per window that apply to a user.
+
+        Args:
+            user: User with username, role and roles
+
+        Returns:
+            int: Limit, 0 for unlimited
+        """
+        username = getattr(user, 'username', None)
+        if username in self.user_limits:
+            return self.user_limits[username]
+        role_names = {role.name for role in getattr(user, 'roles', None) or []}
+        if getattr(user, 'role', None):
+            role_names.add(user.role)
+        limits = [self.role_limits[name] for name in role_names if name in self.role_limits]
+        if not limits:
+            return self.limit
+        if 0 in limits:
+            return 0
+        return max(limits)
+
+    def hit(self, user, cost=1):
+        """
+        Count an attempt by a user if the limit allows it.
+
+        Args:
+            user: User making the attempt
+            cost: Attempts this call counts as (default: 1)
+
+        Returns:
+            tuple: (allowed, remaining attempts, seconds until the next attempt is allowed)
+        """
+        limit = self.limit_for(user)
+        if limit <= 0:
+            return True, None, 0
+        key = "%s%s:%s" % (RATE_LIMIT_KEY_PREFIX, self.name, user.id)
+        now_ms = int(self.clock() * 1000)
+        interval_ms = self.window * 1000.0 / limit
+
+        result = self._hit_redis(key, now_ms, interval_ms, limit, cost)
+        if result is None:
+            result = self._hit_local(key, now_ms, interval_ms, limit, cost)
+        allowed, remaining, retry_after_ms = result
+        return bool(allowed), int(remaining), math.ceil(int(retry_after_ms) / 1000)
+
+    def _hit_redis(self, key, now_ms, interval_ms, limit, cost):
+        client = ping_service.redis_status_client or ping_service.redis_client
+        if client is None or not self.breaker.allow():
+            return None
+        started = time.monotonic()
+        try:
+            result = client.eval(_GCRA_SCRIPT, 1, key, now_ms, interval_ms, limit, cost)
+        except Exception as e:
+            self.breaker.record_failure(str(e))
+            logger.warning("Rate limit check fell back to process memory: key=%s error=%s", key, str(e))
+            return None
+        self.breaker.record_success(time.monotonic() - started)
+        return result
+
+    def _hit_local(self, key, now_ms, interval_ms, limit, cost):
+        with self._local_lock:
+            tat = max(self._local.get(key, now_ms), now_ms)
+            new_tat = tat + interval_ms * cost
+            allow_at = new_tat - interval_ms * limit
+            if now_ms < allow_at:
+                return 0, 0, math.ceil(allow_at - now_ms)
+            self._local[key] = new_tat
+            if len(self._local) > 10000:
+                # Entries whose TAT has passed carry no state, like expired Redis keys
+                self._local = {k: v for k, v in self._local.items() if v > now_ms}
+            return 1, math.floor((now_ms - allow_at) / interval_ms), 0
+
+
+def configure_rate_limits(config):
+    """
+    Apply the WAKE_RATE_* settings to the shared limiters.
+
+    Args:
+        config: Flask config mapping
+    """
+    wake_limiter.configure(
+        config['WAKE_RATE_LIMIT'],
+        config['WAKE_RATE_WINDOW'],
+        config['WAKE_RATE_LIMITS_BY_ROLE'],
+        config['WAKE_RATE_LIMITS_BY_USER']
+    )
+    logger.info("Wake rate limits configured: default=%s/%ss roles=%s users=%s",
+                wake_limiter.limit, wake_limiter.window, wake_limiter.role_limits, len(wake_limiter.user_limits))
+
+
+# Shared limiter for wake attempts
+wake_limiter = RateLimiter('wake')
@@ -0,0 +1,307 @@
+"""
+Round-robin round-trip time archives, one fixed-size Redis string per host.
+
+Every host key holds three archives of fixed-size slots:
+
+    1-minute buckets for a day     (1440 slots)
+    5-minute buckets for a week    (2016 slots)
+    1-hour buckets for a year      (8760 slots)
+
+A probe's RTT is consolidated into the current bucket of each archive as
+sample count, minimum, maximum and average. The slot for a bucket is
+bucket % slots, so old buckets are overwritten in place and a key never
+grows beyond ARCHIVE_BYTES (about 143 KiB). Each slot also stores its
+bucket number, which tells a current slot from one left over from an
+earlier lap of the ring without any sweeping.
+
+Values are kept in units of 0.1 ms, capped at 6553.4 ms. Charts read only
+the slots of the archive that fits the requested window, with one
+GETRANGE per contiguous stretch of the ring.
+"""
+
+import struct
+import time
+from app import ping_service
+from app.logging_config import get_logger
+
+logger = get_logger('app.rtt_history')
+
+# (bucket seconds, slots) from finest to coarsest
+ARCHIVES = ((60, 1440), (300, 2016), (3600, 8760))
+
+# bucket number, sample count, min, max, average (0.1 ms units)
+_SLOT = struct.Struct('<IHHHH')
+_MAX_VALUE = 0xFFFE
+_MAX_COUNT = 0xFFFF
+
+# Byte offset of each archive within the host key
+_OFFSETS = []
+_offset = 0
+for _step, _slots in ARCHIVES:
+    _OFFSETS.append(_offset)
+    _offset += _slots * _SLOT.size
+ARCHIVE_BYTES = _offset
+
+# Keys of hosts that stop reporting disappear once the year archive would be empty
+RTT_KEY_TTL = ARCHIVES[-1][0] * ARCHIVES[-1][1]
+
+
+def _rtt_key(host_id):
+    return f"rtt:{host_id}"
+
+
+def _to_units(seconds):
+    return min(_MAX_VALUE, max(1, int(round(seconds * 10000))))
+
+
+def _slot_offset(archive, bucket):
+    return _OFFSETS[archive] + (bucket % ARCHIVES[archive][1]) * _SLOT.size
+
+
+def _get_client():
+    return getattr(ping_service, 'redis_binary_client', None)
+
+
+class RttRecorder:
+    """
+    Buffers RTT samples in the ping worker and merges them into the archives.
+
+    The worker that owns a host's shard is its only writer, so slots are
+    updated client side: one pipeline reads every touched slot, one
+    pipeline writes the merged values back.
+    """
+
+    def __init__(self, flush_interval=10.0, clock=time.monotonic, wall_clock=time.time):
+        """
+        Initialize the recorder.
+
+        Args:
+            flush_interval: Seconds between Redis writes (default: 10)
+            clock: Monotonic time source
+            wall_clock: Epoch time source for sample timestamps
+        """
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._pending = []
+        self._next_flush = clock() + flush_interval
+
+    def add(self, host_id, rtt, observed_at=None):
+        """
+        Queue an RTT sample.
+
+        Args:
+            host_id: The ID of the host
+            rtt: Round-trip time in seconds
+            observed_at: Epoch seconds of the probe (default: now)
+        """
+        self._pending.append((host_id, rtt, observed_at or self.wall_clock()))
+
+    def flush_if_due(self):
+        """Flush when the flush interval has passed."""
+        if self.clock() >= self._next_flush:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Merge queued samples into the archives.
+
+        Returns:
+            int: Number of samples written
+        """
+        self._next_flush = self.clock() + self.flush_interval
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        client = _get_client()
+        if client is None:
+            return 0
+
+        # (host_id, archive, bucket) -> [count, min, max, sum]
+        updates = {}
+        for host_id, rtt, observed_at in pending:
+            value = _to_units(rtt)
+            for archive, (step, _) in enumerate(ARCHIVES):
+                key = (host_id, archive, int(observed_at // step))
+                entry = updates.get(key)
+                if entry is None:
+                    updates[key] = [1, value, value, value]
+                else:
+                    entry[0] += 1
+                    entry[1] = min(entry[1], value)
+                    entry[2] = max(entry[2], value)
+                    entry[3] += value
+
+        try:
+            keys = list(updates)
+            pipe = client.pipeline(transaction=False)
+            for host_id, archive, bucket in keys:
+                offset = _slot_offset(archive, bucket)
+                pipe.getrange(_rtt_key(host_id), offset, offset + _SLOT.size - 1)
+            stored = pipe.execute()
+
+            pipe = client.pipeline(transaction=False)
+            for (host_id, archive, bucket), raw in zip(keys, stored):
+                count, low, high, total = updates[(host_id, archive, bucket)]
+                if len(raw) == _SLOT.size:
+                    old_bucket, old_count, old_low, old_high, old_avg = _SLOT.unpack(raw)
+                    if old_bucket == bucket and old_count:
+                        total += old_avg * old_count
+                        count += old_count
+                        low = min(low, old_low)
+                        high = max(high, old_high)
+                packed = _SLOT.pack(bucket, min(count, _MAX_COUNT), low, high, int(round(total / count)))
+                pipe.setrange(_rtt_key(host_id), _slot_offset(archive, bucket), packed)
+            for host_id in {host_id for host_id, _, _ in keys}:
+                pipe.expire(_rtt_key(host_id), RTT_KEY_TTL)
+            pipe.execute()
+            logger.debug("RTT archives updated: samples=%s slots=%s", len(pending), len(keys))
+            return len(pending)
+        except Exception as e:
+            logger.error("Failed to write RTT archives: samples=%s error=%s", len(pending), str(e), exc_info=True)
+            return 0
+
+
+def _pick_archive(start, now):
+    """Return the finest archive that still holds data from start."""
+    for archive, (step, slots) in enumerate(ARCHIVES):
+        if now - start <= step * slots:
+            return archive
+    return len(ARCHIVES) - 1
+
+
+def _slot_ranges(archive, first, last):
+    """Yield (first bucket, last bucket) runs that are contiguous in the ring."""
+    slots = ARCHIVES[archive][1]
+    while first <= last:
+        run_end = min(last, first + slots - 1 - first % slots)
+        yield first, run_end
+        first = run_end + 1
+
+
+def _queue_reads(pipe, host_id, archive, first, last):
+    runs = list(_slot_ranges(archive, first, last))
+    for run_first, run_last in runs:
+        pipe.getrange(_rtt_key(host_id), _slot_offset(archive, run_first),
+                      _slot_offset(archive, run_last) + _SLOT.size - 1)
+    return runs
+
+
+def _decode_runs(runs, blobs):
+    """Return bucket -> (count, min, max, avg) for the slots that belong to the requested buckets."""
+    slots = {}
+    for (run_first, run_last), blob in zip(runs, blobs):
+        for index, bucket in enumerate(range(run_first, run_last + 1)):
+            raw = blob[index * _SLOT.size:(index + 1) * _SLOT.size]
+            if len(raw) < _SLOT.size:
+                break
+            stored_bucket, count, low, high, avg = _SLOT.unpack(raw)
+            if stored_bucket == bucket and count:
+                slots[bucket] = (count, low, high, avg)
+    return slots
+
+
+def _ms(units):
+    return round(units / 10.0, 1)
+
+
+def _bucket_window(archive, start, end, now):
+    step, slots = ARCHIVES[archive]
+    first = int(max(start, now - step * (slots - 1)) // step)
+    last = int(min(end, now) // step)
+    return first, last
+
+
+def read_rtt_series(host_id, start, end, now=None):
+    """
+    Read an RTT series from the archive that fits the window.
+
+    Args:
+        host_id: The ID of the host
+        start: Window start in epoch seconds
+        end: Window end in epoch seconds
+        now: Current epoch seconds (default: time.time())
+
+    Returns:
+        dict: {"step": bucket seconds, "points": [{"time", "min_ms", "avg_ms",
+        "max_ms", "samples"}, ...]} with None values for buckets without samples
+    """
+    now = time.time() if now is None else now
+    archive = _pick_archive(start, now)
+    step = ARCHIVES[archive][0]
+    first, last = _bucket_window(archive, start, end, now)
+    result = {"step": step, "points": []}
+    client = _get_client()
+    if client is None or first > last:
+        return result
+
+    pipe = client.pipeline(transaction=False)
+    runs = _queue_reads(pipe, host_id, archive, first, last)
+    slots = _decode_runs(runs, pipe.execute())
+    for bucket in range(first, last + 1):
+        count, low, high, avg = slots.get(bucket, (0, None, None, None))
+        result["points"].append({
+            "time": bucket * step,
+            "min_ms": _ms(low) if count else None,
+            "avg_ms": _ms(avg) if count else None,
+            "max_ms": _ms(high) if count else None,
+            "samples": count
+        })
+    return result
+
+
+def summarize_rtt(host_ids, window=3600, now=None):
+    """
+    Consolidate each host's RTT over the last window seconds.
+
+    Args:
+        host_ids: Iterable of host IDs
+        window: Seconds back from now (default: one hour)
+        now: Current epoch seconds (default: time.time())
+
+    Returns:
+        dict: host_id -> {"min_ms", "avg_ms", "max_ms", "samples"}, or None
+        for hosts without samples in the window
+    """
+    now = time.time() if now is None else now
+    host_ids = list(host_ids)
+    summary = dict.fromkeys(host_ids)
+    client = _get_client()
+    if client is None or not host_ids:
+        return summary
+
+    archive = _pick_archive(now - window, now)
+    first, last = _bucket_window(archive, now - window, now, now)
+    try:
+        pipe = client.pipeline(transaction=False)
+        queued = [(host_id, _queue_reads(pipe, host_id, archive, first, last)) for host_id in host_ids]
+        blobs = iter(pipe.execute())
+        for host_id, runs in queued:
+            slots = _decode_runs(runs, [next(blobs) for _ in runs]).values()
+            samples = sum(count for count, _, _, _ in slots)
+            if samples:
+                summary[host_id] = {
+                    "min_ms": _ms(min(low for _, low, _, _ in slots)),
+                    "avg_ms": _ms(sum(count * avg for count, _, _, avg in slots) / samples),
+                    "max_ms": _ms(max(high for _, _, high, _ in slots)),
+                    "samples": samples
+                }
+    except Exception as e:
+        logger.warning("Failed to read RTT archives: hosts=%s error=%s", len(host_ids), str(e))
+    return summary
+
+
+def clear_rtt_history(host_id):
+    """Drop a host's archives, e.g. after the host was deleted."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.delete(_rtt_key(host_id))
+    except Exception as e:
+        logger.warning("Failed to delete RTT archives: host_id=%s error=%s", host_id, str(e))
+
+
+# Shared recorder used by the ping service
+rtt_recorder = RttRecorder()
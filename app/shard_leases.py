@@ -0,0 +1,150 @@
+"""
+Redis leases that split work between processes and machines.
+
+Work is divided into a fixed number of shards. Every participant
+announces itself with a heartbeat, takes free shards up to its fair share
+and keeps them by renewing their lease keys before the TTL runs out.
+Shards of a participant that stops renewing expire and are picked up by
+the others, and a newcomer gets its share as the others shed surplus.
+With a single shard this is plain leader election.
+"""
+
+import math
+import os
+import socket
+import time
+import uuid
+import zlib
+from app import ping_service
+from app.logging_config import get_logger
+
+logger = get_logger('app.shard_leases')
+
+# Renews every lease in KEYS still held by ARGV[1]; returns their 1-based positions
+_RENEW_SCRIPT = """
+local owned = {}
+for i, key in ipairs(KEYS) do
+  if redis.call('GET', key) == ARGV[1] then
+    redis.call('PEXPIRE', key, ARGV[2])
+    table.insert(owned, i)
+  end
+end
+return owned
+"""
+
+# Deletes a lease only if ARGV[1] still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class ShardLeases:
+    """Set of shard leases held by this process."""
+
+    def __init__(self, name, shard_count, ttl=15, owner=None, clock=time.monotonic):
+        """
+        Initialize the lease set.
+
+        Args:
+            name: Key prefix shared by all participants, e.g. "ping"
+            shard_count: Number of shards the work is split into
+            ttl: Lease lifetime in seconds; maintain() should run every ttl / 3
+            owner: Unique participant name (default: host name, PID and a random suffix)
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.shard_count = max(1, int(shard_count))
+        self.ttl = ttl
+        self.owner = owner or "%s:%s:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.clock = clock
+        self.owned = frozenset()
+        self._members_key = "%s:members" % name
+        self._keys = ["%s:lease:%s" % (name, shard) for shard in range(self.shard_count)]
+        # Start looking for free shards at a different place than the other participants
+        self._offset = zlib.crc32(self.owner.encode()) % self.shard_count
+        self._valid_until = 0
+
+    def owns(self, item_id):
+        """Tell whether the item with the given integer ID falls into an owned shard."""
+        return item_id % self.shard_count in self.owned
+
+    def maintain(self):
+        """
+        Heartbeat, renew held leases, then acquire or shed shards towards the fair share.
+
+        Returns:
+            bool: True if the set of owned shards changed
+        """
+        client = ping_service.redis_client
+        now = self.clock()
+        if client is None:
+            return self._expire_locally(now)
+
+        ttl_ms = int(self.ttl * 1000)
+        try:
+            wall_clock = time.time()
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(self._members_key, {self.owner: wall_clock})
+            pipe.zremrangebyscore(self._members_key, '-inf', wall_clock - self.ttl)
+            pipe.zcard(self._members_key)
+            pipe.eval(_RENEW_SCRIPT, len(self._keys), *self._keys, self.owner, ttl_ms)
+            pipe.mget(self._keys)
+            _, _, members, renewed, holders = pipe.execute()
+
+            owned = {position - 1 for position in renewed}
+            share = math.ceil(self.shard_count / max(members, 1))
+            if len(owned) > share:
+                for shard in sorted(owned)[share:]:
+                    client.eval(_RELEASE_SCRIPT, 1, self._keys[shard], self.owner)
+                    owned.discard(shard)
+            else:
+                for step in range(self.shard_count):
+                    if len(owned) >= share:
+                        break
+                    shard = (self._offset + step) % self.shard_count
+                    if holders[shard] is None and client.set(self._keys[shard], self.owner, nx=True, px=ttl_ms):
+                        owned.add(shard)
+            self._valid_until = now + self.ttl
+        except Exception as e:
+            logger.warning("Failed to maintain shard leases: name=%s error=%s", self.name, str(e))
+            return self._expire_locally(now)
+
+        return self._set_owned(owned, members)
+
+    def release_all(self):
+        """Give up every held shard, e.g. on shutdown, so others take over at once."""
+        client = ping_service.redis_client
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for shard in self.owned:
+                    pipe.eval(_RELEASE_SCRIPT, 1, self._keys[shard], self.owner)
+                pipe.zrem(self._members_key, self.owner)
+                pipe.execute()
+            except Exception as e:
+                logger.warning("Failed to release shard leases: name=%s error=%s", self.name, str(e))
+        self._set_owned(set(), None)
+
+    def _expire_locally(self, now):
+        # Without Redis, held leases are only trusted until they would have expired there
+        if self.owned and now >= self._valid_until:
+            return self._set_owned(set(), None)
+        return False
+
+    def _set_owned(self, owned, members):
+        owned = frozenset(owned)
+        if owned == self.owned:
+            return False
+        logger.info(
+            "Shard leases changed: name=%s owner=%s shards=%s/%s members=%s",
+            self.name,
+            self.owner,
+            len(owned),
+            self.shard_count,
+            members
+        )
+        self.owned = owned
+        return True
@@ -9,6 +9,7 @@ class PingController {
     this.pingInterval = 60000; // Default ping interval: 60 seconds
     this.pingTimeout = 3000;   // Default ping timeout: 3 seconds
     this.activeTimers = new Map();
+    this.hosts = new Map();    // hostId -> badge id
     this.initialized = false;
   }
 
@@ -25,93 +26,94 @@ class PingController {
     
     console.log(`[Ping] Initializing ping for ${pingableHosts.length} hosts`);
     
-    // Set up pinging for each host
+    // Collect the hosts; all of them are checked with one request per interval
     pingableHosts.forEach(host => {
       const hostId = host.getAttribute('data-host-id');
-      const hostMac = host.getAttribute('data-host-mac');
-      const hostIp = host.getAttribute('data-host-ip');
       const badgeId = host.getAttribute('data-status-badge-id');
       
-      if (hostIp && badgeId) {
-        this.setupHostPing(hostId, hostMac, hostIp, badgeId);
+      if (hostId && badgeId) {
+        this.hosts.set(hostId, badgeId);
       }
     });
     
+    if (this.hosts.size > 0) {
+      // Initial ping
+      this.pingHosts();
+      
+      // Set up interval
+      this.activeTimers.set('all', setInterval(() => this.pingHosts(), this.pingInterval));
+    }
+    
     this.initialized = true;
   }
 
   /**
-   * Set up periodic ping checks for a specific host
+   * Set a host's badge to a status
    */
-  setupHostPing(hostId, hostMac, hostIp, badgeId) {
-    // Initial ping
-    this.pingHost(hostId, hostMac, hostIp, badgeId);
+  setBadgeStatus(badgeId, status) {
+    const badge = document.getElementById(badgeId);
+    if (!badge) return;
     
-    // Set up interval
-    const timerId = setInterval(() => {
-      this.pingHost(hostId, hostMac, hostIp, badgeId);
-    }, this.pingInterval);
+    badge.setAttribute('data-status', status);
     
-    // Store timer reference
-    this.activeTimers.set(hostId, timerId);
+    // Update animation if available
+    if (typeof window.updateStatusBadgeAnimation === 'function') {
+      window.updateStatusBadgeAnimation(badgeId, status);
+    }
   }
 
   /**
-   * Perform actual host ping and update status
+   * Fetch the status of every host in one request and update the badges.
+   * The server answers from its status cache and probes hosts without a
+   * current status itself, so badges keep their last status meanwhile.
    */
-  pingHost(hostId, hostMac, hostIp, badgeId) {
-    // Get badge element
-    const badge = document.getElementById(badgeId);
-    if (!badge) return;
+  pingHosts() {
+    if (this.hosts.size === 0) return;
     
-    console.log(`[Ping] Pinging host ${hostId} (${hostIp})`);
+    const hostIds = Array.from(this.hosts.keys()).join(',');
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), this.pingTimeout);
     
-    // Show pending status
-    badge.setAttribute('data-status', 'unknown');
-    if (typeof window.updateStatusBadgeAnimation === 'function') {
-      window.updateStatusBadgeAnimation(badgeId, 'unknown');
-    }
-    
-    // Make ping request
-    fetch(`/api/ping/${hostIp}`, {
+    fetch(`/api/ping?host_ids=${hostIds}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
         'X-Requested-With': 'XMLHttpRequest'
       },
-      timeout: this.pingTimeout
+      signal: controller.signal
+    })
+    .then(response => {
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      return response.json();
     })
-    .then(response => response.json())
     .then(data => {
-      // Update status based on ping result
-      const status = data.online ? 'online' : 'offline';
-      badge.setAttribute('data-status', status);
+      (data.hosts || []).forEach(host => {
+        const badgeId = this.hosts.get(String(host.host_id));
+        if (!badgeId) return;
       
-      // Update animation if available
-      if (typeof window.updateStatusBadgeAnimation === 'function') {
-        window.updateStatusBadgeAnimation(badgeId, status);
-      }
+        // Hosts still being probed keep their current badge
+        if (host.probing && host.status !== 'online' && host.status !== 'offline') return;
       
-      console.log(`[Ping] Host ${hostId} (${hostIp}) status: ${status}`);
+        const status = host.online ? 'online' : (host.status === 'offline' ? 'offline' : 'unknown');
+        this.setBadgeStatus(badgeId, status);
+      });
     })
     .catch(error => {
-      console.error(`[Ping] Error pinging host ${hostId}:`, error);
+      console.error('[Ping] Error fetching host statuses:', error);
       
       // Set to unknown on error
-      badge.setAttribute('data-status', 'unknown');
-      if (typeof window.updateStatusBadgeAnimation === 'function') {
-        window.updateStatusBadgeAnimation(badgeId, 'unknown');
-      }
-    });
+      this.hosts.forEach(badgeId => this.setBadgeStatus(badgeId, 'unknown'));
+    })
+    .finally(() => clearTimeout(timeoutId));
   }
 
   /**
    * Stop pinging a specific host
    */
   stopPing(hostId) {
-    if (this.activeTimers.has(hostId)) {
-      clearInterval(this.activeTimers.get(hostId));
-      this.activeTimers.delete(hostId);
+    this.hosts.delete(String(hostId));
+    if (this.hosts.size === 0) {
+      this.stopAll();
     }
   }
 
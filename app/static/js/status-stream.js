@@ -0,0 +1,115 @@
+/**
+ * Live host status updates for WOL Manager
+ * Subscribes to status transitions over Server-Sent Events and falls back
+ * to polling /hosts/api/status when the stream is unavailable
+ */
+
+(function() {
+  const STREAM_URL = '/hosts/api/status/stream';
+  const POLL_INTERVAL = 15000;   // Polling interval without a live stream
+  const RESYNC_INTERVAL = 60000; // Full refresh while streaming, catches expired statuses
+
+  /**
+   * Keep host statuses on the page up to date
+   * @param {Function} onStatus - Called with one status object per transition
+   * @param {Function} poll - Fetches and applies the full status list
+   */
+  function subscribeHostStatuses(onStatus, poll) {
+    poll();
+
+    if (typeof window.EventSource !== 'function') {
+      return setInterval(poll, POLL_INTERVAL);
+    }
+
+    let timerId = setInterval(poll, RESYNC_INTERVAL);
+    const source = new EventSource(STREAM_URL);
+
+    source.addEventListener('status', (event) => {
+      try {
+        onStatus(JSON.parse(event.data));
+      } catch (error) {
+        console.error('Invalid host status event:', error);
+      }
+    });
+
+    // Outcomes of the user's queued wakes, re-dispatched for whichever page queued them
+    source.addEventListener('wake_job', (event) => {
+      try {
+        window.dispatchEvent(new CustomEvent('wakejob', { detail: JSON.parse(event.data) }));
+      } catch (error) {
+        console.error('Invalid wake job event:', error);
+      }
+    });
+
+    source.addEventListener('error', () => {
+      // The browser reconnects on its own unless the server refused the stream
+      if (source.readyState === EventSource.CLOSED) {
+        clearInterval(timerId);
+        timerId = setInterval(poll, POLL_INTERVAL);
+      }
+    });
+
+    return timerId;
+  }
+
+  /**
+   * Ask the ping service to check hosts now
+   * Results also arrive on the status stream; with wait > 0 the request
+   * returns once they are in (or after wait seconds)
+   * @param {Array<number>} hostIds - Hosts to probe
+   * @param {number} wait - Seconds to wait for the results (max 10)
+   * @returns {Promise<Object>} Queued, collapsed and probed host IDs plus current statuses
+   */
+  function requestHostProbe(hostIds, wait = 0) {
+    return fetch('/hosts/api/probe', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-Requested-With': 'XMLHttpRequest',
+        'X-CSRFToken': window.csrfToken
+      },
+      body: JSON.stringify({ host_ids: hostIds, wait: wait })
+    }).then(response => response.json());
+  }
+
+  /**
+   * Wait for the outcome of a queued wake job
+   * Resolves from the pushed wake_job event, or by polling the job status
+   * when no event arrives (e.g. without a live stream)
+   * @param {string} jobId - Job ID from the 202 response of a wake request
+   * @param {number} timeout - Milliseconds to wait at most
+   * @returns {Promise<Object|null>} Finished job, or null on timeout
+   */
+  function waitForWakeJob(jobId, timeout = 30000) {
+    return new Promise((resolve) => {
+      let pollId = null;
+      const finish = (job) => {
+        window.removeEventListener('wakejob', onEvent);
+        clearInterval(pollId);
+        clearTimeout(timeoutId);
+        resolve(job);
+      };
+      const onEvent = (event) => {
+        if (event.detail.job_id === jobId) {
+          finish(event.detail);
+        }
+      };
+      const timeoutId = setTimeout(() => finish(null), timeout);
+      window.addEventListener('wakejob', onEvent);
+      pollId = setInterval(() => {
+        fetch(`/wol/jobs/${jobId}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+          .then(response => response.ok ? response.json() : null)
+          .then(job => {
+            if (job && (job.status === 'done' || job.status === 'failed')) {
+              finish(job);
+            }
+          })
+          .catch(() => {});
+      }, 3000);
+    });
+  }
+
+  window.subscribeHostStatuses = subscribeHostStatuses;
+  window.waitForWakeJob = waitForWakeJob;
+  window.requestHostProbe = requestHostProbe;
+})();
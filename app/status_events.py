@@ -0,0 +1,216 @@
+"""
+Host status transition events for Server-Sent Events clients.
+
+The ping service appends every status transition to a Redis stream. Each
+web process runs a single StatusEventHub thread that tails the stream and
+keeps the most recent events in memory, so connected browsers share one
+Redis connection and only ever receive changes instead of re-polling the
+status of every host.
+"""
+
+import threading
+import time
+import json
+import math
+from collections import deque
+from app import ping_service
+from app.logging_config import get_logger
+
+logger = get_logger('app.status_events')
+
+
+def parse_event_id(event_id):
+    """
+    Parse a Redis stream entry ID into a comparable tuple.
+
+    Args:
+        event_id: ID in "<milliseconds>-<sequence>" form
+
+    Returns:
+        tuple: (milliseconds, sequence), or None if the ID is malformed
+    """
+    try:
+        milliseconds, _, sequence = str(event_id).partition('-')
+        return int(milliseconds), int(sequence or 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatusEventHub:
+    """Tails the status event stream and fans events out to local subscribers."""
+
+    def __init__(self, buffer_size=1000, block_ms=5000):
+        """
+        Initialize the hub.
+
+        Args:
+            buffer_size: Number of recent events kept in memory (default: 1000)
+            block_ms: Maximum time a single XREAD blocks in milliseconds (default: 5000)
+        """
+        self.block_ms = block_ms
+        # (parsed_id, event_id, event) triples in stream order
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._last_id = None
+        # Every event newer than this ID is in the buffer
+        self._floor = (0, 0)
+        self._thread = None
+
+    def start(self):
+        """Start the tailing thread if it is not running yet."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='status-events', daemon=True)
+            self._thread.start()
+            logger.info("Status event hub started")
+
+    def latest_id(self):
+        """
+        Return the ID of the newest event, waiting briefly for the first read.
+
+        Returns:
+            str: Newest stream entry ID, "0-0" if the stream is empty
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id is not None, timeout=self.block_ms / 1000.0)
+            return self._last_id or '0-0'
+
+    def wait_for_events(self, after_id, timeout):
+        """
+        Return the events newer than after_id, waiting up to timeout seconds.
+
+        Args:
+            after_id: Stream entry ID the client has already seen
+            timeout: Seconds to wait when there are no newer events
+
+        Returns:
+            list: (event_id, event) pairs in stream order
+        """
+        if not math.isfinite(timeout) or timeout < 0:
+            # NaN would never run out and make Condition.wait() return at once
+            timeout = 0
+        after = parse_event_id(after_id) or (0, 0)
+        deadline = time.monotonic() + timeout
+        if after < self._floor:
+            # Client is further behind than the buffer reaches
+            backlog = self._read_backlog(after)
+            if backlog:
+                return backlog
+            # Nothing to read (trimmed away, or Redis is down): resume from the
+            # buffer and wait there instead of having the caller retry at once
+            after = self._floor
+        with self._condition:
+            while True:
+                if after < self._floor:
+                    # The buffer moved past the client while it waited
+                    break
+                newer = [item for item in self._events if item[0] > after]
+                if newer:
+                    return [(event_id, event) for _, event_id, event in newer]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+        return self._read_backlog(after)
+
+    def _read_backlog(self, after):
+        """Read events older than the in-memory buffer straight from Redis."""
+        client = ping_service.redis_client
+        if client is None:
+            return []
+        try:
+            entries = client.xrange(
+                ping_service.STATUS_EVENTS_KEY,
+                min='%d-%d' % (after[0], after[1] + 1),
+                count=self._events.maxlen
+            )
+        except Exception as e:
+            logger.warning("Failed to read status event backlog: error=%s", str(e))
+            return []
+        return [(event_id, event) for event_id, event in map(self._decode, entries) if event is not None]
+
+    @staticmethod
+    def _decode(entry):
+        event_id, fields = entry
+        try:
+            return event_id, json.loads(fields['data'])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Skipping malformed status event: id=%s", event_id)
+            return event_id, None
+
+    def _run(self):
+        """Thread body: follow the stream and wake waiting subscribers."""
+        while True:
+            client = ping_service.redis_client
+            if client is None:
+                time.sleep(1)
+                continue
+            try:
+                if self._last_id is None:
+                    newest = client.xrevrange(ping_service.STATUS_EVENTS_KEY, count=1)
+                    with self._condition:
+                        self._last_id = newest[0][0] if newest else '0-0'
+                        self._floor = parse_event_id(self._last_id)
+                        self._condition.notify_all()
+                response = client.xread({ping_service.STATUS_EVENTS_KEY: self._last_id}, block=self.block_ms)
+                if not response:
+                    continue
+                with self._condition:
+                    for event_id, event in map(self._decode, response[0][1]):
+                        if event is None:
+                            continue
+                        if len(self._events) == self._events.maxlen:
+                            self._floor = self._events[0][0]
+                        self._events.append((parse_event_id(event_id), event_id, event))
+                    self._last_id = response[0][1][-1][0]
+                    self._condition.notify_all()
+            except Exception as e:
+                logger.error("Status event hub read failed: error=%s", str(e))
+                time.sleep(1)
+
+
+# Per-process hub, created on the first stream request
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_status_event_hub():
+    """Get the process-wide status event hub, starting it if needed."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = StatusEventHub()
+        _hub.start()
+        return _hub
+
+
+def wait_for_probe_results(host_ids, after_id, timeout, hub=None):
+    """
+    Wait for the results of on-demand probes.
+
+    Args:
+        host_ids: IDs of the hosts that were queued with request_probe()
+        after_id: Event ID taken before the probes were requested
+        timeout: Seconds to wait at most
+        hub: StatusEventHub to use (default: the process-wide hub)
+
+    Returns:
+        set: IDs of the hosts whose result arrived in time
+    """
+    if not math.isfinite(timeout) or timeout <= 0:
+        return set()
+    hub = hub or get_status_event_hub()
+    pending = set(host_ids)
+    probed = set()
+    deadline = time.monotonic() + timeout
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        for event_id, event in hub.wait_for_events(after_id, remaining):
+            after_id = event_id
+            if event.get("on_demand") and event.get("host_id") in pending:
+                pending.discard(event["host_id"])
+                probed.add(event["host_id"])
+    return probed
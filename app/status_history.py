@@ -0,0 +1,269 @@
+"""
+Host status history stored as run-length encoded intervals.
+
+Instead of one row per probe, every host has one row per stretch of
+identical status: a transition closes the open interval and opens the
+next one. Uptime, transition counts and the last change over any window
+are computed from a handful of rows per host, no matter how often the
+host was probed.
+
+The same writes keep each host's last_status and last_seen columns
+current, which prime_status_store() loads into Redis on startup so hosts
+do not read as unknown until the first probe cycle has finished. Hosts
+that stay online have last_seen refreshed every PING_LAST_SEEN_INTERVAL
+seconds rather than after every probe, so a primed last_seen is at most
+that old.
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from app import db_session, ping_service
+from app.models import Host, HostStatusInterval
+from app.logging_config import get_logger
+
+logger = get_logger('app.status_history')
+
+# Keep IN (...) lists below SQLite's bound parameter limit
+_QUERY_CHUNK = 500
+
+
+def _chunks(items, size=_QUERY_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class StatusHistoryRecorder:
+    """
+    Collects observed statuses in the ping worker and stores transitions in batches.
+
+    Observations are cheap to add; flush() compares them with each host's
+    open interval and only writes rows when the status actually changed.
+    The host's last_status and last_seen columns are updated in the same
+    transaction, once per host and flush.
+    """
+
+    def __init__(self, flush_interval=5.0, clock=time.monotonic):
+        """
+        Initialize the recorder.
+
+        Args:
+            flush_interval: Seconds between database writes (default: 5)
+            clock: Monotonic time source
+        """
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._pending = []
+        self._next_flush = clock() + flush_interval
+
+    def add(self, host_id, status, observed_at=None, last_seen=None):
+        """
+        Queue an observed status.
+
+        Args:
+            host_id: The ID of the host
+            status: "online" or "offline"
+            observed_at: UTC datetime of the observation (default: now)
+            last_seen: UTC datetime the host last answered, for offline
+                statuses (default: keep the stored value)
+        """
+        observed_at = observed_at or datetime.utcnow()
+        if status == "online":
+            last_seen = observed_at
+        self._pending.append((host_id, status, observed_at, last_seen))
+
+    def flush_if_due(self):
+        """Flush when the flush interval has passed."""
+        if self.clock() >= self._next_flush:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Write queued transitions.
+
+        Returns:
+            int: Number of intervals opened
+        """
+        self._next_flush = self.clock() + self.flush_interval
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+
+        try:
+            host_ids = {host_id for host_id, _, _, _ in pending}
+            last_statuses = {}
+            open_intervals = {}
+            for chunk in _chunks(host_ids):
+                last_statuses.update(db_session.query(Host.id, Host.last_status).filter(Host.id.in_(chunk)))
+                rows = db_session.query(HostStatusInterval).filter(
+                    HostStatusInterval.host_id.in_(chunk),
+                    HostStatusInterval.ended_at.is_(None)
+                ).order_by(HostStatusInterval.started_at)
+                for row in rows:
+                    previous = open_intervals.get(row.host_id)
+                    if previous is not None:
+                        # Left open by a worker that lost the host's shard mid-write
+                        previous.ended_at = row.started_at
+                    open_intervals[row.host_id] = row
+
+            opened = 0
+            host_updates = {}
+            for host_id, status, observed_at, last_seen in pending:
+                if host_id not in last_statuses:
+                    continue  # Host was deleted meanwhile
+                if last_statuses[host_id] != status or last_seen is not None:
+                    update = host_updates.setdefault(host_id, {"id": host_id})
+                    update["last_status"] = last_statuses[host_id] = status
+                    if last_seen is not None:
+                        update["last_seen"] = last_seen
+                current = open_intervals.get(host_id)
+                if current is not None:
+                    if current.status == status:
+                        continue
+                    current.ended_at = observed_at
+                interval = HostStatusInterval(host_id=host_id, status=status, started_at=observed_at)
+                db_session.add(interval)
+                open_intervals[host_id] = interval
+                opened += 1
+
+            if host_updates:
+                db_session.bulk_update_mappings(Host, list(host_updates.values()))
+            db_session.commit()
+            if opened:
+                logger.debug("Status history updated: intervals_opened=%s observations=%s", opened, len(pending))
+            return opened
+        except Exception as e:
+            db_session.rollback()
+            logger.error("Failed to write status history: observations=%s error=%s", len(pending), str(e), exc_info=True)
+            return 0
+        finally:
+            db_session.remove()
+
+
+def prune_history(retention_days):
+    """
+    Delete intervals that ended before the retention window.
+
+    Args:
+        retention_days: Days of history to keep
+
+    Returns:
+        int: Number of deleted intervals
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    try:
+        deleted = db_session.query(HostStatusInterval).filter(
+            HostStatusInterval.ended_at < cutoff
+        ).delete(synchronize_session=False)
+        db_session.commit()
+        if deleted:
+            logger.info("Pruned status history: intervals=%s older_than=%s", deleted, cutoff.isoformat())
+        return deleted
+    except Exception as e:
+        db_session.rollback()
+        logger.error("Failed to prune status history: error=%s", str(e), exc_info=True)
+        return 0
+    finally:
+        db_session.remove()
+
+
+def compute_uptime(host_ids, start, end):
+    """
+    Summarize host status over a window.
+
+    Args:
+        host_ids: Iterable of host IDs
+        start: Window start (naive UTC datetime)
+        end: Window end (naive UTC datetime)
+
+    Returns:
+        dict: host_id -> {
+            "uptime_percent": share of observed time online (None without data),
+            "coverage_percent": share of the window with a known status,
+            "online_seconds", "offline_seconds": observed time per status,
+            "transitions": status changes inside the window,
+            "last_change": ISO time the current status began (None without data),
+            "status": status at the end of the window
+        }
+    """
+    now = datetime.utcnow()
+    window_seconds = max((end - start).total_seconds(), 0)
+    summary = {
+        host_id: {
+            "uptime_percent": None,
+            "coverage_percent": 0.0,
+            "online_seconds": 0.0,
+            "offline_seconds": 0.0,
+            "transitions": 0,
+            "last_change": None,
+            "status": "unknown"
+        }
+        for host_id in host_ids
+    }
+
+    for chunk in _chunks(summary):
+        rows = db_session.query(
+            HostStatusInterval.host_id,
+            HostStatusInterval.status,
+            HostStatusInterval.started_at,
+            HostStatusInterval.ended_at
+        ).filter(
+            HostStatusInterval.host_id.in_(chunk),
+            HostStatusInterval.started_at < end,
+            or_(HostStatusInterval.ended_at.is_(None), HostStatusInterval.ended_at > start)
+        ).order_by(HostStatusInterval.host_id, HostStatusInterval.started_at)
+
+        previous_status = {}
+        for host_id, status, started_at, ended_at in rows:
+            entry = summary[host_id]
+            seconds = (min(ended_at or now, end) - max(started_at, start)).total_seconds()
+            if seconds > 0:
+                entry[status + "_seconds"] = entry.get(status + "_seconds", 0.0) + seconds
+            if host_id in previous_status and previous_status[host_id] != status:
+                entry["transitions"] += 1
+            previous_status[host_id] = status
+            entry["last_change"] = started_at.isoformat()
+            entry["status"] = status
+
+    for entry in summary.values():
+        observed = entry["online_seconds"] + entry["offline_seconds"]
+        if observed > 0:
+            entry["uptime_percent"] = round(entry["online_seconds"] / observed * 100, 3)
+        if window_seconds > 0:
+            entry["coverage_percent"] = round(min(observed / window_seconds, 1.0) * 100, 3)
+    return summary
+
+
+def prime_status_store(ttl):
+    """
+    Load every host's last known status into Redis
+
+    Entries are marked stale and never replace a status that is already
+    stored, so this is safe to run on every start, next to a running
+    ping service.
+
+    Args:
+        ttl: Seconds the primed entries live unless a probe replaces them
+
+    Returns:
+        int: Number of hosts primed
+    """
+    try:
+        rows = db_session.query(Host.id, Host.last_status, Host.last_seen).filter(
+            Host.last_status.isnot(None)
+        ).all()
+    finally:
+        db_session.remove()
+    entries = {
+        host_id: (status, last_seen.isoformat() if last_seen else None)
+        for host_id, status, last_seen in rows
+    }
+    primed = ping_service.prime_host_statuses(entries, ttl)
+    logger.info("Status store primed from database: hosts=%s primed=%s", len(entries), primed)
+    return primed
+
+
+# Shared recorder used by the ping service
+history_recorder = StatusHistoryRecorder()
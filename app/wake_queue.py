@@ -0,0 +1,343 @@
+"""
+Wake job queue: wake requests are executed by sender workers, not request threads.
+
+A wake request only checks permissions, stores a job record and appends
+the job to a Redis stream, then returns its ID (HTTP 202). Sender
+workers read the stream through a consumer group, so any number of them
+can share the work: a thread of the web process (WAKE_SENDER_IN_PROCESS)
+or separate processes started with
+
+    python -m app.wake_worker [--threads 2]
+
+A sender sends the packets, writes the WolLog rows, records the outcome
+on the job and publishes it to the status event stream, where the SSE
+endpoint pushes it to the user who queued the job. Jobs of a sender that
+died mid-job are claimed by another one after WAKE_JOB_CLAIM_IDLE seconds;
+jobs that waited longer than WAKE_JOB_MAX_AGE are failed instead of
+waking a host long after the click.
+
+Packets are sent at most once per job: a sender sets the job's sent_at
+field with HSETNX before sending, and a claimed job that already has it
+is only finished (outcome, event, acknowledgement), never sent again.
+A sender that dies between sending and recording the outcome therefore
+leaves the job failed with an "outcome unknown" error rather than waking
+the hosts twice and logging duplicate WolLog rows.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from app import ping_service
+from app.logging_config import get_logger
+
+logger = get_logger('app.wake_queue')
+
+WAKE_QUEUE_KEY = "wol:wake:queue"
+WAKE_QUEUE_GROUP = "senders"
+WAKE_JOB_PREFIX = "wol:wake:job:"
+# Approximate number of stream entries kept; acknowledged jobs are deleted right away
+WAKE_QUEUE_MAXLEN = 100000
+
+# Seconds a job record stays queryable, set by configure_wake_queue()
+WAKE_JOB_TTL = 3600
+# Seconds a job may wait before it is failed instead of sent
+WAKE_JOB_MAX_AGE = 120
+# Seconds a job may stay unacknowledged before another sender takes it over
+WAKE_JOB_CLAIM_IDLE = 30
+
+
+def configure_wake_queue(config):
+    """
+    Apply the WAKE_JOB_* settings.
+
+    Args:
+        config: Flask config mapping
+    """
+    global WAKE_JOB_TTL, WAKE_JOB_MAX_AGE, WAKE_JOB_CLAIM_IDLE
+    WAKE_JOB_TTL = int(config.get('WAKE_JOB_TTL', WAKE_JOB_TTL))
+    WAKE_JOB_MAX_AGE = int(config.get('WAKE_JOB_MAX_AGE', WAKE_JOB_MAX_AGE))
+    WAKE_JOB_CLAIM_IDLE = int(config.get('WAKE_JOB_CLAIM_IDLE', WAKE_JOB_CLAIM_IDLE))
+
+
+def enqueue_wake(targets, user_id):
+    """
+    Queue a wake job.
+
+    Args:
+        targets: (host_id, mac_address) pairs, permissions already checked
+        user_id: The ID of the user the job is run for
+
+    Returns:
+        dict: The queued job (see get_wake_job()), or None if Redis is unavailable
+    """
+    client = ping_service.redis_client
+    if client is None:
+        return None
+
+    job_id = uuid.uuid4().hex
+    created_at = time.time()
+    host_ids = [host_id for host_id, _ in targets]
+    payload = {
+        "id": job_id,
+        "user_id": user_id,
+        "targets": [[host_id, mac_address] for host_id, mac_address in targets],
+        "created_at": created_at
+    }
+    key = WAKE_JOB_PREFIX + job_id
+    try:
+        pipe = client.pipeline()
+        pipe.hset(key, mapping={
+            "status": "queued",
+            "user_id": user_id,
+            "host_ids": json.dumps(host_ids),
+            "created_at": created_at
+        })
+        pipe.expire(key, WAKE_JOB_TTL)
+        pipe.xadd(WAKE_QUEUE_KEY, {"job": json.dumps(payload)}, maxlen=WAKE_QUEUE_MAXLEN, approximate=True)
+        pipe.execute()
+    except Exception as e:
+        logger.error("Failed to queue wake job: hosts=%s user_id=%s error=%s", len(host_ids), user_id, str(e))
+        return None
+
+    logger.debug("Wake job queued: job_id=%s hosts=%s user_id=%s", job_id, len(host_ids), user_id)
+    return {"id": job_id, "status": "queued", "user_id": user_id, "host_ids": host_ids, "created_at": created_at}
+
+
+def get_wake_job(job_id):
+    """
+    Get the state of a wake job.
+
+    Args:
+        job_id: ID returned by enqueue_wake()
+
+    Returns:
+        dict: id, status ("queued", "running", "done" or "failed"), user_id,
+            host_ids, woken, failed, error, duration_ms and epoch timestamps,
+            or None if the job is unknown or expired
+    """
+    client = ping_service.redis_client
+    if client is None:
+        return None
+    try:
+        fields = client.hgetall(WAKE_JOB_PREFIX + str(job_id))
+    except Exception as e:
+        logger.error("Failed to read wake job: job_id=%s error=%s", job_id, str(e))
+        return None
+    if not fields:
+        return None
+
+    job = {"id": job_id, "status": fields.get("status"), "user_id": int(fields.get("user_id") or 0),
+           "error": fields.get("error")}
+    for name in ("host_ids", "woken", "failed"):
+        job[name] = json.loads(fields[name]) if fields.get(name) else []
+    for name in ("created_at", "started_at", "finished_at", "duration_ms"):
+        job[name] = float(fields[name]) if fields.get(name) else None
+    return job
+
+
+class WakeSender:
+    """Consumer of the wake queue; run() processes jobs until stopped."""
+
+    def __init__(self, interface=None, batch_size=50, block_ms=2000, consumer=None):
+        """
+        Initialize the sender.
+
+        Args:
+            interface: Network interface packets are sent from (default: routing decides)
+            batch_size: Jobs read per XREADGROUP call (default: 50)
+            block_ms: Longest a read blocks, bounds the reaction to stop (default: 2000)
+            consumer: Unique consumer name (default: host name, PID and a random suffix)
+        """
+        self.interface = interface
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.consumer = consumer or "%s:%s:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self._group_ready = False
+        self._next_claim = 0
+
+    def _ensure_group(self, client):
+        if self._group_ready:
+            return
+        try:
+            client.xgroup_create(WAKE_QUEUE_KEY, WAKE_QUEUE_GROUP, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def _read(self, client):
+        """Jobs abandoned by a dead sender first, then new ones."""
+        now = time.monotonic()
+        if now >= self._next_claim:
+            self._next_claim = now + WAKE_JOB_CLAIM_IDLE / 2.0
+            claimed = client.xautoclaim(WAKE_QUEUE_KEY, WAKE_QUEUE_GROUP, self.consumer,
+                                        WAKE_JOB_CLAIM_IDLE * 1000, count=self.batch_size)
+            if claimed[1]:
+                logger.warning("Claimed wake jobs of a stalled sender: jobs=%s consumer=%s",
+                               len(claimed[1]), self.consumer)
+                return claimed[1]
+        response = client.xreadgroup(WAKE_QUEUE_GROUP, self.consumer, {WAKE_QUEUE_KEY: '>'},
+                                     count=self.batch_size, block=self.block_ms)
+        return response[0][1] if response else []
+
+    def run(self, stop=None):
+        """
+        Process jobs until stop is set.
+
+        Args:
+            stop: threading.Event ending the loop (default: run forever)
+        """
+        stop = stop or threading.Event()
+        logger.info("Wake sender started: consumer=%s", self.consumer)
+        while not stop.is_set():
+            client = ping_service.redis_client
+            if client is None:
+                stop.wait(1)
+                continue
+            try:
+                self._ensure_group(client)
+                for entry_id, fields in self._read(client):
+                    self.process(client, entry_id, fields)
+            except Exception as e:
+                if 'NOGROUP' in str(e):
+                    self._group_ready = False  # Stream was deleted, e.g. by FLUSHALL
+                logger.error("Wake sender read failed: consumer=%s error=%s", self.consumer, str(e))
+                stop.wait(1)
+        logger.info("Wake sender stopped: consumer=%s", self.consumer)
+
+    def process(self, client, entry_id, fields):
+        """
+        Execute one queued job and acknowledge it.
+
+        Args:
+            client: Redis client
+            entry_id: Stream entry ID
+            fields: Stream entry fields
+        """
+        from app.wol import perform_wake
+
+        try:
+            job = json.loads(fields["job"])
+            targets = [(int(host_id), mac_address) for host_id, mac_address in job["targets"]]
+        except (KeyError, TypeError, ValueError):
+            logger.error("Dropping malformed wake job: entry_id=%s", entry_id)
+            self._ack(client, entry_id)
+            return
+
+        key = WAKE_JOB_PREFIX + job["id"]
+        fields = client.hgetall(key)
+        if fields.get("sent_at"):
+            # Redelivered after the packets went out, e.g. because finishing failed
+            self._finish_sent(client, entry_id, job, fields)
+            return
+
+        waited = time.time() - job["created_at"]
+        if waited > WAKE_JOB_MAX_AGE:
+            logger.warning("Wake job expired before it was sent: job_id=%s waited=%.0fs", job["id"], waited)
+            self._finish(client, entry_id, job, [], [host_id for host_id, _ in targets], 0, "expired")
+            return
+
+        now = time.time()
+        pipe = client.pipeline()
+        pipe.hset(key, mapping={"status": "running", "started_at": now})
+        pipe.hsetnx(key, "sent_at", now)
+        pipe.expire(key, WAKE_JOB_TTL)
+        if not pipe.execute()[1]:
+            # Another sender claimed the job meanwhile and is sending it
+            logger.warning("Wake job already sent by another sender: job_id=%s consumer=%s", job["id"], self.consumer)
+            return
+
+        try:
+            woken, failed, elapsed_ms = perform_wake(targets, job["user_id"], interface=self.interface)
+        except Exception as e:
+            logger.error("Wake job failed: job_id=%s error=%s", job["id"], str(e), exc_info=True)
+            self._finish(client, entry_id, job, [], [host_id for host_id, _ in targets], 0, str(e))
+            return
+        try:
+            # Kept apart from _finish() so a redelivery can still report the outcome
+            client.hset(key, mapping={"woken": json.dumps(woken), "failed": json.dumps(failed),
+                                      "duration_ms": round(elapsed_ms, 2)})
+        except Exception as e:
+            logger.warning("Failed to record wake job outcome: job_id=%s error=%s", job["id"], str(e))
+        self._finish(client, entry_id, job, woken, failed, elapsed_ms)
+
+    def _finish_sent(self, client, entry_id, job, fields):
+        """Finish a job whose packets were already sent, from its recorded outcome."""
+        if "woken" in fields:
+            woken = json.loads(fields["woken"])
+            failed = json.loads(fields.get("failed") or "[]")
+            self._finish(client, entry_id, job, woken, failed, float(fields.get("duration_ms") or 0),
+                         fields.get("error"))
+        else:
+            host_ids = [int(host_id) for host_id, _ in job["targets"]]
+            self._finish(client, entry_id, job, [], host_ids, 0, "sender stopped after sending; outcome unknown")
+        logger.warning("Finished redelivered wake job without sending again: job_id=%s consumer=%s",
+                       job["id"], self.consumer)
+
+    def _finish(self, client, entry_id, job, woken, failed, elapsed_ms, error=None):
+        status = "done" if woken else "failed"
+        event = {
+            "type": "wake_job",
+            "job_id": job["id"],
+            "user_id": job["user_id"],
+            "status": status,
+            "woken": woken,
+            "failed": failed,
+            "duration_ms": round(elapsed_ms, 2),
+            "finished_at": datetime.utcnow().isoformat()
+        }
+        if error:
+            event["error"] = error
+        key = WAKE_JOB_PREFIX + job["id"]
+        mapping = {
+            "status": status,
+            "woken": json.dumps(woken),
+            "failed": json.dumps(failed),
+            "duration_ms": round(elapsed_ms, 2),
+            "finished_at": time.time()
+        }
+        if error:
+            mapping["error"] = error
+        pipe = client.pipeline()
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, WAKE_JOB_TTL)
+        # Pushed to the user's browser by the status SSE endpoint
+        pipe.xadd(ping_service.STATUS_EVENTS_KEY, {"data": json.dumps(event)},
+                  maxlen=ping_service.STATUS_EVENTS_MAXLEN, approximate=True)
+        pipe.xack(WAKE_QUEUE_KEY, WAKE_QUEUE_GROUP, entry_id)
+        pipe.xdel(WAKE_QUEUE_KEY, entry_id)
+        pipe.execute()
+        logger.info("Wake job finished: job_id=%s status=%s woken=%s failed=%s duration_ms=%.2f",
+                    job["id"], status, len(woken), len(failed), elapsed_ms)
+
+    def _ack(self, client, entry_id):
+        pipe = client.pipeline()
+        pipe.xack(WAKE_QUEUE_KEY, WAKE_QUEUE_GROUP, entry_id)
+        pipe.xdel(WAKE_QUEUE_KEY, entry_id)
+        pipe.execute()
+
+
+def start_wake_senders(config, threads=1, stop=None):
+    """
+    Start sender threads in the current process.
+
+    Args:
+        config: Flask config mapping with WOL_INTERFACE and WAKE_* settings
+        threads: Number of sender threads (default: 1)
+        stop: threading.Event that ends them (default: run until exit)
+
+    Returns:
+        list: The started threads
+    """
+    configure_wake_queue(config)
+    started = []
+    for number in range(max(1, int(threads))):
+        sender = WakeSender(interface=config.get('WOL_INTERFACE'), batch_size=config.get('WAKE_SENDER_BATCH', 50))
+        thread = threading.Thread(target=sender.run, args=(stop,), name='wake-sender-%s' % number, daemon=True)
+        thread.start()
+        started.append(thread)
+    return started
@@ -0,0 +1,328 @@
+"""
+Scheduled wakes: cron-like schedules per host or per role, fired in process.
+
+The scheduler keeps a min-heap of (next fire time, schedule ID) and only
+ever looks at its top, so a tick with nothing due costs O(1) and firing
+k schedules costs O(k log n), no matter how many schedules exist. The
+schedules themselves are loaded once and reloaded only when the schedule
+version counter in Redis changes, which the schedule routes bump after
+every change.
+
+Every process that runs a scheduler takes part in a single-shard lease
+(leader election, see app.shard_leases); only the current leader fires.
+A new leader computes next fire times from now on, so wakes missed while
+no leader was alive are skipped rather than replayed hours later.
+
+Due schedules are fired together through the bulk wake path: hosts are
+resolved with one query per kind, packets go out over the pooled
+socket and the WolLog rows of each schedule owner are inserted in one
+statement. Permissions are checked again at fire time, so a schedule
+stops waking hosts its owner has since lost access to.
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+import pytz
+from sqlalchemy import or_
+from app import db_session, ping_service
+from app.cron import CronExpression
+from app.models import Host, User, WakeSchedule
+from app.shard_leases import ShardLeases
+from app.logging_config import get_logger
+
+logger = get_logger('app.wake_scheduler')
+
+SCHEDULES_VERSION_KEY = "wol:schedules:version"
+# Version marker that differs from anything Redis returns, forcing a load
+_NOT_LOADED = object()
+
+
+def publish_schedule_change():
+    """
+    Tell the scheduler that schedules changed.
+
+    Must be called after the database change has been committed.
+    """
+    client = ping_service.redis_client
+    if client is None:
+        return
+    try:
+        client.incr(SCHEDULES_VERSION_KEY)
+    except Exception as e:
+        logger.warning("Failed to publish schedule change: error=%s", str(e))
+
+
+def next_fire_time(cron, after, timezone):
+    """
+    Get the next fire time of a schedule.
+
+    Args:
+        cron: CronExpression
+        after: Epoch seconds
+        timezone: pytz time zone the expression is evaluated in
+
+    Returns:
+        float: Epoch seconds, or None if the expression never fires
+    """
+    # Cron fields describe wall clock time, so step through naive local time
+    local = datetime.fromtimestamp(after, timezone).replace(tzinfo=None)
+    fire_at = cron.next_after(local)
+    return timezone.localize(fire_at).timestamp() if fire_at is not None else None
+
+
+class WakeScheduler:
+    """Min-heap timer over all enabled wake schedules, fired by the elected leader."""
+
+    def __init__(self, timezone='UTC', refresh_interval=10, lease_ttl=15, interface=None, clock=time.time):
+        """
+        Initialize the scheduler.
+
+        Args:
+            timezone: IANA time zone cron expressions are evaluated in (default: UTC)
+            refresh_interval: Seconds between schedule version checks (default: 10)
+            lease_ttl: Seconds before another process takes over from a dead leader (default: 15)
+            interface: Network interface packets are sent from (default: routing decides)
+            clock: Wall clock time source
+        """
+        self.timezone = pytz.timezone(timezone)
+        self.refresh_interval = refresh_interval
+        self.interface = interface
+        self.clock = clock
+        self.leases = ShardLeases('wake_scheduler', 1, ttl=lease_ttl)
+        # schedule_id -> (CronExpression, host_id, role_id, created_by)
+        self._schedules = {}
+        # (fire_at, schedule_id) pairs; the earliest fire time is always at index 0
+        self._heap = []
+        self._version = _NOT_LOADED
+        self._next_refresh = 0
+
+    @property
+    def is_leader(self):
+        return 0 in self.leases.owned
+
+    def load(self, now=None):
+        """
+        Load every enabled schedule and rebuild the heap from now on.
+
+        Returns:
+            int: Number of scheduled entries
+        """
+        now = self.clock() if now is None else now
+        try:
+            rows = db_session.query(
+                WakeSchedule.id, WakeSchedule.cron, WakeSchedule.host_id,
+                WakeSchedule.role_id, WakeSchedule.created_by
+            ).filter(WakeSchedule.enabled.is_(True)).all()
+        finally:
+            db_session.remove()
+
+        schedules = {}
+        heap = []
+        for schedule_id, cron, host_id, role_id, created_by in rows:
+            try:
+                expression = CronExpression(cron)
+            except ValueError as e:
+                logger.warning("Skipping wake schedule with invalid cron expression: schedule_id=%s error=%s",
+                               schedule_id, str(e))
+                continue
+            fire_at = next_fire_time(expression, now, self.timezone)
+            if fire_at is None:
+                continue
+            schedules[schedule_id] = (expression, host_id, role_id, created_by)
+            heap.append((fire_at, schedule_id))
+        heapq.heapify(heap)
+        self._schedules = schedules
+        self._heap = heap
+        logger.info("Wake schedules loaded: schedules=%s", len(heap))
+        return len(heap)
+
+    def refresh_if_changed(self):
+        """Reload the schedules when the version counter in Redis moved."""
+        client = ping_service.redis_client
+        if client is None:
+            return False
+        try:
+            version = client.get(SCHEDULES_VERSION_KEY)
+        except Exception as e:
+            logger.warning("Failed to read schedule version: error=%s", str(e))
+            return False
+        if version == self._version:
+            return False
+        self._version = version
+        self.load()
+        return True
+
+    def next_due(self):
+        """Epoch seconds of the earliest fire time, or None without schedules."""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """
+        Take the schedules that are due and re-arm them.
+
+        The next fire time is computed from now, not from the missed fire
+        time, so a late tick fires each schedule once instead of catching up.
+
+        Args:
+            now: Epoch seconds
+
+        Returns:
+            list: IDs of the due schedules
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, schedule_id = self._heap[0]
+            schedule = self._schedules.get(schedule_id)
+            fire_at = next_fire_time(schedule[0], now, self.timezone) if schedule else None
+            if fire_at is None:
+                heapq.heappop(self._heap)
+            else:
+                heapq.heapreplace(self._heap, (fire_at, schedule_id))
+            if schedule:
+                due.append(schedule_id)
+        return due
+
+    def _resolve_targets(self, schedule_ids):
+        """
+        Group the hosts of due schedules by schedule owner: {user_id: {host_id: mac_address}}.
+
+        Only hosts the owner may wake right now are included; owners that no
+        longer exist get nothing.
+        """
+        from app.wol import wake_permission_checker
+
+        host_owners = {}
+        role_owners = {}
+        for schedule_id in schedule_ids:
+            _, host_id, role_id, created_by = self._schedules[schedule_id]
+            if host_id is not None:
+                host_owners.setdefault(host_id, set()).add(created_by)
+            elif role_id is not None:
+                role_owners.setdefault(str(role_id), set()).add(created_by)
+        if not host_owners and not role_owners:
+            return {}
+
+        owner_ids = set().union(*host_owners.values(), *role_owners.values())
+        checkers = {user.id: wake_permission_checker(user)
+                    for user in db_session.query(User).filter(User.id.in_(owner_ids))}
+
+        query = db_session.query(Host.id, Host.mac_address, Host.created_by, Host.visible_to_roles)
+        if host_owners and role_owners:
+            query = query.filter(or_(Host.id.in_(host_owners), Host.visible_to_roles.isnot(None)))
+        elif host_owners:
+            query = query.filter(Host.id.in_(host_owners))
+        else:
+            query = query.filter(Host.visible_to_roles.isnot(None))
+
+        targets = {}
+        for host_id, mac_address, created_by, visible_to_roles in query:
+            owners = set(host_owners.get(host_id, ()))
+            for role in visible_to_roles or []:
+                owners.update(role_owners.get(str(role), ()))
+            for owner in owners:
+                allowed = checkers.get(owner)
+                if allowed is None or not allowed(created_by, visible_to_roles):
+                    continue
+                targets.setdefault(owner, {})[host_id] = mac_address
+        return targets
+
+    def fire(self, schedule_ids):
+        """
+        Wake the hosts of due schedules.
+
+        Args:
+            schedule_ids: IDs returned by pop_due()
+
+        Returns:
+            int: Number of hosts woken
+        """
+        from app.wol import perform_wake
+
+        fired_at = datetime.utcnow()
+        try:
+            targets = self._resolve_targets(schedule_ids)
+            db_session.query(WakeSchedule).filter(WakeSchedule.id.in_(schedule_ids)).update(
+                {WakeSchedule.last_fired_at: fired_at}, synchronize_session=False
+            )
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            logger.error("Failed to resolve scheduled wakes: schedules=%s error=%s", schedule_ids, str(e), exc_info=True)
+            return 0
+        finally:
+            db_session.remove()
+
+        woken_total = 0
+        for user_id, hosts in targets.items():
+            woken, failed, elapsed_ms = perform_wake(list(hosts.items()), user_id, interface=self.interface)
+            woken_total += len(woken)
+            logger.info("Scheduled wake sent: user_id=%s woken=%s failed=%s duration_ms=%.2f",
+                        user_id, len(woken), len(failed), elapsed_ms)
+        logger.info("Wake schedules fired: schedules=%s hosts=%s", len(schedule_ids), woken_total)
+        return woken_total
+
+    def run(self, stop=None):
+        """
+        Maintain the leader lease and fire due schedules until stop is set.
+
+        Args:
+            stop: threading.Event ending the loop (default: run forever)
+        """
+        stop = stop or threading.Event()
+        maintain_every = self.leases.ttl / 3.0
+        next_maintain = 0
+        logger.info("Wake scheduler started: timezone=%s", self.timezone)
+        try:
+            while not stop.is_set():
+                now = self.clock()
+                if now >= next_maintain:
+                    was_leader = self.is_leader
+                    self.leases.maintain()
+                    next_maintain = now + maintain_every
+                    if self.is_leader and not was_leader:
+                        logger.info("Wake scheduler elected leader: owner=%s", self.leases.owner)
+                        self._version = _NOT_LOADED
+                        self._next_refresh = 0
+                    elif was_leader and not self.is_leader:
+                        logger.info("Wake scheduler lost leadership: owner=%s", self.leases.owner)
+                        self._schedules, self._heap = {}, []
+
+                wake_at = next_maintain
+                if self.is_leader:
+                    try:
+                        if now >= self._next_refresh:
+                            self._next_refresh = now + self.refresh_interval
+                            self.refresh_if_changed()
+                        due = self.pop_due(now)
+                        if due:
+                            self.fire(due)
+                    except Exception as e:
+                        logger.error("Wake scheduler tick failed: error=%s", str(e), exc_info=True)
+                    wake_at = min(wake_at, self._next_refresh, self.next_due() or wake_at)
+                stop.wait(max(0.0, min(wake_at - self.clock(), maintain_every)))
+        finally:
+            self.leases.release_all()
+            logger.info("Wake scheduler stopped")
+
+
+def start_wake_scheduler(config, stop=None):
+    """
+    Start the scheduler in a thread of the current process.
+
+    Args:
+        config: Flask config mapping with WOL_INTERFACE and WAKE_SCHEDULE_* settings
+        stop: threading.Event that ends it (default: run until exit)
+
+    Returns:
+        threading.Thread: The started thread
+    """
+    scheduler = WakeScheduler(
+        timezone=config['WAKE_SCHEDULE_TIMEZONE'],
+        refresh_interval=config['WAKE_SCHEDULE_REFRESH'],
+        interface=config.get('WOL_INTERFACE')
+    )
+    thread = threading.Thread(target=scheduler.run, args=(stop,), name='wake-scheduler', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,91 @@
+"""
+Standalone wake sender process.
+
+By default a sender thread in the web process executes queued wake jobs.
+With WAKE_SENDER_IN_PROCESS=False the web process only queues them and
+this worker sends the packets instead:
+
+    python -m app.wake_worker [--threads 2]
+    python manage.py wake-worker [--threads 2]
+
+Workers read the queue through a Redis consumer group, so throughput
+scales by starting more of them, on any machine that can reach the hosts'
+broadcast domain, independently of the web workers. With
+WAKE_SCHEDULER_ENABLED the worker also competes for leadership of the
+wake scheduler.
+
+SIGTERM or SIGINT stops the worker once the jobs it is executing are done.
+"""
+
+import argparse
+import signal
+import threading
+from app.logging_config import get_logger
+
+logger = get_logger('app.wake_worker')
+
+
+def run_wake_worker(config, threads=None):
+    """
+    Run wake sender threads until the process is signalled to stop.
+
+    Redis and the database must already be set up, see main().
+
+    Args:
+        config: Flask config mapping with WOL_INTERFACE and WAKE_* settings
+        threads: Number of sender threads (default: WAKE_SENDER_THREADS)
+    """
+    from app.wake_queue import start_wake_senders
+    from app.wake_scheduler import start_wake_scheduler
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info("Stop signal received, shutting down wake worker: signal=%s", signum)
+        stop.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, request_stop)
+
+    workers = start_wake_senders(config, threads or config['WAKE_SENDER_THREADS'], stop)
+    if config['WAKE_SCHEDULER_ENABLED']:
+        workers.append(start_wake_scheduler(config, stop))
+    while not stop.is_set():
+        stop.wait(1)
+    for thread in workers:
+        thread.join()
+    logger.info("Wake worker exited")
+
+
+def start_worker(app, threads=None):
+    """
+    Connect to Redis the way the web process does and run the worker.
+
+    Args:
+        app: Flask app created with start_background_services=False
+        threads: Number of sender threads (default: WAKE_SENDER_THREADS)
+    """
+    from app import redis_pool
+    from app.ping_service import update_redis_pool
+
+    update_redis_pool(redis_pool)
+    logger.info("Starting wake worker: threads=%s", threads or app.config['WAKE_SENDER_THREADS'])
+    run_wake_worker(app.config, threads)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run the WOL Manager wake sender worker.")
+    parser.add_argument('--config', default=None, help="Config name (default: FLASK_CONFIG)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Sender threads (default: WAKE_SENDER_THREADS)")
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app(args.config, start_background_services=False)
+    start_worker(app, args.threads)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
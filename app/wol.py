@@ -1,14 +1,21 @@
 import socket
 import re
-from datetime import datetime, timedelta
-from collections import defaultdict
+import time
+from datetime import datetime
 from functools import lru_cache
-from flask import Blueprint, request, flash, redirect, url_for, render_template, session
+from flask import Blueprint, request, flash, redirect, url_for, render_template, session, jsonify, current_app
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
+from sqlalchemy import or_
+import pytz
 
-from app.models import Host, WolLog
+from app.models import Host, WolLog, Role, WakeSchedule
 from app import db_session
+from app.magic_packet import broadcast_pool, cached_magic_packet
+from app.rate_limiter import wake_limiter
+from app.wake_queue import enqueue_wake, get_wake_job
+from app.cron import CronExpression, validate_cron
+from app.wake_scheduler import next_fire_time, publish_schedule_change
 from app.logging_config import get_logger
 
 # Create module-level logger
@@ -23,46 +30,55 @@ class CSRFForm(FlaskForm):
     pass
 
 
-# Rate limiting storage - in a production app, this would use Redis or similar
-# Format: {user_id: [(timestamp1), (timestamp2), ...]}
-wake_attempts = defaultdict(list)
-# Maximum number of wake attempts per user within time window
-MAX_ATTEMPTS = 10
-# Time window for rate limiting (in seconds)
-TIME_WINDOW = 60 * 5  # 5 minutes
+# Most hosts a single bulk wake request may name
+MAX_BULK_WAKE = 1000
 
-def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9):
+def send_magic_packets(mac_addresses, broadcast_ip='255.255.255.255', port=9, interface=None):
+    """
+    Send magic packets for several MAC addresses over a pooled broadcast socket.
+    
+    Args:
+        mac_addresses (list): MAC addresses of the target devices
+        broadcast_ip (str): Broadcast IP address (default: 255.255.255.255)
+        port (int): UDP port to send the packets (default: 9)
+        interface (str): Network interface to send from (default: routing decides)
+        
+    Returns:
+        list: True or False per MAC address, in the given order
+    """
+    results = []
+    for mac_address in mac_addresses:
+        try:
+            broadcast_pool.send(cached_magic_packet(mac_address), broadcast_ip, port, interface)
+            results.append(True)
+        except ValueError as e:
+            logger.warning(f"Invalid MAC address format: {mac_address}, error: {str(e)}")
+            results.append(False)
+        except OSError as e:
+            logger.error(f"Failed to send Wake-on-LAN packet to {mac_address}: {str(e)}")
+            results.append(False)
+    logger.info("Wake-on-LAN packets sent: count=%s failed=%s broadcast_ip=%s",
+                len(results), results.count(False), broadcast_ip)
+    return results
+
+def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9, interface=None):
     """
     Sends a magic packet to wake a host with the given MAC address.
     
+    The packet is built once per MAC address and sent over a pooled socket.
+    
     Args:
         mac_address (str): MAC address of the target device
         broadcast_ip (str): Broadcast IP address (default: 255.255.255.255)
         port (int): UDP port to send the packet (default: 9)
+        interface (str): Network interface to send from (default: routing decides)
         
     Returns:
         bool: True if packet was sent successfully, False otherwise
     """
     try:
-        # Clean the MAC address by removing any separators
-        mac_clean = mac_address.replace(':', '').replace('-', '').replace('.', '')
-        
-        # Validate MAC address format
-        if len(mac_clean) != 12:
-            raise ValueError("Invalid MAC address format")
-        
-        # Convert MAC address to bytes
-        mac_bytes = bytes.fromhex(mac_clean)
-        
-        # Create the magic packet (FF FF FF FF FF FF followed by MAC repeated 16 times)
-        packet = b'\xff' * 6 + mac_bytes * 16
-        
-        # Create a UDP socket
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.sendto(packet, (broadcast_ip, port))
-            
-            logger.info("Wake-on-LAN packet sent: mac=%s broadcast_ip=%s", mac_address, broadcast_ip)
+        broadcast_pool.send(cached_magic_packet(mac_address), broadcast_ip, port, interface)
+        logger.info("Wake-on-LAN packet sent: mac=%s broadcast_ip=%s", mac_address, broadcast_ip)
         return True
     except ValueError as e:
         logger.warning(f"Invalid MAC address format: {mac_address}, error: {str(e)}")
@@ -70,33 +86,26 @@ def send_magic_packet(mac_address, broadcast_ip='255.255.255.255', port=9):
     except Exception as e:
         logger.error(f"Failed to send Wake-on-LAN packet to {mac_address}: {str(e)}", exc_info=True)
         return False
-def check_rate_limit(user_id):
+def check_rate_limit(user, cost=1):
     """
     Check if a user has exceeded the rate limit for wake attempts.
     
+    Attempts are counted in Redis, so the limit holds across all workers;
+    the limit itself depends on the user's roles (see app.rate_limiter).
+    
     Args:
-        user_id (int): The ID of the user to check
+        user (User): The user to check
+        cost (int): Attempts to charge, one per host woken (default: 1)
         
     Returns:
         bool: True if rate limit is exceeded, False otherwise
     """
-    global wake_attempts
-    
-    now = datetime.now()
-    cutoff_time = now - timedelta(seconds=TIME_WINDOW)
-    
-    # Efficiently remove attempts outside the time window and count recent attempts
-    recent_attempts = [ts for ts in wake_attempts[user_id] if ts > cutoff_time]
-    wake_attempts[user_id] = recent_attempts
-    
-    # Check if the user has exceeded the maximum number of attempts
-    if len(recent_attempts) >= MAX_ATTEMPTS:
-        access_logger.warning(f"Rate limit exceeded for user_id {user_id}: {len(recent_attempts)} attempts in {TIME_WINDOW} seconds")
+    allowed, remaining, retry_after = wake_limiter.hit(user, cost=cost)
+    if not allowed:
+        access_logger.warning(f"Rate limit exceeded for user_id {user.id}: cost {cost}, retry in {retry_after} seconds")
         return True
     
-    # Add the current attempt
-    wake_attempts[user_id].append(now)
-    logger.debug(f"Rate limit check passed for user_id {user_id}: {len(recent_attempts) + 1} attempts in {TIME_WINDOW} seconds")
+    logger.debug(f"Rate limit check passed for user_id {user.id}: {remaining} attempts left")
     return False
 def check_host_permission(host, user):
     """
@@ -138,6 +147,192 @@ def check_host_permission(host, user):
     return False
 
 
+def wake_permission_checker(user):
+    """
+    Build check_host_permission() for many hosts at once.
+    
+    The user's permissions and roles are looked up once instead of per host.
+    
+    Args:
+        user: The current user
+        
+    Returns:
+        callable: (created_by, visible_to_roles) -> bool
+    """
+    if user.is_admin or user.has_permission('send_wol'):
+        return lambda created_by, visible_to_roles: True
+    
+    user_id = user.id
+    user_role_ids = {str(role.id) for role in user.roles}
+    
+    def allowed(created_by, visible_to_roles):
+        if created_by == user_id:
+            return True
+        return bool(visible_to_roles) and not user_role_ids.isdisjoint(str(role_id) for role_id in visible_to_roles)
+    return allowed
+
+
+def perform_wake(targets, user_id, interface=None):
+    """
+    Send magic packets and record the attempts.
+    
+    All WolLog rows are inserted in one statement and last_wake_time is
+    updated for the woken hosts in the same transaction. Used by the wake
+    queue's sender workers, and by the routes when the queue is unavailable.
+    
+    Args:
+        targets (list): (host_id, mac_address) pairs, permissions already checked
+        user_id (int): The ID of the user the hosts are woken for
+        interface (str): Network interface to send from (default: routing decides)
+        
+    Returns:
+        tuple: (woken host IDs, failed host IDs, send time in milliseconds)
+    """
+    start_time = datetime.now()
+    send_started = time.perf_counter()
+    results = send_magic_packets([mac_address for _, mac_address in targets], interface=interface)
+    elapsed_ms = (time.perf_counter() - send_started) * 1000
+    woken = [host_id for (host_id, _), success in zip(targets, results) if success]
+    failed = [host_id for (host_id, _), success in zip(targets, results) if not success]
+    
+    # Log all attempts for statistics with one executemany insert
+    response_time = int(elapsed_ms / len(targets))
+    try:
+        db_session.execute(WolLog.__table__.insert(), [
+            {
+                'device_id': host_id,
+                'timestamp': start_time,
+                'success': success,
+                'response_time': response_time,
+                'user_id': user_id
+            }
+            for (host_id, _), success in zip(targets, results)
+        ])
+        if woken:
+            db_session.query(Host).filter(Host.id.in_(woken)).update(
+                {Host.last_wake_time: start_time}, synchronize_session=False
+            )
+        db_session.commit()
+    except Exception as e:
+        logger.error(f"Failed to log WoL attempt for {len(targets)} hosts: {str(e)}", exc_info=True)
+        db_session.rollback()
+    finally:
+        db_session.remove()
+    
+    if woken:
+        # Have the ping service watch the hosts closely while they boot
+        from app.ping_service import request_fast_probe
+        request_fast_probe(woken)
+    return woken, failed, elapsed_ms
+
+
+def wake_job_response(job, **extra):
+    """JSON body of a 202 Accepted response for a queued wake job."""
+    return jsonify(dict(
+        extra,
+        job_id=job['id'],
+        status=job['status'],
+        host_ids=job['host_ids'],
+        status_url=url_for('wol.wake_job_status', job_id=job['id'])
+    )), 202
+
+
+@wol.route('/wake', methods=['POST'])
+@login_required
+def wake_hosts():
+    """
+    Wake several hosts in one request.
+    
+    Expects JSON ``{"host_ids": [...]}`` and/or ``{"role_id": id}`` for every
+    host shared with that role. Permissions for all hosts are checked from
+    one query and the hosts are queued as one wake job. Every permitted
+    host counts as one attempt for the rate limit.
+    
+    Returns:
+        202 JSON with the job ID, denied and not_found host IDs; when the
+        queue is unavailable the hosts are woken right away and the woken
+        and failed host IDs are returned instead
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        host_ids = {int(host_id) for host_id in data.get('host_ids') or []}
+        role_id = int(data['role_id']) if data.get('role_id') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'host_ids must be a list of host IDs and role_id a role ID'}), 400
+    if not host_ids and role_id is None:
+        return jsonify({'error': 'No hosts given'}), 400
+    if len(host_ids) > MAX_BULK_WAKE:
+        return jsonify({'error': f'At most {MAX_BULK_WAKE} hosts per request'}), 400
+    
+    user_id = current_user.id
+    logger.debug("Bulk wake requested: hosts=%s role_id=%s user_id=%s", len(host_ids), role_id, user_id)
+    
+    query = db_session.query(Host.id, Host.mac_address, Host.created_by, Host.visible_to_roles)
+    if role_id is None:
+        query = query.filter(Host.id.in_(host_ids))
+    elif host_ids:
+        query = query.filter(or_(Host.id.in_(host_ids), Host.visible_to_roles.isnot(None)))
+    else:
+        query = query.filter(Host.visible_to_roles.isnot(None))
+    
+    allowed = wake_permission_checker(current_user)
+    role_key = str(role_id)
+    targets = []
+    denied = []
+    found = set()
+    for host_id, mac_address, created_by, visible_to_roles in query:
+        in_group = role_id is not None and role_key in {str(role) for role in visible_to_roles or []}
+        if host_id not in host_ids and not in_group:
+            continue
+        found.add(host_id)
+        if allowed(created_by, visible_to_roles):
+            targets.append((host_id, mac_address))
+        else:
+            denied.append(host_id)
+    not_found = sorted(host_ids - found)
+    if denied:
+        access_logger.warning(f"Permission denied: User {user_id} attempted to wake hosts {sorted(denied)} without permission")
+    if len(targets) > MAX_BULK_WAKE:
+        db_session.remove()
+        return jsonify({'error': f'At most {MAX_BULK_WAKE} hosts per request'}), 400
+    if not targets:
+        db_session.remove()
+        if denied:
+            return jsonify({'error': 'You do not have permission to wake these hosts.', 'denied': sorted(denied),
+                            'not_found': not_found}), 403
+        return jsonify({'error': 'Host not found', 'not_found': not_found}), 404
+    
+    # Charged per host, so a bulk request cannot wake more hosts than single wakes could
+    if check_rate_limit(current_user, cost=len(targets)):
+        limit = wake_limiter.limit_for(current_user)
+        db_session.remove()
+        access_logger.warning(f"Rate limit exceeded for user {user_id} when attempting a bulk wake of {len(targets)} hosts")
+        if len(targets) > limit:
+            return jsonify({'error': f'Your rate limit allows at most {limit} wake attempts per '
+                                     f'{wake_limiter.window} seconds; wake fewer hosts at once.'}), 429
+        return jsonify({'error': 'Rate limit exceeded for wake attempts. Please try again later.'}), 429
+    
+    db_session.remove()
+    
+    job = enqueue_wake(targets, user_id) if current_app.config['WAKE_QUEUE_ENABLED'] else None
+    if job is not None:
+        logger.info("Bulk wake queued: job_id=%s hosts=%s denied=%s user_id=%s",
+                    job['id'], len(targets), len(denied), user_id)
+        return wake_job_response(job, denied=sorted(denied), not_found=not_found)
+    
+    woken, failed, elapsed_ms = perform_wake(targets, user_id, interface=current_app.config.get('WOL_INTERFACE'))
+    logger.info("Bulk wake completed: woken=%s failed=%s denied=%s user_id=%s duration_ms=%.2f",
+                len(woken), len(failed), len(denied), user_id, elapsed_ms)
+    
+    return jsonify({
+        'woken': woken,
+        'failed': failed,
+        'denied': sorted(denied),
+        'not_found': not_found,
+        'duration_ms': round(elapsed_ms, 2)
+    }), 200 if woken else 502
+
+
 @wol.route('/wake/<int:host_id>', methods=['POST'])
 @login_required
 def wake_host(host_id):
@@ -152,7 +347,7 @@ def wake_host(host_id):
     """
     # Check if the user has exceeded the rate limit
     logger.debug("Wake host requested: host_id=%s user_id=%s", host_id, current_user.id)
-    if check_rate_limit(current_user.id):
+    if check_rate_limit(current_user):
         access_logger.warning(f"Rate limit exceeded for user {current_user.id} when attempting to wake host {host_id}")
         flash('You have exceeded the rate limit for wake attempts. Please try again later.', 'danger')
         return redirect(url_for('host.list_hosts'))
@@ -169,12 +364,22 @@ def wake_host(host_id):
         access_logger.warning(f"Permission denied: User {current_user.id} attempted to wake host {host_id} ({host.name}) without permission")
         flash('You do not have permission to wake this host.', 'danger')
         return redirect(url_for('host.list_hosts'))
+    
+    # Hand the packet to a sender worker; fall back to sending it here
+    job = enqueue_wake([(host.id, host.mac_address)], current_user.id) if current_app.config['WAKE_QUEUE_ENABLED'] else None
+    if job is not None:
+        logger.info("Wake attempt queued: host_id=%s host_name=%s job_id=%s user_id=%s", host_id, host.name, job['id'], current_user.id)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return wake_job_response(job)
+        flash(f'Wake-on-LAN request for {host.name} queued.', 'info')
+        return redirect(url_for('host.list_hosts'))
+    
     # Attempt to wake the host
     logger.info("Wake attempt started: host_id=%s host_name=%s user_id=%s", host_id, host.name, current_user.id)
     
     # Record start time for response time calculation
     start_time = datetime.now()
-    success = send_magic_packet(host.mac_address)
+    success = send_magic_packet(host.mac_address, interface=current_app.config.get('WOL_INTERFACE'))
     end_time = datetime.now()
     
     # Calculate response time in milliseconds
@@ -196,6 +401,9 @@ def wake_host(host_id):
         if success:
             # Update the last_wake_time field
             host.last_wake_time = start_time
+            # Have the ping service watch the host closely while it boots
+            from app.ping_service import request_fast_probe
+            request_fast_probe([host_id])
             logger.info("Wake attempt succeeded: host_id=%s host_name=%s user_id=%s", host_id, host.name, current_user.id)
             flash(f'Wake-on-LAN packet sent to {host.name} ({host.mac_address}).', 'success')
         else:
@@ -221,6 +429,24 @@ def wake_host(host_id):
     return redirect(url_for('host.list_hosts'))
 
 
+@wol.route('/jobs/<job_id>')
+@login_required
+def wake_job_status(job_id):
+    """
+    Get the state and outcome of a queued wake job.
+    
+    Args:
+        job_id (str): ID returned when the wake was queued
+        
+    Returns:
+        JSON with the job status, woken and failed host IDs
+    """
+    job = get_wake_job(job_id)
+    if job is None or (job['user_id'] != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
 @wol.route('/send/<int:host_id>', methods=['GET'])
 @login_required
 def wol_send(host_id):
@@ -337,7 +563,7 @@ def test_wol():
         
         # Attempt to wake the host
         logger.info("WOL test attempt started: user_id=%s mac=%s broadcast=%s", current_user.id, mac_address, broadcast)
-        success = send_magic_packet(mac_address, broadcast_ip=broadcast)
+        success = send_magic_packet(mac_address, broadcast_ip=broadcast, interface=current_app.config.get('WOL_INTERFACE'))
         
         # Show a success or error message
         if success:
@@ -366,3 +592,184 @@ def is_valid_mac(mac_address):
     pattern = r'^([0-9A-Fa-f]{2}[:-]?){5}([0-9A-Fa-f]{2})$'
     return bool(re.match(pattern, mac_address))
 
+
+def schedule_to_dict(schedule):
+    """
+    Serialize a wake schedule for the schedule API.
+    
+    Args:
+        schedule (WakeSchedule): The schedule
+        
+    Returns:
+        dict: Schedule fields plus its next fire time (UTC ISO format)
+    """
+    next_fire = None
+    if schedule.enabled:
+        fire_at = next_fire_time(CronExpression(schedule.cron), time.time(),
+                                 pytz.timezone(current_app.config['WAKE_SCHEDULE_TIMEZONE']))
+        if fire_at is not None:
+            next_fire = datetime.utcfromtimestamp(fire_at).isoformat()
+    return {
+        'id': schedule.id,
+        'name': schedule.name,
+        'cron': schedule.cron,
+        'host_id': schedule.host_id,
+        'role_id': schedule.role_id,
+        'enabled': schedule.enabled,
+        'created_by': schedule.created_by,
+        'last_fired_at': schedule.last_fired_at.isoformat() if schedule.last_fired_at else None,
+        'next_fire_at': next_fire
+    }
+
+
+def check_schedule_target(host_id, role_id, user):
+    """
+    Check that a user may schedule wakes for a host or role.
+    
+    Returns:
+        tuple: (error message, HTTP status), or (None, None) if allowed
+    """
+    if (host_id is None) == (role_id is None):
+        return 'Give either host_id or role_id', 400
+    if host_id is not None:
+        host = db_session.query(Host).get(host_id)
+        if not host:
+            return 'Host not found', 404
+        if not check_host_permission(host, user):
+            return 'You do not have permission to wake this host.', 403
+        return None, None
+    role = db_session.query(Role).get(role_id)
+    if not role:
+        return 'Role not found', 404
+    if not user.is_admin and role not in user.roles:
+        return 'You can only schedule wakes for your own roles.', 403
+    return None, None
+
+
+@wol.route('/schedules', methods=['GET'])
+@login_required
+def list_schedules():
+    """
+    List wake schedules: all of them for admins, the user's own otherwise.
+    
+    Returns:
+        JSON with the schedules
+    """
+    query = db_session.query(WakeSchedule)
+    if not current_user.is_admin:
+        query = query.filter(WakeSchedule.created_by == current_user.id)
+    return jsonify({'schedules': [schedule_to_dict(schedule) for schedule in query.order_by(WakeSchedule.id)]})
+
+
+@wol.route('/schedules', methods=['POST'])
+@login_required
+def create_schedule():
+    """
+    Create a wake schedule.
+    
+    Expects JSON ``{"name": ..., "cron": "30 7 * * mon-fri"}`` plus either
+    ``host_id`` or ``role_id`` (every host shared with that role). Cron
+    expressions are evaluated in WAKE_SCHEDULE_TIMEZONE.
+    
+    Returns:
+        201 JSON with the created schedule
+    """
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    cron = ' '.join(str(data.get('cron') or '').split())
+    try:
+        host_id = int(data['host_id']) if data.get('host_id') is not None else None
+        role_id = int(data['role_id']) if data.get('role_id') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'host_id and role_id must be IDs'}), 400
+    if not name or len(name) > 64:
+        return jsonify({'error': 'Name is required (at most 64 characters)'}), 400
+    cron_error = validate_cron(cron)
+    if cron_error:
+        return jsonify({'error': cron_error}), 400
+    error, status = check_schedule_target(host_id, role_id, current_user)
+    if error:
+        access_logger.warning(f"Schedule creation refused for user {current_user.id}: {error}")
+        return jsonify({'error': error}), status
+    
+    try:
+        schedule = WakeSchedule(name=name, cron=cron, host_id=host_id, role_id=role_id,
+                                enabled=bool(data.get('enabled', True)), created_by=current_user.id)
+        db_session.add(schedule)
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Failed to create wake schedule: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to create schedule'}), 500
+    publish_schedule_change()
+    logger.info("Wake schedule created: schedule_id=%s cron=%s host_id=%s role_id=%s user_id=%s",
+                schedule.id, cron, host_id, role_id, current_user.id)
+    return jsonify(schedule_to_dict(schedule)), 201
+
+
+@wol.route('/schedules/<int:schedule_id>', methods=['PATCH'])
+@login_required
+def update_schedule(schedule_id):
+    """
+    Change the name, cron expression or enabled flag of a wake schedule.
+    
+    Args:
+        schedule_id (int): ID of the schedule
+        
+    Returns:
+        JSON with the updated schedule
+    """
+    schedule = db_session.query(WakeSchedule).get(schedule_id)
+    if not schedule or (schedule.created_by != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Schedule not found'}), 404
+    data = request.get_json(silent=True) or {}
+    if 'name' in data:
+        name = (data.get('name') or '').strip()
+        if not name or len(name) > 64:
+            return jsonify({'error': 'Name is required (at most 64 characters)'}), 400
+        schedule.name = name
+    if 'cron' in data:
+        cron = ' '.join(str(data.get('cron') or '').split())
+        cron_error = validate_cron(cron)
+        if cron_error:
+            return jsonify({'error': cron_error}), 400
+        schedule.cron = cron
+    if 'enabled' in data:
+        schedule.enabled = bool(data['enabled'])
+    
+    try:
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Failed to update wake schedule {schedule_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to update schedule'}), 500
+    publish_schedule_change()
+    logger.info("Wake schedule updated: schedule_id=%s user_id=%s", schedule_id, current_user.id)
+    return jsonify(schedule_to_dict(schedule))
+
+
+@wol.route('/schedules/<int:schedule_id>', methods=['DELETE'])
+@login_required
+def delete_schedule(schedule_id):
+    """
+    Delete a wake schedule.
+    
+    Args:
+        schedule_id (int): ID of the schedule
+        
+    Returns:
+        JSON confirmation
+    """
+    schedule = db_session.query(WakeSchedule).get(schedule_id)
+    if not schedule or (schedule.created_by != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Schedule not found'}), 404
+    try:
+        db_session.delete(schedule)
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Failed to delete wake schedule {schedule_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to delete schedule'}), 500
+    publish_schedule_change()
+    logger.info("Wake schedule deleted: schedule_id=%s user_id=%s", schedule_id, current_user.id)
+    return jsonify({'deleted': schedule_id})
@@ -141,14 +141,80 @@ export MALLOC_TRIM_THRESHOLD_=65536
 export MALLOC_TOP_PAD_=1
 export MALLOC_MMAP_THRESHOLD_=1024
 
-# Execute gunicorn with binding to all interfaces and memory optimization flags
-exec gunicorn \
-    --bind ${HOST}:${PORT} \
-    --workers 1 \
-    --worker-class gthread \
-    --backlog 2048 \
-    --preload \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
+# Standalone workers run under a small supervisor: it restarts a worker that
+# exits and passes SIGTERM on, so the worker's clean shutdown runs on docker stop
+WORKER_PIDS=""
+
+supervise() {
+    local name="$1"
+    shift
+    (
+        child=""
+        stopping=""
+        trap 'stopping=1; [ -n "$child" ] && kill -TERM "$child" 2>/dev/null' TERM
+        while [ -z "$stopping" ]; do
+            "$@" &
+            child=$!
+            wait "$child"
+            status=$?
+            if [ -n "$stopping" ]; then
+                # The signal interrupted wait; let the worker finish shutting down
+                while kill -0 "$child" 2>/dev/null; do
+                    wait "$child"
+                done
+                break
+            fi
+            echo "$name exited with status $status, restarting in 5 seconds..."
+            sleep 5 &
+            wait $!
+        done
+        echo "$name stopped"
+    ) &
+    WORKER_PIDS="$WORKER_PIDS $!"
+}
+
+# Probe hosts from a separate process instead of a thread of the web worker
+if [ "$PING_IN_PROCESS" = "False" ]; then
+    echo "Starting standalone ping worker..."
+    supervise "Ping worker" python -m app.ping_worker
+fi
+
+# Send queued wake packets from a separate process instead of a thread of the web worker
+if [ "$WAKE_SENDER_IN_PROCESS" = "False" ]; then
+    echo "Starting standalone wake worker..."
+    supervise "Wake worker" python -m app.wake_worker
+fi
+
+# Gunicorn with binding to all interfaces and memory optimization flags
+GUNICORN_ARGS=(
+    --bind ${HOST}:${PORT}
+    --workers 1
+    --worker-class gthread
+    --threads ${GUNICORN_THREADS:-16}
+    --backlog 2048
+    --preload
+    --access-logfile -
+    --error-logfile -
+    --log-level info
     "wsgi:app"
+)
+
+if [ -z "$WORKER_PIDS" ]; then
+    exec gunicorn "${GUNICORN_ARGS[@]}"
+fi
+
+# With standalone workers this shell stays PID 1: forward stop signals to
+# every child and take the workers down when gunicorn exits
+gunicorn "${GUNICORN_ARGS[@]}" &
+GUNICORN_PID=$!
+trap 'kill -TERM "$GUNICORN_PID" $WORKER_PIDS 2>/dev/null' TERM INT
+wait "$GUNICORN_PID"
+status=$?
+while kill -0 "$GUNICORN_PID" 2>/dev/null; do
+    wait "$GUNICORN_PID"
+    status=$?
+done
+echo "Gunicorn exited with status $status, stopping workers..."
+kill -TERM $WORKER_PIDS 2>/dev/null
+wait $WORKER_PIDS
+exit $status
@@ -304,6 +304,46 @@ def db_check():
     click.echo("Database check completed.")
 
 
+@app.cli.command("status-store-migrate")
+@click.option('--to', 'target_layout', type=click.Choice(['keys', 'hash']), required=True,
+              help='Host status layout to move existing Redis entries to')
+def status_store_migrate(target_layout):
+    """Move host statuses in Redis between the key and hash layouts."""
+    from app import redis_pool
+    from app.ping_service import update_redis_pool, configure_status_store, migrate_status_store
+
+    update_redis_pool(redis_pool)
+    configure_status_store(app.config['STATUS_STORE_LAYOUT'], app.config['STATUS_HASH_SHARD_SIZE'],
+                           app.config['STATUS_ENCODING'])
+    try:
+        migrated = migrate_status_store(target_layout)
+    except Exception as e:
+        click.echo(f"Error migrating host status store: {str(e)}", err=True)
+        sys.exit(1)
+
+    click.echo(f"Migrated {migrated} host statuses to the '{target_layout}' layout.")
+    if app.config['STATUS_STORE_LAYOUT'] != target_layout:
+        click.echo(f"Set STATUS_STORE_LAYOUT={target_layout} before restarting the application.")
+
+
+@app.cli.command("ping-worker")
+@click.option('--concurrency', type=int, default=None,
+              help='Probes in flight at once (default: PING_MAX_CONCURRENCY)')
+def ping_worker(concurrency):
+    """Run the ping service in this process until SIGTERM/SIGINT (use with PING_IN_PROCESS=False)."""
+    from app.ping_worker import start_worker
+    start_worker(app, concurrency)
+
+
+@app.cli.command("wake-worker")
+@click.option('--threads', type=int, default=None,
+              help='Sender threads (default: WAKE_SENDER_THREADS)')
+def wake_worker(threads):
+    """Execute queued wake jobs in this process until SIGTERM/SIGINT (use with WAKE_SENDER_IN_PROCESS=False)."""
+    from app.wake_worker import start_worker
+    start_worker(app, threads)
+
+
 @app.cli.group()
 def logs():
     """Log management commands."""
@@ -0,0 +1,48 @@
+"""Add per-host probe strategy fields
+
+Revision ID: 006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import text
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """Add probe_strategy and probe_ports to the hosts table."""
+    
+    # Get existing columns
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('hosts')]
+    
+    # Add probe_strategy column if it doesn't exist
+    if 'probe_strategy' not in existing_columns:
+        op.add_column('hosts', sa.Column('probe_strategy', sa.String(length=16), nullable=True, server_default='icmp'))
+        # Existing hosts keep being checked with ICMP
+        conn.execute(text("UPDATE hosts SET probe_strategy = 'icmp' WHERE probe_strategy IS NULL"))
+    
+    # Add probe_ports column if it doesn't exist
+    if 'probe_ports' not in existing_columns:
+        op.add_column('hosts', sa.Column('probe_ports', sa.String(length=64), nullable=True))
+    
+    print("✓ Added probe strategy fields to hosts table")
+
+def downgrade():
+    """Remove probe strategy fields from the hosts table."""
+    
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('hosts')]
+    
+    if 'probe_ports' in existing_columns:
+        op.drop_column('hosts', 'probe_ports')
+    
+    if 'probe_strategy' in existing_columns:
+        op.drop_column('hosts', 'probe_strategy')
+    
+    print("✓ Removed probe strategy fields from hosts table")
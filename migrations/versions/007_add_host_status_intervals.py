@@ -0,0 +1,45 @@
+"""Add host_status_intervals table for status history
+
+Revision ID: 007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Check if table already exists
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_tables = inspector.get_table_names()
+    
+    # Create host_status_intervals table if it doesn't exist
+    if 'host_status_intervals' not in existing_tables:
+        op.create_table('host_status_intervals',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('host_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=8), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('ended_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['host_id'], ['hosts.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        
+        # Window queries filter by host and start time; pruning by end time
+        op.create_index('ix_host_status_intervals_host_started', 'host_status_intervals', ['host_id', 'started_at'])
+        op.create_index('ix_host_status_intervals_ended_at', 'host_status_intervals', ['ended_at'])
+
+def downgrade():
+    # Drop indexes first
+    try:
+        op.drop_index('ix_host_status_intervals_ended_at', table_name='host_status_intervals')
+        op.drop_index('ix_host_status_intervals_host_started', table_name='host_status_intervals')
+    except:
+        pass  # Indexes might not exist
+    
+    # Drop table
+    op.drop_table('host_status_intervals')
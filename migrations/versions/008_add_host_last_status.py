@@ -0,0 +1,45 @@
+"""Add last known status fields to hosts
+
+Revision ID: 008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """Add last_status and last_seen to the hosts table."""
+    
+    # Get existing columns
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('hosts')]
+    
+    # Add last_status column if it doesn't exist
+    if 'last_status' not in existing_columns:
+        op.add_column('hosts', sa.Column('last_status', sa.String(length=8), nullable=True))
+    
+    # Add last_seen column if it doesn't exist
+    if 'last_seen' not in existing_columns:
+        op.add_column('hosts', sa.Column('last_seen', sa.DateTime(), nullable=True))
+    
+    print("✓ Added last known status fields to hosts table")
+
+def downgrade():
+    """Remove last known status fields from the hosts table."""
+    
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('hosts')]
+    
+    if 'last_seen' in existing_columns:
+        op.drop_column('hosts', 'last_seen')
+    
+    if 'last_status' in existing_columns:
+        op.drop_column('hosts', 'last_status')
+    
+    print("✓ Removed last known status fields from hosts table")
@@ -0,0 +1,39 @@
+"""Add wake_schedules table for scheduled wakes
+
+Revision ID: 009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Check if table already exists
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_tables = inspector.get_table_names()
+    
+    # Create wake_schedules table if it doesn't exist
+    if 'wake_schedules' not in existing_tables:
+        op.create_table('wake_schedules',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=64), nullable=False),
+            sa.Column('cron', sa.String(length=64), nullable=False),
+            sa.Column('host_id', sa.Integer(), nullable=True),
+            sa.Column('role_id', sa.Integer(), nullable=True),
+            sa.Column('enabled', sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column('created_by', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_fired_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['host_id'], ['hosts.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+def downgrade():
+    op.drop_table('wake_schedules')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ping service probe paths against loopback targets.
+
+Compares probes per second of the shared asyncio ICMP prober with the
+subprocess `ping` fallback at 1k, 5k and 20k targets. Targets are taken
+from 127.0.0.0/8, which Linux answers on the loopback interface.
+
+The ICMP path needs either unprivileged ICMP sockets
+(net.ipv4.ping_group_range) or CAP_NET_RAW.
+
+Usage:
+    python scripts/bench_icmp_prober.py [--targets 1000,5000,20000]
+                                        [--modes icmp,subprocess]
+                                        [--subprocess-limit 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.icmp_prober import IcmpProber  # noqa: E402
+from app.async_ping_service import _ping_subprocess  # noqa: E402
+
+
+def loopback_targets(count: int) -> list[str]:
+    # Skip 127.0.0.0 and keep every octet in a valid host range
+    return [
+        f"127.{(i >> 16) & 0xFF}.{(i >> 8) & 0xFF}.{i & 0xFF}"
+        for i in range(1, count + 1)
+    ]
+
+
+async def run_icmp(targets: list[str], timeout: float) -> tuple[int, float]:
+    prober = IcmpProber()
+    prober.open()
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(prober.ping(ip, timeout) for ip in targets))
+        elapsed = time.perf_counter() - started
+    finally:
+        prober.close()
+    return sum(rtt is not None for rtt in results), elapsed
+
+
+async def run_subprocess(targets: list[str], timeout: float) -> tuple[int, float]:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_ping_subprocess(ip, int(timeout)) for ip in targets))
+    elapsed = time.perf_counter() - started
+    return sum(rtt is not None for rtt in results), elapsed
+
+
+RUNNERS = {
+    "icmp": run_icmp,
+    "subprocess": run_subprocess,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--targets", default="1000,5000,20000",
+                        help="Comma separated target counts")
+    parser.add_argument("--modes", default="icmp,subprocess",
+                        help="Comma separated probe modes (icmp, subprocess)")
+    parser.add_argument("--timeout", type=float, default=2.0,
+                        help="Per-probe timeout in seconds")
+    parser.add_argument("--subprocess-limit", type=int, default=1000,
+                        help="Skip the subprocess mode above this many targets")
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.targets.split(",") if value]
+    modes = [value for value in args.modes.split(",") if value]
+    unknown = [mode for mode in modes if mode not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    print(f"{'mode':<12}{'targets':>10}{'replies':>10}{'seconds':>10}{'probes/s':>12}")
+    for count in counts:
+        targets = loopback_targets(count)
+        for mode in modes:
+            if mode == "subprocess" and count > args.subprocess_limit:
+                print(f"{mode:<12}{count:>10}{'skipped':>10}")
+                continue
+            replies, elapsed = asyncio.run(RUNNERS[mode](targets, args.timeout))
+            rate = count / elapsed if elapsed else float("inf")
+            print(f"{mode:<12}{count:>10}{replies:>10}{elapsed:>10.2f}{rate:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compare magic packet send throughput of the old and the pooled path.
+
+- old: parse the MAC, build the packet, open a socket, set SO_BROADCAST,
+  send and close it again, for every packet (what send_magic_packet did
+  before the packet cache and the socket pool)
+- new: cached_magic_packet() and broadcast_pool.send(), the path every
+  wake goes through now
+
+Packets go to a local UDP receiver on 127.0.0.1 by default, so nothing
+is broadcast on the network; the receiver drains them in a thread so the
+kernel buffer never fills up. Pass --target 255.255.255.255 to measure
+real broadcasts (the receiver listens on every address and gets those too).
+
+Usage:
+    python scripts/bench_magic_packet.py [--packets 20000] [--hosts 500]
+                                         [--rounds 3] [--target 127.0.0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.magic_packet import BroadcastSocketPool, cached_magic_packet  # noqa: E402
+
+
+def make_macs(hosts: int) -> list[str]:
+    return [":".join(f"{byte:02x}" for byte in (0x02, 0, (i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff, 1))
+            for i in range(hosts)]
+
+
+def send_old(mac_address: str, target: str, port: int) -> None:
+    mac_clean = mac_address.replace(':', '').replace('-', '').replace('.', '')
+    if len(mac_clean) != 12:
+        raise ValueError("Invalid MAC address format")
+    packet = b'\xff' * 6 + bytes.fromhex(mac_clean) * 16
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.sendto(packet, (target, port))
+
+
+def run(mode: str, macs: list[str], packets: int, target: str, port: int) -> float:
+    """Packets per second for one mode."""
+    pool = BroadcastSocketPool()
+    cached_magic_packet.cache_clear()
+    started = time.perf_counter()
+    if mode == "old":
+        for i in range(packets):
+            send_old(macs[i % len(macs)], target, port)
+    else:
+        for i in range(packets):
+            pool.send(cached_magic_packet(macs[i % len(macs)]), target, port)
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return packets / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--packets", type=int, default=20000, help="Packets sent per round")
+    parser.add_argument("--hosts", type=int, default=500, help="Distinct MAC addresses cycled through")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per mode, the best is reported")
+    parser.add_argument("--target", default="127.0.0.1", help="Destination address (default: local receiver)")
+    args = parser.parse_args()
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('', 0))
+    receiver.settimeout(0.2)
+    port = receiver.getsockname()[1]
+    stop = threading.Event()
+
+    def drain() -> None:
+        while not stop.is_set():
+            try:
+                receiver.recv(2048)
+            except socket.timeout:
+                pass
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+
+    macs = make_macs(args.hosts)
+    print(f"{args.packets} packets per round, {args.hosts} hosts, target {args.target}:{port}")
+    print(f"{'path':<6}{'packets/s':>12}{'us/packet':>12}")
+    results = {}
+    try:
+        for mode in ("old", "new"):
+            rate = max(run(mode, macs, args.packets, args.target, port) for _ in range(args.rounds))
+            results[mode] = rate
+            print(f"{mode:<6}{rate:>12,.0f}{1e6 / rate:>12.2f}")
+    finally:
+        stop.set()
+        thread.join()
+        receiver.close()
+    print(f"speedup: {results['new'] / results['old']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
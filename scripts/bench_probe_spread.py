@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Measure how probe spreading flattens the ping worker's load.
+
+Runs the ProbeScheduler with spreading off (all hosts due together, the
+old behaviour) and on (per-host phases) and reports two things:
+
+- load profile: probes started per second over a simulated run, using
+  a fake clock so the numbers are deterministic
+- web latency: p50/p99/max latency of small requests (1 ms of CPU split
+  by four 0.5 ms round trips) served from a thread in the same process
+  while the scheduler loop runs in real time
+  and spends --probe-cost-us of CPU per probe (packet handling, result
+  bookkeeping and status serialization all hold the GIL)
+
+Usage:
+    python scripts/bench_probe_spread.py [--hosts 5000] [--interval 10]
+                                         [--duration 40] [--probe-cost-us 150]
+                                         [--skip-latency]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app.probe_scheduler import ProbeScheduler  # noqa: E402
+
+
+def make_scheduler(hosts: int, interval: float, spread: bool, clock) -> ProbeScheduler:
+    # backoff=1 keeps every host on the base interval, the worst case for bursts
+    scheduler = ProbeScheduler(min_interval=interval, max_interval=interval, backoff=1.0,
+                               spread=spread, clock=clock)
+    scheduler.sync([(host_id, "192.0.2.1", "icmp") for host_id in range(1, hosts + 1)])
+    return scheduler
+
+
+def load_profile(hosts: int, interval: float, spread: bool, seconds: int) -> list[int]:
+    """Probes started in each second of a simulated run (after one warm-up interval)."""
+    now = [0.0]
+    scheduler = make_scheduler(hosts, interval, spread, lambda: now[0])
+    per_second = []
+    for second in range(int(interval) + seconds):
+        now[0] = float(second)
+        due = scheduler.pop_due()
+        for host_id, _, _ in due:
+            scheduler.record(host_id, "online")
+        if second >= interval:
+            per_second.append(len(due))
+    return per_second
+
+
+def burn(microseconds: float) -> None:
+    ends = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < ends:
+        pass
+
+
+def web_latency(hosts: int, interval: float, spread: bool, duration: float,
+                probe_cost_us: float) -> list[float]:
+    """Latencies in ms of requests issued every 10 ms while the scheduler runs."""
+    scheduler = make_scheduler(hosts, interval, spread, time.monotonic)
+    stop = threading.Event()
+
+    def worker() -> None:
+        while not stop.is_set():
+            # Results are handled back to back, like ready callbacks on the event loop
+            for host_id, _, _ in scheduler.pop_due():
+                burn(probe_cost_us)
+                scheduler.record(host_id, "online")
+            next_due = scheduler.next_due()
+            delay = 0.05 if next_due is None else min(0.05, max(0.0, next_due - time.monotonic()))
+            stop.wait(delay)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    # Skip the first interval: without spreading every host is due at once on start
+    time.sleep(interval)
+
+    latencies = []
+    ends = time.monotonic() + duration
+    next_request = time.perf_counter()
+    while time.monotonic() < ends:
+        next_request += 0.01
+        pause = next_request - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+        # A request alternates Python work with database/Redis round trips,
+        # and has to win the GIL back after each of them
+        for _ in range(4):
+            burn(250)
+            time.sleep(0.0005)
+        # Measured from the scheduled arrival, so waiting for the GIL counts too
+        latencies.append((time.perf_counter() - next_request) * 1000)
+    stop.set()
+    thread.join()
+    return latencies
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, default=5000, help="Number of hosts")
+    parser.add_argument("--interval", type=float, default=10, help="Probe interval in seconds")
+    parser.add_argument("--duration", type=float, default=40, help="Seconds of latency sampling per mode")
+    parser.add_argument("--probe-cost-us", type=float, default=150, help="CPU time per probe in microseconds")
+    parser.add_argument("--skip-latency", action="store_true", help="Only report the load profile")
+    args = parser.parse_args()
+
+    print(f"{args.hosts} hosts, {args.interval:g} s interval")
+    print(f"{'spread':<8}{'probes/s mean':>15}{'p99':>8}{'max':>8}{'idle s':>8}")
+    for spread in (False, True):
+        profile = load_profile(args.hosts, args.interval, spread, seconds=600)
+        print(f"{'on' if spread else 'off':<8}{statistics.mean(profile):>15.1f}"
+              f"{percentile(profile, 0.99):>8}{max(profile):>8}{profile.count(0):>8}")
+
+    if not args.skip_latency:
+        print(f"\nweb requests (1 ms CPU + 4 round trips every 10 ms), probe cost {args.probe_cost_us:g} us")
+        print(f"{'spread':<8}{'requests':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for spread in (False, True):
+            latencies = web_latency(args.hosts, args.interval, spread, args.duration, args.probe_cost_us)
+            print(f"{'on' if spread else 'off':<8}{len(latencies):>10}{percentile(latencies, 0.5):>9.2f}"
+                  f"{percentile(latencies, 0.99):>9.2f}{max(latencies):>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare the JSON and compact host status encodings.
+
+Reports, for each encoding and host count:
+
+- payload size: average bytes per stored status value
+- decode cost: time to decode every payload with the same function bulk
+  reads use (ping_service._decode_status)
+- Redis memory: growth of used_memory after writing every status through
+  ping_service.write_host_statuses(), per host, for the keys layout and
+  the hash layout at each --shard-sizes value (shards of at most
+  hash-max-listpack-entries hosts, 128 by default, are stored as compact
+  listpacks as long as every value is at most 64 bytes, which compact
+  payloads are and JSON payloads are not)
+
+The Redis part uses a separate database (15 by default) which is flushed
+before every run, so never point it at the database the application uses.
+
+Usage:
+    python scripts/bench_status_encoding.py [--hosts 10000 100000] [--rounds 5]
+                                            [--shard-sizes 1000 128]
+                                            [--redis-url redis://localhost:6379/15]
+                                            [--skip-redis]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from app import ping_service  # noqa: E402
+
+ENCODINGS = ("json", "compact")
+
+
+def make_entries(hosts: int) -> dict[int, tuple]:
+    """Statuses as the ping service writes them: (status, last_check, ttl, rtt)."""
+    started = datetime(2026, 1, 1, 12, 0, 0)
+    entries = {}
+    for host_id in range(1, hosts + 1):
+        online = host_id % 3 != 0
+        # Probes are spread over the interval, so timestamps differ per host
+        last_check = (started + timedelta(microseconds=host_id * 3137)).isoformat()
+        entries[host_id] = ("online" if online else "offline", last_check, 600,
+                            0.0004 + (host_id % 97) / 10000.0 if online else None)
+    return entries
+
+
+def encode_all(entries: dict[int, tuple], encoding: str) -> list[str]:
+    ping_service.configure_status_store(ping_service.STATUS_LAYOUT, ping_service.STATUS_HASH_SHARD_SIZE, encoding)
+    payloads = []
+    for status, last_check, _, rtt in entries.values():
+        data = ping_service._status_data(status, last_check, rtt)
+        payloads.append(ping_service._encode_status(data))
+    return payloads
+
+
+def decode_ms(payloads: list[str], rounds: int) -> float:
+    now = time.time()
+    timings = []
+    for _ in range(rounds):
+        ping_service._from_epoch.cache_clear()
+        started = time.perf_counter()
+        for payload in payloads:
+            ping_service._decode_status(payload, now)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def redis_bytes_per_host(entries: dict[int, tuple], layout: str, shard_size: int, encoding: str) -> float:
+    client = ping_service.redis_client
+    client.flushdb()
+    ping_service.configure_status_store(layout, shard_size, encoding)
+    before = client.info("memory")["used_memory"]
+    items = list(entries.items())
+    for start in range(0, len(items), 5000):
+        if not ping_service.write_host_statuses(dict(items[start:start + 5000])):
+            raise RuntimeError("Failed to write host statuses")
+    used = client.info("memory")["used_memory"] - before
+    client.flushdb()
+    return used / len(entries)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[10000, 100000], help="Host counts")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed decodes per encoding")
+    parser.add_argument("--shard-sizes", type=int, nargs="+", default=[1000, 128],
+                        help="Host IDs per hash shard to measure")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15",
+                        help="Scratch Redis database (flushed!)")
+    parser.add_argument("--skip-redis", action="store_true", help="Only report payload size and decode cost")
+    args = parser.parse_args()
+
+    print(f"{'encoding':<10}{'hosts':>8}{'bytes/value':>13}{'decode ms':>11}{'us/host':>9}")
+    for hosts in args.hosts:
+        entries = make_entries(hosts)
+        for encoding in ENCODINGS:
+            payloads = encode_all(entries, encoding)
+            elapsed = decode_ms(payloads, args.rounds)
+            print(f"{encoding:<10}{hosts:>8}{statistics.mean(map(len, payloads)):>13.1f}"
+                  f"{elapsed:>11.2f}{elapsed * 1000 / hosts:>9.2f}")
+
+    if not args.skip_redis:
+        from redis import ConnectionPool
+
+        ping_service.update_redis_pool(ConnectionPool.from_url(args.redis_url, decode_responses=True))
+        layouts = [("keys", 1000)] + [("hash", shard_size) for shard_size in args.shard_sizes]
+        print(f"\n{'layout':<12}{'encoding':<10}{'hosts':>8}{'Redis bytes/host':>18}")
+        for hosts in args.hosts:
+            entries = make_entries(hosts)
+            for layout, shard_size in layouts:
+                name = layout if layout == "keys" else f"hash/{shard_size}"
+                for encoding in ENCODINGS:
+                    print(f"{name:<12}{encoding:<10}{hosts:>8}"
+                          f"{redis_bytes_per_host(entries, layout, shard_size, encoding):>18.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk host status reads for both Redis status layouts.
+
+Writes statuses for N hosts into the "keys" layout (one key per host) and
+the "hash" layout (hashes sharded by host ID range), then times
+ping_service.get_all_host_statuses() for each.
+
+Uses a separate Redis database (15 by default) which is flushed before
+every run, so never point it at the database the application uses.
+
+Usage:
+    python scripts/bench_status_store.py [--hosts 10000] [--rounds 20]
+                                         [--redis-url redis://localhost:6379/15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from redis import ConnectionPool  # noqa: E402
+
+from app import ping_service  # noqa: E402
+
+
+def bench_layout(layout: str, host_ids: list[int], rounds: int, shard_size: int) -> list[float]:
+    ping_service.redis_client.flushdb()
+    ping_service.configure_status_store(layout, shard_size)
+    ping_service.write_host_statuses({
+        host_id: ("online" if host_id % 3 else "offline", "2025-01-01T00:00:00", 600)
+        for host_id in host_ids
+    })
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        statuses = ping_service.get_all_host_statuses(host_ids)
+        timings.append((time.perf_counter() - started) * 1000)
+    assert all(statuses[host_id]["status"] != "unknown" for host_id in host_ids)
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, default=10000, help="Number of hosts")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed reads per layout")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Host IDs per hash shard")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15",
+                        help="Scratch Redis database (flushed!)")
+    args = parser.parse_args()
+
+    pool = ConnectionPool.from_url(args.redis_url, decode_responses=True)
+    ping_service.update_redis_pool(pool)
+    host_ids = list(range(1, args.hosts + 1))
+
+    print(f"{'layout':<8}{'hosts':>8}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+    for layout in ("keys", "hash"):
+        timings = bench_layout(layout, host_ids, args.rounds, args.shard_size)
+        print(f"{layout:<8}{args.hosts:>8}{min(timings):>10.2f}"
+              f"{statistics.median(timings):>12.2f}{max(timings):>10.2f}")
+
+    ping_service.redis_client.flushdb()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())